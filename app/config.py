@@ -9,3 +9,69 @@ PDF_FILES_FOLDER="~/DocAppBackend/files/"
 ACCOUNT_URL="https://docappstore.blob.core.windows.net"
 
 
+# Shared Chroma client
+CHROMA_POOL_MAXSIZE = 20  # keep-alive connections held open to the Chroma server
+CHROMA_HEALTH_CHECK_INTERVAL = 30  # seconds between heartbeats of the shared client
+# Embeddings
+EMBEDDING_MODEL = "text-embedding-3-large"
+EMBEDDING_CACHE_PATH = "./embedding_cache.db"
+EMBEDDING_CACHE_MAX_ENTRIES = 50000  # ~12 KB per text-embedding-3-large vector
+# CrossEncoder reranker
+RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANKER_BATCH_SIZE = 64
+RERANKER_THREADS = 0  # torch intra-op threads, 0 keeps the torch default
+RERANKER_WORKERS = 1  # threads that run reranking off the event loop
+RETRIEVAL_CONCURRENCY = 8  # concurrent vector store searches per request
+BATCH_SEARCH_SIZE = 64  # queries per embeddings request / multi-query Chroma call
+# PDF page extraction
+PDF_EXTRACT_WORKERS = 0  # worker processes for page text extraction, 0 uses the CPU count
+PDF_PARALLEL_MIN_PAGES = 50  # smaller PDFs are extracted in-process
+PDF_JOB_WORKERS = 4  # /process-pdf jobs indexing at the same time (each job indexes its chapters in one bulk pass)
+EMBEDDING_BATCH_MAX_TOKENS = 250000  # OpenAI allows 300k tokens per embeddings request
+EMBEDDING_BATCH_MAX_INPUTS = 1000  # matches OpenAIEmbeddings' own chunk_size, one request per batch
+INGEST_BATCH_MAX_CHUNKS = 500  # chunks held in memory per folder-ingest batch (whole files only)
+CHUNK_OVERLAP = 150  # characters, "recursive" strategy (uses CHUNK_SIZE)
+CHUNK_TOKENS = 400  # tokens per chunk, "token" and "heading" strategies
+CHUNK_OVERLAP_TOKENS = 50
+SENTENCE_WINDOW_TOKENS = 128  # tokens per embedded sentence group, "sentence_window" strategy
+SENTENCE_WINDOW_SIZE = 2  # neighbouring groups on each side stored as the "window" metadata
+# chunking strategy per kind of source: "recursive", "token", "heading" or "sentence_window"
+CHUNK_STRATEGIES = {
+    "default": "token",
+    "pdf_chapter": "heading",
+    "file": "token",
+    "text": "token",
+}
+BLOB_CONTAINER = "test"
+BLOB_UPLOAD_CONCURRENCY = 8  # concurrent blob uploads across all requests
+BLOB_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # bytes read from an upload per chunk
+IMAGE_DOWNLOAD_MAX_CONNECTIONS = 32  # pooled connections of the shared image download session
+IMAGE_DOWNLOAD_PER_HOST = 4  # concurrent downloads per image host
+IMAGE_DOWNLOAD_TIMEOUT = 60  # seconds for a whole image download
+IMAGE_DOWNLOAD_CONNECT_TIMEOUT = 10
+IMAGE_SPOOL_MAX_MEMORY = 8 * 1024 * 1024  # downloaded image bytes kept in memory before spilling to disk
+SQLITE_DATABASE = "./test.db"  # app database shared by the routers
+SQLITE_POOL_SIZE = 8
+SQLITE_BUSY_TIMEOUT_MS = 5000  # wait this long for a lock before "database is locked"
+SQLITE_CACHED_STATEMENTS = 256  # prepared statements kept per pooled connection
+# Presentation backends: "google_slides" (Slides API) or "pptx" (rendered locally with python-pptx)
+PRESENTATION_BACKEND = "google_slides"  # used when a request doesn't choose one
+PPTX_OUTPUT = "blob"  # where rendered .pptx decks go: "blob" (Azure, under presentations/) or "disk"
+PPTX_OUTPUT_FOLDER = "./presentations"  # used when PPTX_OUTPUT is "disk"
+WARMUP_SERVICES = True  # create Google, Azure, LLM and reranker clients in the background once the server is listening
+# LLM profiles (helper.llms): one per route, all sharing one pooled HTTP client.
+# Each setting can be overridden with LLM_<PROFILE>_<SETTING>, e.g. LLM_SLIDES_MODEL=gpt-4o-mini
+LLM_PROFILE_DEFAULTS = {"model": "gpt-3.5-turbo-0125", "temperature": 0, "max_retries": 2, "timeout": None}
+LLM_PROFILES = {
+    "slides": {},  # /get-slide
+    "extract_text": {},  # /extract-text
+    "extract_text_stream": {"streaming": True, "stream_usage": True},  # /extract-text-stream
+    "summarize": {},  # /scrape
+    "augment_subtopic": {},  # /augment-subtopic
+    "transform_text": {},  # /upload and /post-message instructions
+    "describe_image": {"model": "gpt-4o-mini", "temperature": 0.7},  # /process-image
+}
+LLM_MAX_CONNECTIONS = 50  # pooled connections to the OpenAI API across all profiles
+LLM_MAX_KEEPALIVE_CONNECTIONS = 20
+LLM_REQUEST_TIMEOUT = 120  # seconds an endpoint waits for its LLM call before answering 504
+DISCONNECT_POLL_INTERVAL = 1.0  # seconds between checks whether the client of a pending LLM call went away
@@ -3,6 +3,7 @@ from  dotenv import load_dotenv
 
 import os
 from config import DB_NAME
+from db.db import vector_store_service
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,9 +17,9 @@ LOCALHOST_PORT = os.getenv('LOCALHOST_PORT')
 async def setup_chroma(is_reset=False):
     try:    
         # persisten_client= chromadb.PersistentClient(path="chroma_db") # type: ignore
-        chroma_client = chromadb.HttpClient(host=DB_IP, port=DB_PORT)
-        # chroma_client = chromadb.HttpClient(host=LOCALHOST_URL, port=LOCALHOST_PORT)
-        collection = chroma_client.get_or_create_collection(name=DB_NAME)
+        # the shared vector store service owns the only Chroma client in the process
+        vector_store_service.connect()
+        collection = vector_store_service.client.get_or_create_collection(name=DB_NAME)
         print("collection created with docs:",collection.count())
 
 
@@ -27,4 +28,3 @@ async def setup_chroma(is_reset=False):
     except Exception as e:
         print("An error occurred:", str(e))
     
- 
\ No newline at end of file
@@ -1,11 +1,19 @@
 # db.py
+import threading
+import time
+
 import chromadb
+import httpx
 from chromadb import Settings
+from chromadb.api.client import SharedSystemClient
+from fastapi import HTTPException
 from langchain_community.vectorstores import Chroma
+from langchain.indexes import SQLRecordManager
 
 from langchain_openai import OpenAIEmbeddings
 import os
-from config import DB_NAME
+from config import DB_NAME, EMBEDDING_MODEL, CHROMA_POOL_MAXSIZE, CHROMA_HEALTH_CHECK_INTERVAL
+from db.embedding_cache import CachedEmbeddings
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,39 +23,134 @@ DB_PORT = os.getenv('DB_PORT')
 LOCALHOST_URL = os.getenv('LOCALHOST_URL')
 LOCALHOST_PORT = os.getenv('LOCALHOST_PORT')
 os.environ['ALLOW_RESET'] = 'True'
- 
 
-###this is a method that needs to be invoked
-# def get_LC_chroma_client():
-#     chroma_client = chromadb.HttpClient(host=DB_IP, port=DB_PORT)
-#     embeddings = OpenAIEmbeddings(model= "text-embedding-3-large")
+# Record manager shared by every indexing and delete path; its keys are the Chroma ids and
+# its group ids are the document "source" metadata
+namespace = f"chromadb/{DB_NAME}"
+record_manager = SQLRecordManager(
+    namespace, db_url="sqlite:///record_manager_cache.sql"
+)
+record_manager.create_schema()
 
-# # create a vector store  from client
-#     langchain_chroma = Chroma(
-#         client=chroma_client,
-#         collection_name=DB_NAME,
-#         embedding_function=embeddings,
-#     )
-#     return langchain_chroma
 
-def get_LC_chroma_client():
-    try:
-        # Initialize OpenAI embeddings
-        embeddings = OpenAIEmbeddings(model= "text-embedding-3-large")
-        # Initialize Chroma client
-        chroma_client = chromadb.HttpClient(host=os.getenv("DB_IP", "172.208.27.84"), port=int(os.getenv("DB_PORT", "8000")))
-        # chroma_client = chromadb.HttpClient(host=LOCALHOST_URL, port=LOCALHOST_PORT)
-
-       # Initialize Langchain's Chroma integration
-        langchain_chroma = Chroma(
-            client=chroma_client,
-            collection_name=DB_NAME,
-            embedding_function=embeddings
+class VectorStoreService:
+    """
+    Process-wide owner of the Chroma HTTP client, the embeddings object and the LangChain
+    Chroma wrapper. Built once in the FastAPI lifespan and shared by every router, so the
+    hot path never pays for client construction or a fresh TCP/TLS handshake.
+
+    The client's httpx session is given a keep-alive pool of CHROMA_POOL_MAXSIZE, a heartbeat
+    is sent at most once per CHROMA_HEALTH_CHECK_INTERVAL seconds, and the client is rebuilt
+    when the heartbeat fails.
+    """
+    def __init__(self, host=None, port=None, collection_name=DB_NAME):
+        self.host = host or os.getenv("DB_IP", "172.208.27.84")
+        self.port = int(port or os.getenv("DB_PORT", "8000"))
+        self.collection_name = collection_name
+        self.client = None
+        self.embeddings = None
+        self.store = None
+        self._last_health_check = 0.0
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Create (or re-create) the Chroma client, embeddings and LangChain wrapper."""
+        with self._lock:
+            # chromadb caches clients per settings; drop the cache so a reconnect really
+            # builds a new transport instead of handing back the broken one
+            SharedSystemClient.clear_system_cache()
+
+            chroma_client = chromadb.HttpClient(host=self.host, port=self.port)
+            self._pool_session(chroma_client)
+            # embeddings are served through the on-disk cache so repeated chunks and queries
+            # never hit the OpenAI API twice
+            embeddings = self.embeddings or CachedEmbeddings(
+                OpenAIEmbeddings(model=EMBEDDING_MODEL), model=EMBEDDING_MODEL
+            )
+
+            self.store = Chroma(
+                client=chroma_client,
+                collection_name=self.collection_name,
+                embedding_function=embeddings
+            )
+            self.client = chroma_client
+            self.embeddings = embeddings
+            self._last_health_check = time.monotonic()
+            print(f"Vector store connected to {self.host}:{self.port}, collection '{self.collection_name}'")
+            return self.store
+
+    def _pool_session(self, chroma_client):
+        """
+        Replace the httpx session of the Chroma client with one holding CHROMA_POOL_MAXSIZE
+        keep-alive connections, keeping its headers (auth), timeout and TLS verification.
+        """
+        server = getattr(chroma_client, "_server", None)
+        session = getattr(server, "_session", None)
+        if not isinstance(session, httpx.Client):
+            # older chromadb versions use a requests session; keep its default pool
+            return
+        ssl_verify = server._settings.chroma_server_ssl_verify
+        server._session = httpx.Client(
+            headers=session.headers,
+            timeout=session.timeout,
+            verify=True if ssl_verify is None else ssl_verify,
+            limits=httpx.Limits(max_connections=CHROMA_POOL_MAXSIZE, max_keepalive_connections=CHROMA_POOL_MAXSIZE),
         )
+        session.close()
+
+    @property
+    def collection(self):
+        """The raw chromadb collection behind the LangChain wrapper."""
+        return self.get_store()._collection
+
+    def health_check(self) -> bool:
+        """Heartbeat the Chroma server, reconnecting once if it does not answer."""
+        try:
+            self.client.heartbeat()
+            self._last_health_check = time.monotonic()
+            return True
+        except Exception as e:
+            print(f"Vector store heartbeat failed, reconnecting: {e}")
+        try:
+            self.connect()
+            return True
+        except Exception as e:
+            print(f"Vector store reconnect failed: {e}")
+            return False
 
-        # print("Chroma client initialized successfully.")
-        return langchain_chroma
+    def get_store(self) -> Chroma:
+        """Return the shared LangChain Chroma wrapper, connecting or health checking if due."""
+        if self.store is None:
+            return self.connect()
+        if time.monotonic() - self._last_health_check > CHROMA_HEALTH_CHECK_INTERVAL:
+            self.health_check()
+        return self.store
 
+    def close(self):
+        """Release the HTTP session held by the Chroma client."""
+        with self._lock:
+            session = getattr(getattr(self.client, "_server", None), "_session", None)
+            if session is not None:
+                session.close()
+            self.client = None
+            self.store = None
+
+
+vector_store_service = VectorStoreService()
+
+
+def get_LC_chroma_client():
+    """Return the process-wide LangChain Chroma wrapper."""
+    try:
+        return vector_store_service.get_store()
     except Exception as e:
         print(f"Error in get_LC_chroma_client: {str(e)}")
         raise
+
+
+def get_vector_store() -> Chroma:
+    """FastAPI dependency that injects the shared LangChain Chroma wrapper into a route."""
+    try:
+        return vector_store_service.get_store()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Vector store unavailable: {str(e)}")
@@ -0,0 +1,139 @@
+# embedding_cache.py
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Disk-backed, content-addressed cache in front of an embeddings model.
+
+    Vectors are keyed by (model, sha256(text)) and stored as raw float32 blobs in a small
+    SQLite file, so re-embedding a chunk or query that was seen before costs a local lookup
+    instead of an API call. The least recently used entries are evicted once the cache
+    holds more than `max_entries` vectors.
+    """
+    def __init__(self, underlying: Embeddings, model: str, path: str = EMBEDDING_CACHE_PATH,
+                 max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.underlying = underlying
+        self.model = model
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,  -- float32 little-endian
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)')
+        self._conn.commit()
+        self._count = self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, hashes: List[str]) -> dict:
+        """Fetch cached vectors for the given hashes and refresh their LRU timestamps."""
+        found = {}
+        unique_hashes = list(dict.fromkeys(hashes))
+        now = time.time()
+        with self._lock:
+            # stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique_hashes), 500):
+                batch = unique_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f'SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})',
+                    (self.model, *batch)
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                self._conn.executemany(
+                    'UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?',
+                    [(now, self.model, text_hash) for text_hash in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors: dict):
+        """Persist newly computed vectors and evict the least recently used overflow."""
+        now = time.time()
+        with self._lock:
+            # another caller may have stored some of these texts since our lookup; only new rows grow the cache
+            existing = 0
+            hashes = list(vectors)
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                existing += self._conn.execute(
+                    f'SELECT COUNT(*) FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})',
+                    (self.model, *batch)
+                ).fetchone()[0]
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)',
+                [(self.model, text_hash, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                 for text_hash, vector in vectors.items()]
+            )
+            self._count += len(vectors) - existing
+            if self._count > self.max_entries:
+                self._conn.execute('''
+                    DELETE FROM embeddings WHERE rowid IN (
+                        SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?
+                    )
+                ''', (self._count - self.max_entries,))
+                self._count = self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, calling the underlying model only for texts not already cached."""
+        hashes = [self._hash(text) for text in texts]
+        cached = self._lookup(hashes)
+
+        missing = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in cached and text_hash not in missing:
+                missing[text_hash] = text
+
+        self.hits += sum(1 for text_hash in hashes if text_hash in cached)
+        self.misses += len(missing)
+
+        if missing:
+            computed = self.underlying.embed_documents(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), computed))
+            self._store(new_vectors)
+            cached.update(new_vectors)
+
+        return [cached[text_hash] for text_hash in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query through the same cache as documents."""
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size of the cache."""
+        total = self.hits + self.misses
+        return {
+            "model": self.model,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": self._count,
+            "max_entries": self.max_entries,
+        }
@@ -0,0 +1,45 @@
+# migrations.py
+from db.sqlite import pool
+from helper import asset_store
+from indexers import db_handler, pdf_jobs, update_indexed_files
+
+
+def migrate_sources(conn):
+    """
+    Create the 'sources' table used by the /post-sources and /sources routers.
+
+    Older databases were created without the 'text' or 'type' column; missing columns are added.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sources (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL UNIQUE,
+            summary TEXT,
+            text TEXT,  -- Block of text of the source
+            type TEXT   -- The file type (e.g., text, image, link)
+        )
+    ''')
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(sources)')]
+    for column in ("text", "type"):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE sources ADD COLUMN {column} TEXT DEFAULT ''")
+
+
+# Every schema step, in order; each is idempotent
+MIGRATIONS = [
+    migrate_sources,
+    asset_store.migrate,
+    db_handler.migrate,
+    update_indexed_files.migrate,
+    pdf_jobs.migrate,
+]
+
+
+def run_migrations():
+    """
+    Bring the app database schema up to date. Runs once at startup, in one transaction.
+    """
+    with pool.transaction() as conn:
+        for migration in MIGRATIONS:
+            migration(conn)
+    print(f"Database schema up to date ({len(MIGRATIONS)} migration steps)")
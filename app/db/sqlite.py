@@ -0,0 +1,116 @@
+# sqlite.py
+import asyncio
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from config import SQLITE_DATABASE, SQLITE_POOL_SIZE, SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHED_STATEMENTS
+
+
+class SQLitePool:
+    """
+    Small pool of long-lived connections to the app database (test.db).
+
+    Connections run in WAL mode with synchronous=NORMAL, so readers don't block the writer
+    and commits don't fsync the main file; a busy timeout makes concurrent writers wait for
+    the lock instead of failing. Because connections are reused, sqlite3's per-connection
+    statement cache keeps repeated queries prepared.
+    """
+
+    def __init__(self, path: str = SQLITE_DATABASE, size: int = SQLITE_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,  # a connection is used by one thread at a time, but not always the same one
+            cached_statements=SQLITE_CACHED_STATEMENTS,
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        # borrowers outside db_executor (e.g. asyncio.to_thread) can outnumber the pool; don't wait forever
+        try:
+            return self._idle.get(timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"No pooled connection became free within {SQLITE_BUSY_TIMEOUT_MS} ms ({self.size} in use)"
+            ) from None
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection. Work left uncommitted when the block exits is rolled back.
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Borrow a connection and run the block in one transaction, committed on success.
+        """
+        with self.connection() as conn:
+            with conn:
+                yield conn
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+pool = SQLitePool()
+
+# Database calls from async code run here, never on the event loop
+db_executor = ThreadPoolExecutor(max_workers=SQLITE_POOL_SIZE, thread_name_prefix="sqlite")
+
+
+async def run_in_db(func, *args):
+    """
+    Run a blocking database function on the database executor.
+
+    :param func: Function that uses the pool.
+    :param args: Positional arguments for the function.
+    :return: The function's result.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, func, *args)
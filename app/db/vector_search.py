@@ -0,0 +1,49 @@
+# vector_search.py
+import asyncio
+from typing import List, Optional, Tuple
+
+from langchain.schema import Document
+from langchain_community.vectorstores import Chroma
+
+
+def batch_similarity_search(queries: List[str], store: Chroma, k: int = 20,
+                            where: Optional[dict] = None) -> List[List[Tuple[Document, float]]]:
+    """
+    Searches the collection for many queries at once.
+
+    All queries are embedded in a single embeddings request (through the embedding cache)
+    and sent to Chroma in a single multi-query `collection.query` call.
+
+    :param queries: The query strings.
+    :param store: The shared LangChain Chroma wrapper (see db.db.get_vector_store).
+    :param k: Number of results to return per query.
+    :param where: Optional Chroma metadata filter applied to every query.
+    :return: One list of (document, distance) per query, closest first.
+    """
+    if not queries:
+        return []
+
+    query_embeddings = store.embeddings.embed_documents(queries)
+
+    results = store._collection.query(
+        query_embeddings=query_embeddings,
+        n_results=k,
+        where=where,
+        include=["documents", "metadatas", "distances"],
+    )
+
+    ranked_lists = []
+    for ids, documents, metadatas, distances in zip(
+        results["ids"], results["documents"], results["metadatas"], results["distances"]
+    ):
+        ranked_lists.append([
+            (Document(page_content=document, metadata=metadata or {}, id=doc_id), distance)
+            for doc_id, document, metadata, distance in zip(ids, documents, metadatas, distances)
+        ])
+    return ranked_lists
+
+
+async def abatch_similarity_search(queries: List[str], store: Chroma, k: int = 20,
+                                   where: Optional[dict] = None) -> List[List[Tuple[Document, float]]]:
+    """Runs batch_similarity_search on a worker thread."""
+    return await asyncio.to_thread(batch_similarity_search, queries, store, k, where)
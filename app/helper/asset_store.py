@@ -0,0 +1,145 @@
+# asset_store.py
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from fastapi import UploadFile
+
+from config import BLOB_UPLOAD_CHUNK_SIZE
+from db.sqlite import pool, run_in_db
+from helper.blob_storage import blob_storage
+
+
+def migrate(conn):
+    """
+    Create the asset tables if they don't exist (run by db.migrations).
+
+    'assets' maps the SHA-256 of an asset's content to its blob; 'asset_sources' remembers
+    which asset an image URL resolved to, so known URLs are not downloaded again.
+
+    :param conn: Connection of the migration transaction.
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS assets (
+            hash TEXT PRIMARY KEY,   -- SHA-256 of the content
+            blob_url TEXT NOT NULL,
+            content_type TEXT,
+            size INTEGER,
+            created_at TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS asset_sources (
+            source TEXT PRIMARY KEY, -- e.g. the image URL the asset was downloaded from
+            hash TEXT NOT NULL
+        )
+    ''')
+
+
+def get_assets(hashes: List[str]) -> Dict[str, dict]:
+    """
+    Look up assets by content hash.
+
+    :return: Dictionary of hash to asset for the hashes that are stored.
+    """
+    if not hashes:
+        return {}
+    placeholders = ",".join("?" * len(hashes))
+    with pool.connection() as conn:
+        rows = conn.execute(
+            f'SELECT hash, blob_url, content_type, size FROM assets WHERE hash IN ({placeholders})', hashes
+        ).fetchall()
+    return {row[0]: {"hash": row[0], "blob_url": row[1], "content_type": row[2], "size": row[3]} for row in rows}
+
+
+def get_asset_for_source(source: str) -> Optional[dict]:
+    """Return the asset a source (e.g. an image URL) was stored as, or None if it is unknown."""
+    with pool.connection() as conn:
+        row = conn.execute('''
+            SELECT a.hash, a.blob_url, a.content_type, a.size
+            FROM asset_sources s JOIN assets a ON a.hash = s.hash
+            WHERE s.source = ?
+        ''', (source,)).fetchone()
+    return {"hash": row[0], "blob_url": row[1], "content_type": row[2], "size": row[3]} if row else None
+
+
+def _save_asset(asset: dict, source: Optional[str]):
+    with pool.transaction() as conn:
+        conn.execute('''
+            INSERT INTO assets (hash, blob_url, content_type, size, created_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(hash) DO NOTHING
+        ''', (asset["hash"], asset["blob_url"], asset["content_type"], asset["size"],
+              datetime.now(timezone.utc).isoformat()))
+        if source:
+            conn.execute('''
+                INSERT INTO asset_sources (source, hash) VALUES (?, ?)
+                ON CONFLICT(source) DO UPDATE SET hash = excluded.hash
+            ''', (source, asset["hash"]))
+
+
+def _hash_fileobj(fileobj: BinaryIO):
+    sha = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(BLOB_UPLOAD_CHUNK_SIZE), b""):
+        sha.update(block)
+        size += len(block)
+    fileobj.seek(0)
+    return sha.hexdigest(), size
+
+
+async def _iter_fileobj(fileobj: BinaryIO) -> AsyncIterator[bytes]:
+    # spooled files may have rolled over to disk, so reads happen off the event loop
+    while True:
+        chunk = await asyncio.to_thread(fileobj.read, BLOB_UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def store_fileobj(fileobj: BinaryIO, name: str, content_type: Optional[str] = None,
+                        source: Optional[str] = None) -> dict:
+    """
+    Store a seekable file as a content-addressed asset.
+
+    The content is hashed first; if an asset with that hash exists the upload is skipped,
+    otherwise it is streamed to the blob "assets/<sha256><ext>".
+
+    :param fileobj: Seekable binary file with the content.
+    :param name: Original file name or URL, used for the blob's extension only.
+    :param content_type: Optional content type stored with the blob.
+    :param source: Optional source (e.g. image URL) to remember for this asset.
+    :return: The asset: hash, blob_url, content_type and size.
+    """
+    content_hash, size = await asyncio.to_thread(_hash_fileobj, fileobj)
+
+    existing = (await run_in_db(get_assets, [content_hash])).get(content_hash)
+    if existing:
+        print(f"Asset {content_hash[:12]} already stored, skipping upload of {name}")
+        if source:
+            await run_in_db(_save_asset, existing, source)
+        return existing
+
+    extension = os.path.splitext(urlsplit(name).path)[1].lower()
+    blob_url = await blob_storage.upload_stream(f"assets/{content_hash}{extension}", _iter_fileobj(fileobj), content_type)
+    asset = {"hash": content_hash, "blob_url": blob_url, "content_type": content_type, "size": size}
+    await run_in_db(_save_asset, asset, source)
+    return asset
+
+
+async def store_upload(file: UploadFile) -> dict:
+    """Store an uploaded request file as an asset; the upload is already spooled by the server."""
+    return await store_fileobj(file.file, file.filename, file.content_type)
+
+
+async def store_uploads(files: List[UploadFile]) -> List[dict]:
+    """
+    Store many uploaded request files concurrently.
+
+    :return: The assets, in the order of the files.
+    """
+    return list(await asyncio.gather(*(store_upload(file) for file in files)))
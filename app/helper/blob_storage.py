@@ -0,0 +1,104 @@
+# blob_storage.py
+import asyncio
+import os
+import re
+from typing import AsyncIterator, List, Optional
+
+from dotenv import load_dotenv
+from fastapi import UploadFile
+
+from config import ACCOUNT_URL, BLOB_CONTAINER, BLOB_UPLOAD_CHUNK_SIZE, BLOB_UPLOAD_CONCURRENCY
+from helper.services import services
+
+load_dotenv()
+SHARED_ACCESS_KEY = os.getenv('SHARED_ACCESS_KEY')
+
+
+# Define a function similar to the JavaScript version to extract the file name
+def get_file_name(url):
+    match = re.search(r'[^/]*\.(\w+)($|\?)', url)
+    return match.group(0).split('?')[0] if match else None
+
+
+async def iter_upload_file(file: UploadFile, chunk_size: int = BLOB_UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield the body of an uploaded file in chunks, without reading it all into memory."""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+class BlobStorageService:
+    """
+    Process-wide async Azure Blob Storage client.
+
+    The client (and its connection pool) is created on first use, or by the service warmup,
+    and closed at shutdown; uploads across all requests share a bound on concurrent transfers.
+    """
+
+    def __init__(self, account_url: str = ACCOUNT_URL, container_name: str = BLOB_CONTAINER):
+        self.account_url = account_url
+        self.container_name = container_name
+        self._semaphore = asyncio.Semaphore(BLOB_UPLOAD_CONCURRENCY)
+        services.register("azure_blob", self._create_client)
+
+    def _create_client(self):
+        # the Azure SDK is imported here, so importing the app doesn't load it
+        from azure.storage.blob.aio import BlobServiceClient
+        return BlobServiceClient(account_url=self.account_url, credential=SHARED_ACCESS_KEY)
+
+    def get_client(self):
+        return services.get("azure_blob")
+
+    def blob_url(self, blob_name: str) -> str:
+        return f"https://{self.get_client().account_name}.blob.core.windows.net/{self.container_name}/{blob_name}"
+
+    async def exists(self, blob_name: str) -> bool:
+        blob_client = self.get_client().get_blob_client(self.container_name, blob_name)
+        return await blob_client.exists()
+
+    async def upload_stream(self, blob_name: str, data, content_type: Optional[str] = None) -> str:
+        """
+        Upload bytes, a file object or an async iterator of chunks to a blob.
+
+        :param blob_name: Name of the blob in the container (overwritten if it exists).
+        :param data: The content; async iterators are streamed block by block.
+        :param content_type: Optional content type stored with the blob.
+        :return: The URL of the uploaded blob.
+        """
+        from azure.storage.blob import ContentSettings
+
+        container_client = self.get_client().get_container_client(self.container_name)
+        content_settings = ContentSettings(content_type=content_type) if content_type else None
+        async with self._semaphore:
+            await container_client.upload_blob(
+                name=blob_name, data=data, overwrite=True, content_settings=content_settings
+            )
+        return self.blob_url(blob_name)
+
+    async def upload_file(self, file: UploadFile) -> str:
+        """
+        Stream an uploaded request file straight to blob storage.
+
+        :param file: The uploaded file; its file name (without any path or query) names the blob.
+        :return: The URL of the uploaded blob.
+        """
+        blob_name = get_file_name(file.filename) or file.filename
+        return await self.upload_stream(blob_name, iter_upload_file(file), file.content_type)
+
+    async def upload_files(self, files: List[UploadFile]) -> List[str]:
+        """
+        Upload many request files concurrently (bounded by BLOB_UPLOAD_CONCURRENCY).
+
+        :return: The blob URLs, in the order of the files.
+        """
+        return list(await asyncio.gather(*(self.upload_file(file) for file in files)))
+
+    async def close(self):
+        client = services.discard("azure_blob")
+        if client is not None:
+            await client.close()
+
+
+blob_storage = BlobStorageService()
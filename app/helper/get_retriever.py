@@ -1,27 +1,43 @@
 from dotenv import load_dotenv
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
-import chromadb
 load_dotenv()
-from db.db import get_LC_chroma_client
+from langchain_community.vectorstores import Chroma
 from config import DB_NAME
 
+SEARCH_TYPES = ("similarity", "mmr", "similarity_score_threshold")
+
+
+def get_retriever(store: Chroma, num_of_results=20, search_type="similarity", fetch_k=None, lambda_mult=0.5, score_threshold=0.5):
+    """
+    Returns a retriever over the shared vector store, or None if the collection is empty.
 
- 
-def get_retriever(num_of_results=20):
+    :param store: The shared LangChain Chroma wrapper (see db.db.get_vector_store).
+    :param num_of_results: Number of documents to return (k).
+    :param search_type: One of "similarity", "mmr" or "similarity_score_threshold".
+    :param fetch_k: Candidates fetched before MMR re-selection (defaults to 4 * k).
+    :param lambda_mult: MMR diversity trade-off, 0 is most diverse and 1 most relevant.
+    :param score_threshold: Minimum relevance score for "similarity_score_threshold".
+    :return: A retriever object.
+    """
+    if search_type not in SEARCH_TYPES:
+        raise ValueError(f"Unknown search type '{search_type}', expected one of {SEARCH_TYPES}")
     try:
-        LC_chroma_client=get_LC_chroma_client()
-        collection = LC_chroma_client.get()
-        print("---from api")
-        
-        if collection:
-            retriever = LC_chroma_client.as_retriever( search_kwargs={"k": num_of_results})
-            return retriever
+        # count() is a single small request, unlike get() which downloads the whole collection
+        if store._collection.count() == 0:
+            return None
+
+        search_kwargs = {"k": num_of_results}
+        if search_type == "mmr":
+            search_kwargs.update({"fetch_k": fetch_k or 4 * num_of_results, "lambda_mult": lambda_mult})
+        elif search_type == "similarity_score_threshold":
+            search_kwargs["score_threshold"] = score_threshold
+
+        # retrievers are cheap wrappers around the shared store, so build one per call
+        return store.as_retriever(search_type=search_type, search_kwargs=search_kwargs)
     except Exception as e:
         print('Error retrieving documents:', e)
 
 # Example usage:
-# retriever = await get_retriever()
+# retriever = get_retriever(store)
 # relevant_docs = await retriever.get_relevant_documents(question)
 
 
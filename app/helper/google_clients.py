@@ -0,0 +1,50 @@
+# google_clients.py
+import os
+
+from helper.services import services
+
+SCOPES = ['https://www.googleapis.com/auth/presentations', 'https://www.googleapis.com/auth/drive']
+SERVICE_ACCOUNT_FILE = os.path.expanduser("./helper/service_account.json")
+#SERVICE_ACCOUNT_FILE = os.path.expanduser("~/DocAppBackend/app/helper/service_account.json")
+
+
+def _credentials():
+    from google.oauth2 import service_account
+    return service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+
+
+def _slides_service():
+    from googleapiclient.discovery import build
+    return build('slides', 'v1', credentials=services.get("google_credentials"))
+
+
+def _drive_service():
+    from googleapiclient.discovery import build
+    return build('drive', 'v3', credentials=services.get("google_credentials"))
+
+
+services.register("google_credentials", _credentials)
+services.register("google_slides", _slides_service)
+services.register("google_drive", _drive_service)
+
+
+def slides_service():
+    """The Google Slides API client, built on first use."""
+    return services.get("google_slides")
+
+
+def drive_service():
+    """The Google Drive API client, built on first use."""
+    return services.get("google_drive")
+
+
+def authorized_http():
+    """
+    A new authorized HTTP transport for one deck build.
+
+    The API clients are shared, but httplib2 transports are not thread-safe, so requests
+    executed from worker threads pass their own: request.execute(http=authorized_http()).
+    """
+    import google_auth_httplib2
+    import httplib2
+    return google_auth_httplib2.AuthorizedHttp(services.get("google_credentials"), http=httplib2.Http())
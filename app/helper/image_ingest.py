@@ -0,0 +1,92 @@
+# image_ingest.py
+import asyncio
+import tempfile
+from typing import Dict, List
+
+import aiohttp
+from fastapi import HTTPException
+
+from config import (
+    BLOB_UPLOAD_CHUNK_SIZE, IMAGE_DOWNLOAD_MAX_CONNECTIONS, IMAGE_DOWNLOAD_PER_HOST,
+    IMAGE_DOWNLOAD_TIMEOUT, IMAGE_DOWNLOAD_CONNECT_TIMEOUT, IMAGE_SPOOL_MAX_MEMORY,
+)
+from db.sqlite import run_in_db
+from helper.asset_store import get_asset_for_source, store_fileobj
+
+# One pooled session for all image downloads, created on first use
+_session = None
+
+# Downloads in progress by URL, so concurrent requests for the same image share one transfer
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+def get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=IMAGE_DOWNLOAD_MAX_CONNECTIONS,
+                limit_per_host=IMAGE_DOWNLOAD_PER_HOST,
+                ttl_dns_cache=300,
+            ),
+            timeout=aiohttp.ClientTimeout(total=IMAGE_DOWNLOAD_TIMEOUT, sock_connect=IMAGE_DOWNLOAD_CONNECT_TIMEOUT),
+        )
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+async def _ingest(url: str) -> dict:
+    known = await run_in_db(get_asset_for_source, url)
+    if known:
+        print(f"Image already stored, skipping download: {url}")
+        return known
+
+    # the body is spooled (in memory up to IMAGE_SPOOL_MAX_MEMORY) so it can be hashed
+    # before deciding whether it needs uploading at all
+    with tempfile.SpooledTemporaryFile(max_size=IMAGE_SPOOL_MAX_MEMORY) as spool:
+        try:
+            async with get_session().get(url) as response:
+                if response.status != 200:
+                    raise HTTPException(status_code=response.status, detail=f"Failed to download image from {url}")
+                content_type = response.content_type
+                async for chunk in response.content.iter_chunked(BLOB_UPLOAD_CHUNK_SIZE):
+                    spool.write(chunk)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"Timed out downloading image from {url}")
+        except aiohttp.ClientError as e:
+            raise HTTPException(status_code=502, detail=f"Failed to download image from {url}: {str(e)}")
+
+        return await store_fileobj(spool, url, content_type, source=url)
+
+
+async def ingest_image_url(url: str) -> dict:
+    """
+    Store an image URL as a content-addressed asset, downloading it only if the URL is unknown
+    and uploading it only if its content is not stored yet.
+
+    :param url: The image URL.
+    :return: The asset: hash, blob_url, content_type and size.
+    """
+    url = url.strip()
+    task = _inflight.get(url)
+    if task is None:
+        task = asyncio.ensure_future(_ingest(url))
+        _inflight[url] = task
+        task.add_done_callback(lambda _: _inflight.pop(url, None))
+    # shield so one cancelled request doesn't abort a download other requests wait on
+    return await asyncio.shield(task)
+
+
+async def ingest_image_urls(urls: List[str]) -> List[dict]:
+    """
+    Store many image URLs concurrently (bounded per host by the session's connector).
+
+    :return: The assets, in the order of the given URLs.
+    """
+    return list(await asyncio.gather(*(ingest_image_url(url) for url in urls)))
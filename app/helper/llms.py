@@ -0,0 +1,197 @@
+# llms.py
+import asyncio
+import os
+import threading
+import time
+from functools import partial
+from typing import Any, Awaitable, Dict, Optional
+
+from fastapi import HTTPException, Request
+from langchain_core.callbacks import BaseCallbackHandler
+
+from config import (
+    LLM_PROFILE_DEFAULTS, LLM_PROFILES, LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_REQUEST_TIMEOUT, DISCONNECT_POLL_INTERVAL,
+)
+from helper.services import services
+
+# Profile settings that can be overridden from the environment, with their types
+ENV_SETTINGS = {"model": str, "temperature": float, "max_retries": int, "timeout": float}
+
+
+class LLMStats:
+    """Call counts, latency and token usage of one profile."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def record(self, latency: float, input_tokens: int = 0, output_tokens: int = 0, error: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.errors += int(error)
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "avg_latency": round(self.total_latency / self.calls, 3) if self.calls else None,
+                "max_latency": round(self.max_latency, 3),
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+            }
+
+
+class LLMStatsHandler(BaseCallbackHandler):
+    """Callback handler that feeds every call of a model into its profile's LLMStats."""
+
+    def __init__(self, stats: LLMStats):
+        self.stats = stats
+        self._started: Dict[Any, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+        self.stats.record(self._elapsed(run_id), input_tokens, output_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.stats.record(self._elapsed(run_id), error=True)
+
+    def _elapsed(self, run_id) -> float:
+        started = self._started.pop(run_id, None)
+        return time.perf_counter() - started if started is not None else 0.0
+
+
+class LLMRegistry:
+    """
+    Named chat model profiles (config.LLM_PROFILES) that share one pooled HTTP client.
+
+    Models are created on first use (or by the service warmup). Every call is counted
+    in its profile's stats: latency, input/output tokens and errors.
+    """
+
+    def __init__(self, profiles: Dict[str, dict] = LLM_PROFILES):
+        self.profiles = profiles
+        self.stats = {name: LLMStats() for name in profiles}
+        services.register("llm_http", self._create_http_clients)
+        for name in profiles:
+            services.register(f"llm.{name}", partial(self._create_model, name))
+
+    def _create_http_clients(self):
+        import httpx
+
+        limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS)
+        # the sync client only serves code that still calls invoke() outside the event loop
+        return {"sync": httpx.Client(limits=limits), "async": httpx.AsyncClient(limits=limits)}
+
+    def settings(self, name: str) -> dict:
+        """
+        The settings of a profile: LLM_PROFILE_DEFAULTS, then the profile's own settings,
+        then LLM_<PROFILE>_<SETTING> environment variables.
+        """
+        settings = {**LLM_PROFILE_DEFAULTS, **self.profiles[name]}
+        for key, cast in ENV_SETTINGS.items():
+            value = os.getenv(f"LLM_{name.upper()}_{key.upper()}")
+            if value:
+                settings[key] = cast(value)
+        return settings
+
+    def _create_model(self, name: str):
+        # langchain_openai (and the OpenAI SDK) are imported on first use
+        from langchain_openai import ChatOpenAI
+
+        http_clients = services.get("llm_http")
+        return ChatOpenAI(
+            **self.settings(name),
+            http_client=http_clients["sync"],
+            http_async_client=http_clients["async"],
+            callbacks=[LLMStatsHandler(self.stats[name])],
+        )
+
+    def get(self, name: str):
+        """
+        :param name: A profile of config.LLM_PROFILES.
+        :return: The profile's shared chat model.
+        """
+        if name not in self.profiles:
+            raise KeyError(f"Unknown LLM profile '{name}', expected one of {sorted(self.profiles)}")
+        return services.get(f"llm.{name}")
+
+    def get_stats(self) -> Dict[str, dict]:
+        """Stats of every profile, with the model it uses."""
+        return {name: {"model": self.settings(name)["model"], **stats.snapshot()} for name, stats in self.stats.items()}
+
+    async def close(self):
+        # drop the models first, so none is handed out with the HTTP clients closed under it
+        for name in self.profiles:
+            services.discard(f"llm.{name}")
+        http_clients = services.discard("llm_http")
+        if http_clients is not None:
+            http_clients["sync"].close()
+            await http_clients["async"].aclose()
+
+
+llm_registry = LLMRegistry()
+
+
+def get_llm(name: str):
+    """The shared chat model of an LLM profile (see config.LLM_PROFILES)."""
+    return llm_registry.get(name)
+
+
+async def _wait_for_disconnect(request: Request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+
+async def run_llm(call: Awaitable, request: Optional[Request] = None, timeout: Optional[float] = LLM_REQUEST_TIMEOUT):
+    """
+    Await an LLM call, e.g. chain.ainvoke(...), within the time budget of the request.
+
+    The call is cancelled when it takes longer than the timeout (504), or when the client
+    of the request disconnects (499), so abandoned requests stop holding connections and tokens.
+
+    :param call: The awaitable LLM call.
+    :param request: The incoming request; without it only the timeout applies.
+    :param timeout: Seconds to wait; None waits as long as the call takes.
+    :return: The call's result.
+    """
+    llm_task = asyncio.ensure_future(call)
+    disconnect_task = asyncio.create_task(_wait_for_disconnect(request)) if request is not None else None
+    try:
+        done, _ = await asyncio.wait(
+            [task for task in (llm_task, disconnect_task) if task is not None],
+            timeout=timeout,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        if llm_task in done:
+            return llm_task.result()
+        if disconnect_task is not None and disconnect_task in done:
+            print("Client disconnected, cancelling its LLM call")
+            raise HTTPException(status_code=499, detail="Client closed the request")
+        raise HTTPException(status_code=504, detail=f"LLM call timed out after {timeout}s")
+    finally:
+        for task in (llm_task, disconnect_task):
+            if task is not None and not task.done():
+                task.cancel()
@@ -0,0 +1,190 @@
+# pdf_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from config import PDF_FILES_FOLDER
+from helper.pdf_pages import extract_page_texts
+
+# Cache database lives next to the PDFs it describes
+DATABASE = os.path.join(os.path.expanduser(PDF_FILES_FOLDER), ".pdf_cache.db")
+
+_lock = threading.Lock()
+
+
+def _connect():
+    os.makedirs(os.path.dirname(DATABASE), exist_ok=True)
+    conn = sqlite3.connect(DATABASE)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS pdf_files (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            content_hash TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS pdf_meta (
+            content_hash TEXT PRIMARY KEY,
+            page_count INTEGER,
+            toc TEXT,       -- JSON of fitz get_toc() entries
+            chapters TEXT   -- JSON of detected chapter boundaries
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS pdf_pages (
+            content_hash TEXT NOT NULL,
+            page_num INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            PRIMARY KEY (content_hash, page_num)
+        )
+    ''')
+    return conn
+
+
+def _hash_file(pdf_file: str) -> str:
+    sha = hashlib.sha256()
+    with open(pdf_file, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def get_content_hash(pdf_file: str) -> str:
+    """
+    Return the SHA-256 of a PDF, re-hashing only when its size or mtime changed.
+
+    When a file's content changes, the cache entries of its previous content are dropped
+    unless another path still points at them.
+    """
+    path = os.path.abspath(pdf_file)
+    stat = os.stat(path)
+    with _lock:
+        conn = _connect()
+        try:
+            row = conn.execute('SELECT size, mtime, content_hash FROM pdf_files WHERE path = ?', (path,)).fetchone()
+            if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+                return row[2]
+
+            content_hash = _hash_file(path)
+            conn.execute('''
+                INSERT INTO pdf_files (path, size, mtime, content_hash) VALUES (?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime = excluded.mtime,
+                    content_hash = excluded.content_hash
+            ''', (path, stat.st_size, stat.st_mtime, content_hash))
+
+            if row and row[2] != content_hash:
+                still_used = conn.execute('SELECT 1 FROM pdf_files WHERE content_hash = ?', (row[2],)).fetchone()
+                if not still_used:
+                    conn.execute('DELETE FROM pdf_meta WHERE content_hash = ?', (row[2],))
+                    conn.execute('DELETE FROM pdf_pages WHERE content_hash = ?', (row[2],))
+            conn.commit()
+            return content_hash
+        finally:
+            conn.close()
+
+
+def _get_meta(content_hash: str, column: str):
+    conn = _connect()
+    try:
+        row = conn.execute(f'SELECT page_count, {column} FROM pdf_meta WHERE content_hash = ?', (content_hash,)).fetchone()
+        return row
+    finally:
+        conn.close()
+
+
+def _set_meta(content_hash: str, column: str, value, page_count: int):
+    with _lock:
+        conn = _connect()
+        try:
+            conn.execute(f'''
+                INSERT INTO pdf_meta (content_hash, page_count, {column}) VALUES (?, ?, ?)
+                ON CONFLICT(content_hash) DO UPDATE SET page_count = excluded.page_count,
+                    {column} = excluded.{column}
+            ''', (content_hash, page_count, value))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def get_raw_toc(pdf_file: str) -> Tuple[list, int]:
+    """
+    Return the PDF's TOC entries (as from fitz get_toc) and its page count, from cache if possible.
+
+    :param pdf_file: Path to the PDF file.
+    :return: Tuple of (list of [level, title, page] entries, page count).
+    """
+    content_hash = get_content_hash(pdf_file)
+    row = _get_meta(content_hash, "toc")
+    if row and row[1] is not None:
+        return json.loads(row[1]), row[0]
+
+    doc = fitz.open(pdf_file)
+    try:
+        toc = doc.get_toc()
+        page_count = doc.page_count
+    finally:
+        doc.close()
+
+    _set_meta(content_hash, "toc", json.dumps(toc), page_count)
+    return toc, page_count
+
+
+def get_page_texts(pdf_file: str) -> List[str]:
+    """
+    Return the text of every page of the PDF, extracting (in parallel) only on a cache miss.
+
+    :param pdf_file: Path to the PDF file.
+    :return: List with one text string per page.
+    """
+    content_hash = get_content_hash(pdf_file)
+    conn = _connect()
+    try:
+        row = conn.execute('SELECT page_count FROM pdf_meta WHERE content_hash = ?', (content_hash,)).fetchone()
+        rows = conn.execute(
+            'SELECT text FROM pdf_pages WHERE content_hash = ? ORDER BY page_num', (content_hash,)
+        ).fetchall()
+    finally:
+        conn.close()
+    if row and row[0] is not None and rows and len(rows) == row[0]:
+        return [text for (text,) in rows]
+
+    page_texts = extract_page_texts(pdf_file)
+    with _lock:
+        conn = _connect()
+        try:
+            conn.execute('DELETE FROM pdf_pages WHERE content_hash = ?', (content_hash,))
+            conn.executemany(
+                'INSERT INTO pdf_pages (content_hash, page_num, text) VALUES (?, ?, ?)',
+                [(content_hash, page_num, text) for page_num, text in enumerate(page_texts)]
+            )
+            conn.execute('''
+                INSERT INTO pdf_meta (content_hash, page_count) VALUES (?, ?)
+                ON CONFLICT(content_hash) DO UPDATE SET page_count = excluded.page_count
+            ''', (content_hash, len(page_texts)))
+            conn.commit()
+        finally:
+            conn.close()
+    return page_texts
+
+
+def get_chapters(pdf_file: str) -> Optional[list]:
+    """
+    Return the cached chapter boundaries detected for the PDF, or None if not detected yet.
+    """
+    row = _get_meta(get_content_hash(pdf_file), "chapters")
+    if row and row[1] is not None:
+        return json.loads(row[1])
+    return None
+
+
+def store_chapters(pdf_file: str, chapters: list, page_count: int):
+    """
+    Store the chapter boundaries detected for the PDF.
+    """
+    _set_meta(get_content_hash(pdf_file), "chapters", json.dumps(chapters), page_count)
@@ -0,0 +1,75 @@
+# pdf_pages.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import fitz  # PyMuPDF
+
+from config import PDF_EXTRACT_WORKERS, PDF_PARALLEL_MIN_PAGES
+
+WORKERS = PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+
+# Created on first use so importing this module never forks
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=WORKERS)
+    return _pool
+
+
+def extract_page_range(pdf_file: str, start: int, end: int) -> List[str]:
+    """
+    Extract the text of pages [start, end) of a PDF. Runs inside a worker process.
+
+    :param pdf_file: Path to the PDF file.
+    :param start: Index of the first page (0-based).
+    :param end: Index one past the last page.
+    :return: List of page texts; pages that fail to extract are returned as empty strings.
+    """
+    texts = []
+    doc = fitz.open(pdf_file)
+    try:
+        for page_num in range(start, end):
+            try:
+                texts.append(doc.load_page(page_num).get_text("text"))
+            except Exception as e:
+                print(f"Error extracting text from page {page_num}: {str(e)}")
+                texts.append("")
+    finally:
+        doc.close()
+    return texts
+
+
+def extract_page_texts(pdf_file: str) -> List[str]:
+    """
+    Extract the text of every page of a PDF exactly once.
+
+    Large documents are split into page ranges that are extracted in parallel across a
+    process pool (PyMuPDF text extraction is CPU-bound); small ones are read inline.
+
+    :param pdf_file: Path to the PDF file.
+    :return: List with one text string per page, in page order.
+    """
+    doc = fitz.open(pdf_file)
+    page_count = doc.page_count
+    doc.close()
+
+    if page_count < PDF_PARALLEL_MIN_PAGES:
+        return extract_page_range(pdf_file, 0, page_count)
+
+    pool = _get_pool()
+    # a few ranges per worker keeps the workers busy when pages vary in density
+    range_size = max(1, -(-page_count // (WORKERS * 4)))
+    futures = [
+        pool.submit(extract_page_range, pdf_file, start, min(start + range_size, page_count))
+        for start in range(0, page_count, range_size)
+    ]
+
+    page_texts = []
+    for future in futures:
+        page_texts.extend(future.result())
+    print(f"Extracted text from {page_count} pages of {pdf_file}")
+    return page_texts
@@ -0,0 +1,96 @@
+# pptx_renderer.py
+import io
+from typing import List, Optional, Tuple
+
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from pptx.util import Pt
+
+from helper.presentation_models import PresentationInput
+
+# Same layout as the Google Slides decks of slides_generator_alternate (points, 720x540 slides)
+SLIDE_WIDTH = 720
+SLIDE_HEIGHT = 540
+BACKGROUND_COLOR = RGBColor(77, 128, 191)
+TEXT_COLOR = RGBColor(255, 255, 255)
+FONT_NAME = 'Arial'
+BLANK_LAYOUT = 6  # index of the blank layout in python-pptx's default template
+
+
+def add_text_box(slide, text: str, x: int, y: int, width: int, height: int, font_size: int,
+                 is_title: bool = False, add_bullets: bool = False, line_spacing: float = 1.15):
+    """
+    Add a text box with one paragraph per line of text.
+
+    :param add_bullets: Prefix each line with a bullet (text boxes have no bullet style of their own).
+    :param line_spacing: Line spacing as a multiple of the font size; titles keep single spacing.
+    """
+    text_frame = slide.shapes.add_textbox(Pt(x), Pt(y), Pt(width), Pt(height)).text_frame
+    text_frame.word_wrap = True
+
+    for index, line in enumerate(text.split("\n")):
+        paragraph = text_frame.paragraphs[0] if index == 0 else text_frame.add_paragraph()
+        if not is_title:
+            paragraph.line_spacing = line_spacing
+        run = paragraph.add_run()
+        run.text = f"• {line}" if add_bullets and not is_title else line
+        run.font.size = Pt(font_size)
+        run.font.bold = is_title
+        run.font.name = FONT_NAME
+        run.font.color.rgb = TEXT_COLOR
+
+
+def add_image_slide(presentation, image: bytes):
+    """Add a slide with the image scaled to fit the slide, keeping its aspect ratio, and centred."""
+    slide = presentation.slides.add_slide(presentation.slide_layouts[BLANK_LAYOUT])
+    picture = slide.shapes.add_picture(io.BytesIO(image), 0, 0)
+    scale = min(presentation.slide_width / picture.width, presentation.slide_height / picture.height)
+    picture.width = int(picture.width * scale)
+    picture.height = int(picture.height * scale)
+    picture.left = (presentation.slide_width - picture.width) // 2
+    picture.top = (presentation.slide_height - picture.height) // 2
+
+
+def render_pptx(presentation_data: PresentationInput, images: List[Optional[bytes]] = None) -> Tuple[bytes, int, int]:
+    """
+    Render a deck to .pptx in memory: a title slide, one slide per heading and one slide per image.
+
+    :param presentation_data: The validated slide content.
+    :param images: Image contents for the image slides; None entries are skipped.
+    :return: The .pptx file content, the number of title and content slides, and the number of image slides.
+    """
+    presentation = Presentation()
+    presentation.slide_width = Pt(SLIDE_WIDTH)
+    presentation.slide_height = Pt(SLIDE_HEIGHT)
+    layout = presentation.slide_layouts[BLANK_LAYOUT]
+
+    first_slide = presentation_data.slides[0]
+    slide_data = [(first_slide.title, None, True)]
+    for content_item in first_slide.content:
+        slide_data.append((content_item['heading'], [content_item], False))
+
+    for index, (title, content, is_title_slide) in enumerate(slide_data):
+        slide = presentation.slides.add_slide(layout)
+        fill = slide.background.fill
+        fill.solid()
+        fill.fore_color.rgb = BACKGROUND_COLOR
+
+        title_box_height = 80 if is_title_slide else 50
+        add_text_box(slide, title, 20, 20, 720, title_box_height, 36, is_title=True)
+
+        if not is_title_slide and content:
+            content_text = "\n".join(point for item in content for point in item['bullet_points'])
+            add_text_box(slide, content_text, 40, 130, 660, 400, 18, add_bullets=True, line_spacing=1.5)
+
+        # Footer with slide number
+        add_text_box(slide, f"Slide {index + 1} of {len(slide_data)}", 20, 500, 100, 20, 12)
+
+    images_added = 0
+    for image in images or []:
+        if image:
+            add_image_slide(presentation, image)
+            images_added += 1
+
+    output = io.BytesIO()
+    presentation.save(output)
+    return output.getvalue(), len(slide_data), images_added
@@ -0,0 +1,131 @@
+# presentation_backends.py
+import asyncio
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from fastapi import HTTPException
+
+from config import PRESENTATION_BACKEND, PPTX_OUTPUT, PPTX_OUTPUT_FOLDER
+from helper.blob_storage import blob_storage
+from helper.image_ingest import get_session
+from helper.presentation_models import parse_presentation_input
+
+logger = logging.getLogger(__name__)
+
+PPTX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+
+class PresentationBackend(ABC):
+    """
+    Turns the slide JSON produced by the LLM (see helper.presentation_models) into a deck.
+    """
+    name = None
+
+    @abstractmethod
+    async def create_presentation(self, content_input: Dict[str, Any], image_urls: List[str] = None) -> dict:
+        """
+        :param content_input: Slide JSON with "slides" (or "content" holding "slides").
+        :param image_urls: Images to add to the deck.
+        :return: Dictionary with presentation_id, slides_created and public_url.
+        """
+
+
+class GoogleSlidesBackend(PresentationBackend):
+    """Builds the deck in Google Slides and shares it publicly."""
+    name = "google_slides"
+
+    async def create_presentation(self, content_input, image_urls=None):
+        # Imported on use: the service account is only needed when this backend is chosen
+        from helper import slides_generator_alternate
+        return await slides_generator_alternate.create_presentation(content_input, image_urls or [])
+
+
+class PptxBackend(PresentationBackend):
+    """Renders the deck locally with python-pptx and stores the .pptx in blob storage or on disk."""
+    name = "pptx"
+
+    def __init__(self, output: str = PPTX_OUTPUT, output_folder: str = PPTX_OUTPUT_FOLDER):
+        self.output = output
+        self.output_folder = output_folder
+
+    async def _download_image(self, url: str) -> Optional[bytes]:
+        try:
+            async with get_session().get(url) as response:
+                if response.status != 200:
+                    logger.error(f"Skipping image {url}: HTTP {response.status}")
+                    return None
+                return await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Skipping image {url}: {e}")
+            return None
+
+    def _write_file(self, file_name: str, data: bytes) -> str:
+        os.makedirs(self.output_folder, exist_ok=True)
+        file_path = os.path.join(self.output_folder, file_name)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        return file_path
+
+    async def create_presentation(self, content_input, image_urls=None):
+        # Imported on use: python-pptx is only needed when this backend is chosen
+        from helper.pptx_renderer import render_pptx
+
+        try:
+            presentation_data = parse_presentation_input(content_input)
+            images = await asyncio.gather(*(self._download_image(url) for url in image_urls or [] if url))
+            data, slides_created, images_added = await asyncio.to_thread(render_pptx, presentation_data, images)
+
+            presentation_id = uuid.uuid4().hex
+            file_name = f"{presentation_id}.pptx"
+            result = {
+                "presentation_id": presentation_id,
+                "slides_created": slides_created,
+                "images_added": images_added,
+            }
+            if self.output == "disk":
+                result["file_path"] = await asyncio.to_thread(self._write_file, file_name, data)
+                result["public_url"] = None
+            else:
+                result["public_url"] = await blob_storage.upload_stream(f"presentations/{file_name}", data, PPTX_CONTENT_TYPE)
+            logger.debug(f"Rendered {file_name} with {slides_created} slides and {images_added} images")
+            return result
+
+        except HTTPException:
+            raise
+        except KeyError as e:
+            logger.error(f"KeyError: {str(e)}")
+            raise HTTPException(status_code=400, detail=f"Missing required key in input: {str(e)}")
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+BACKENDS = {backend.name: backend for backend in (GoogleSlidesBackend(), PptxBackend())}
+
+
+def get_backend(name: Optional[str] = None) -> PresentationBackend:
+    """
+    Look up a presentation backend by name.
+
+    :param name: "google_slides" or "pptx"; None uses PRESENTATION_BACKEND from config.
+    """
+    name = name or PRESENTATION_BACKEND
+    if name not in BACKENDS:
+        raise HTTPException(status_code=422, detail=f"Unknown presentation backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]
+
+
+async def create_presentation(content_input: Dict[str, Any], image_urls: List[str] = None, backend: Optional[str] = None) -> dict:
+    """
+    Create a deck with the chosen backend.
+
+    :param content_input: Slide JSON with "slides" (or "content" holding "slides").
+    :param image_urls: Images to add to the deck.
+    :param backend: Backend name; None uses PRESENTATION_BACKEND from config.
+    :return: The backend's result: presentation_id, slides_created and public_url.
+    """
+    return await get_backend(backend).create_presentation(content_input, image_urls)
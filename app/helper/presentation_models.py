@@ -0,0 +1,39 @@
+# presentation_models.py
+import logging
+from typing import Any, Dict, List
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+class SlideContent(BaseModel):
+    title: str
+    content: List[Dict[str, Any]]
+
+class PresentationInput(BaseModel):
+    slides: List[SlideContent]
+
+
+def parse_presentation_input(content_input: Dict[str, Any]) -> PresentationInput:
+    """
+    Validate the slide JSON produced by the LLM, shared by every presentation backend.
+
+    :param content_input: Dictionary with "slides", or with "content" holding "slides".
+    :return: The validated presentation.
+    """
+    # Ensure content_input has the correct structure
+    if 'slides' not in content_input:
+        if 'content' in content_input and 'slides' in content_input['content']:
+            content_input = content_input['content']
+        else:
+            logger.error(f"Invalid content structure: {content_input}")
+            raise ValueError("Invalid content structure: 'slides' not found")
+
+    # Validate and convert the input
+    try:
+        return PresentationInput(**content_input)
+    except ValidationError as ve:
+        logger.error(f"Validation error: {ve}")
+        raise HTTPException(status_code=422, detail=f"Invalid input data: {ve}")
@@ -0,0 +1,77 @@
+# reranker.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from langchain.schema import Document
+
+from config import RERANKER_MODEL, RERANKER_BATCH_SIZE, RERANKER_THREADS, RERANKER_WORKERS
+from helper.services import services
+
+
+class Reranker:
+    """
+    Process-wide CrossEncoder reranker.
+
+    The model weights are loaded once (by the service warmup, or on first use) and every call scores
+    all (query, document) pairs it is given in a single batched predict, so a whole
+    competency tree costs one forward pass instead of one model load per part.
+    """
+    def __init__(self, model_name: str = RERANKER_MODEL, batch_size: int = RERANKER_BATCH_SIZE,
+                 num_threads: int = RERANKER_THREADS, workers: int = RERANKER_WORKERS):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.model = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reranker")
+
+    def load(self):
+        """Load the CrossEncoder weights if they are not loaded yet."""
+        with self._lock:
+            if self.model is None:
+                import torch
+                from sentence_transformers import CrossEncoder
+
+                if self.num_threads:
+                    torch.set_num_threads(self.num_threads)
+                self.model = CrossEncoder(self.model_name)
+                print(f"Reranker model '{self.model_name}' loaded")
+        return self.model
+
+    def rank(self, queries_with_docs: List[Tuple[str, List[Document]]]) -> List[List[Tuple[float, Document]]]:
+        """
+        Score every document against its query in one batched forward pass.
+
+        :param queries_with_docs: List of (query, documents) tuples, e.g. one per competency part.
+        :return: For each input tuple, a list of (score, document) sorted by descending score.
+        """
+        model = self.model or self.load()
+
+        pairs = []
+        for query, docs in queries_with_docs:
+            pairs.extend([query, doc.page_content] for doc in docs)
+
+        scores = model.predict(pairs, batch_size=self.batch_size) if pairs else []
+
+        ranked = []
+        offset = 0
+        for query, docs in queries_with_docs:
+            part_scores = scores[offset:offset + len(docs)]
+            offset += len(docs)
+            scored_docs = [(float(score), doc) for score, doc in zip(part_scores, docs)]
+            scored_docs.sort(key=lambda x: x[0], reverse=True)
+            ranked.append(scored_docs)
+        return ranked
+
+    async def arank(self, queries_with_docs: List[Tuple[str, List[Document]]]) -> List[List[Tuple[float, Document]]]:
+        """Run rank() on the reranker worker pool so the event loop stays free."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.rank, queries_with_docs)
+
+
+reranker = Reranker()
+
+# Loading the weights is left to the warmup, after the server is listening
+services.register("reranker", reranker.load)
@@ -0,0 +1,67 @@
+# services.py
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class ServiceRegistry:
+    """
+    Process-wide clients that are expensive to create: SDK imports, credentials, API discovery
+    documents, model weights.
+
+    Each service is created by its factory on first use, or by warmup() in the background once
+    the server is listening, so importing the app doesn't pay for clients a worker may never use.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._instances = {}
+        self._warmup: List[str] = []
+        self.init_times: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable, warmup: bool = True):
+        """
+        :param name: Name the service is looked up by.
+        :param factory: Called without arguments, once, to create the service.
+        :param warmup: Whether warmup() creates the service ahead of its first use.
+        """
+        self._factories[name] = factory
+        self._locks[name] = threading.Lock()
+        if warmup and name not in self._warmup:
+            self._warmup.append(name)
+
+    def get(self, name: str):
+        """Return the service, creating it first if needed. Safe to call from any thread."""
+        if name in self._instances:
+            return self._instances[name]
+        with self._locks[name]:
+            if name not in self._instances:
+                start = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self.init_times[name] = time.perf_counter() - start
+                print(f"Service '{name}' initialized in {self.init_times[name]:.2f}s")
+            return self._instances[name]
+
+    def loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def discard(self, name: str):
+        """Forget a created service so the next get() creates a new one. Returns the old one, or None."""
+        with self._locks[name]:
+            return self._instances.pop(name, None)
+
+    async def warmup(self, names: Optional[List[str]] = None):
+        """
+        Create services ahead of their first use, one after the other and off the event loop.
+        A service that fails to initialize is reported and left to fail again on first use.
+        """
+        for name in names or list(self._warmup):
+            try:
+                await asyncio.to_thread(self.get, name)
+            except Exception as e:
+                print(f"Warmup of service '{name}' failed: {e}")
+
+
+services = ServiceRegistry()
@@ -1,39 +1,29 @@
 # slides_generator.py
-import os
+import asyncio
 from fastapi import  HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Any
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from helper.google_clients import slides_service, drive_service, authorized_http
 import textwrap
-import uuid
 
 import logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Configure the Google Slides API client
-SCOPES = ['https://www.googleapis.com/auth/presentations', 'https://www.googleapis.com/auth/drive']
-# SERVICE_ACCOUNT_FILE = './helper/service_account.json'
-SERVICE_ACCOUNT_FILE = os.path.expanduser("./helper/service_account.json") 
-
-credentials = service_account.Credentials.from_service_account_file(
-    SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-slides_service = build('slides', 'v1', credentials=credentials)
-drive_service = build('drive', 'v3', credentials=credentials)
-
 
 def create_slide_requests(slide_data, insertion_index=0):
-    slide_id = str(uuid.uuid4())
-    
+    # Object ids are chosen here, so later requests in the same batchUpdate can refer to them
+    slide_id = f'slide_{insertion_index}'
+
+    # A blank layout has no placeholders, so nothing has to be looked up and deleted afterwards
     requests = [
         {
             'createSlide': {
                 'objectId': slide_id,
-                'insertionIndex': str(insertion_index),
+                'insertionIndex': insertion_index,
                 'slideLayoutReference': {
-                    'predefinedLayout': 'TITLE_AND_BODY'
+                    'predefinedLayout': 'BLANK'
                 },
             }
         }
@@ -65,235 +55,250 @@ def split_content(content, max_chars_per_slide=250):
 
 
 
-async def create_presentation(content_input: Dict[str, Any], image_urls: List[str] = None):
-    if image_urls is None:
-        image_urls = []  
-    try:
-        logger.debug(f"Received image_urls: {image_urls}")
-        logger.debug(f"Received content_input: {content_input}")
-        
-        presentation = slides_service.presentations().create(body={}).execute()
-        presentation_id = presentation['presentationId']
-        logger.debug(f"Created presentation with ID: {presentation_id}")
-
-        requests = []
-        slide_data = []
-        
-        # Create title slide
-        title_slide_requests, title_slide_id, _, _ = create_slide_requests({'title': content_input['slides'][0]['title'], 'content': []}, 0)
-        requests.extend(title_slide_requests)
-        slide_data.append((title_slide_id, content_input['slides'][0]['title'], None, True))  # True indicates it's a title slide
-
-        # Create a slide for each heading
-        for index, content_item in enumerate(content_input['slides'][0]['content'], start=1):
-            slide_requests, slide_id, _, _ = create_slide_requests({'title': content_item['heading'], 'content': [content_item]}, index)
-            requests.extend(slide_requests)
-            slide_data.append((slide_id, content_item['heading'], [content_item], False))  # False indicates it's not a title slide
-
-        # Execute the requests to create slides
-        try:
-            body = {'requests': requests}
-            response = slides_service.presentations().batchUpdate(
-                presentationId=presentation_id, body=body).execute()
-            logger.debug(f"Created {len(slide_data)} slides")
-        except HttpError as api_error:
-            logger.error(f"Google Slides API error: {api_error}")
-            logger.error(f"Error details: {api_error.error_details}")
-            raise HTTPException(status_code=500, detail=f"Google Slides API error: {str(api_error)}")
-
-        # Clear existing content and add new content
-        content_requests = []
-        image_index = 0
-        for index, (slide_id, title, content, is_title_slide) in enumerate(slide_data):
-            logger.debug(f"Processing slide {index + 1} with ID: {slide_id}")
-            
-            # Get the slide
-            slide = slides_service.presentations().pages().get(
-                presentationId=presentation_id,
-                pageObjectId=slide_id
-            ).execute()
-
-            # Remove all existing elements from the slide
-            for element in slide.get('pageElements', []):
-                content_requests.append({
-                    'deleteObject': {
-                        'objectId': element['objectId']
-                    }
-                })
-
-            # Create a new text box for title
-            title_box_id = f'title_box_{index}'
-            content_requests.extend([
-                {
-                    'createShape': {
-                        'objectId': title_box_id,
-                        'shapeType': 'TEXT_BOX',
-                        'elementProperties': {
-                            'pageObjectId': slide_id,
-                            'size': {
-                                'width': {'magnitude': 720, 'unit': 'PT'},
-                                'height': {'magnitude': 50, 'unit': 'PT'}
-                            },
-                            'transform': {
-                                'scaleX': 1,
-                                'scaleY': 1,
-                                'translateX': 0,
-                                'translateY': 0,
-                                'unit': 'PT'
-                            }
-                        }
+def create_content_requests(slide_id, index, title, content, is_title_slide, image_url=None):
+    """
+    Build the requests that fill one slide: title box, content box and image.
+
+    :param slide_id: Object id of the slide.
+    :param index: Position of the slide, used for the object ids of its elements.
+    :param title: Title text of the slide.
+    :param content: Content items (heading and bullet_points) of the slide, or None.
+    :param is_title_slide: Whether the slide only has a title.
+    :param image_url: Optional image to place next to the content.
+    :return: List of batchUpdate requests.
+    """
+    # Create a new text box for title
+    title_box_id = f'title_box_{index}'
+    requests = [
+        {
+            'createShape': {
+                'objectId': title_box_id,
+                'shapeType': 'TEXT_BOX',
+                'elementProperties': {
+                    'pageObjectId': slide_id,
+                    'size': {
+                        'width': {'magnitude': 720, 'unit': 'PT'},
+                        'height': {'magnitude': 50, 'unit': 'PT'}
+                    },
+                    'transform': {
+                        'scaleX': 1,
+                        'scaleY': 1,
+                        'translateX': 0,
+                        'translateY': 0,
+                        'unit': 'PT'
                     }
+                }
+            }
+        },
+        {
+            'insertText': {
+                'objectId': title_box_id,
+                'insertionIndex': 0,
+                'text': title
+            }
+        },
+        {
+            'updateTextStyle': {
+                'objectId': title_box_id,
+                'style': {
+                    'fontSize': {'magnitude': 24, 'unit': 'PT'},
+                    'foregroundColor': {'opaqueColor': {'rgbColor': {'red': 0.2, 'green': 0.2, 'blue': 0.2}}},
+                    'bold': True
                 },
-                {
-                    'insertText': {
-                        'objectId': title_box_id,
-                        'insertionIndex': 0,
-                        'text': title
-                    }
+                'textRange': {'type': 'ALL'},
+                'fields': 'fontSize,foregroundColor,bold'
+            }
+        }
+    ]
+
+    if is_title_slide:
+        return requests
+
+    # Create a new text box for content
+    content_box_id = f'content_box_{index}'
+    requests.append({
+        'createShape': {
+            'objectId': content_box_id,
+            'shapeType': 'TEXT_BOX',
+            'elementProperties': {
+                'pageObjectId': slide_id,
+                'size': {
+                    'width': {'magnitude': 340, 'unit': 'PT'},
+                    'height': {'magnitude': 400, 'unit': 'PT'}
                 },
-                {
-                    'updateTextStyle': {
-                        'objectId': title_box_id,
-                        'style': {
-                            'fontSize': {'magnitude': 24, 'unit': 'PT'},
-                            'foregroundColor': {'opaqueColor': {'rgbColor': {'red': 0.2, 'green': 0.2, 'blue': 0.2}}},
-                            'bold': True
-                        },
-                        'textRange': {'type': 'ALL'},
-                        'fields': 'fontSize,foregroundColor,bold'
-                    }
+                'transform': {
+                    'scaleX': 1,
+                    'scaleY': 1,
+                    'translateX': 20,
+                    'translateY': 70,
+                    'unit': 'PT'
                 }
-            ])
-
-            if not is_title_slide:
-                # Create a new text box for content
-                content_box_id = f'content_box_{index}'
-                content_requests.extend([
-                    {
-                        'createShape': {
-                            'objectId': content_box_id,
-                            'shapeType': 'TEXT_BOX',
-                            'elementProperties': {
-                                'pageObjectId': slide_id,
-                                'size': {
-                                    'width': {'magnitude': 340, 'unit': 'PT'},
-                                    'height': {'magnitude': 400, 'unit': 'PT'}
-                                },
-                                'transform': {
-                                    'scaleX': 1,
-                                    'scaleY': 1,
-                                    'translateX': 20,
-                                    'translateY': 70,
-                                    'unit': 'PT'
+            }
+        }
+    })
+
+    if content:
+        content_text = ""
+        for item in content:
+            for point in item['bullet_points']:
+                content_text += f"• {point}\n"
+
+        requests.extend([
+            {
+                'insertText': {
+                    'objectId': content_box_id,
+                    'insertionIndex': 0,
+                    'text': content_text
+                }
+            },
+            {
+                'updateTextStyle': {
+                    'objectId': content_box_id,
+                    'style': {
+                        'foregroundColor': {'opaqueColor': {'rgbColor': {'red': 1, 'green': 1, 'blue': 1}}},
+                        'fontSize': {'magnitude': 14, 'unit': 'PT'}
+                    },
+                    'textRange': {'type': 'ALL'},
+                    'fields': 'foregroundColor,fontSize'
+                }
+            },
+            {
+                'updateShapeProperties': {
+                    'objectId': content_box_id,
+                    'shapeProperties': {
+                        'shapeBackgroundFill': {
+                            'solidFill': {
+                                'color': {
+                                    'rgbColor': {'red': 0, 'green': 0, 'blue': 0.8}
                                 }
                             }
                         }
+                    },
+                    'fields': 'shapeBackgroundFill.solidFill.color'
+                }
+            }
+        ])
+
+    # Add image if available
+    if image_url:
+        requests.append({
+            'createImage': {
+                'objectId': f'image_{index}',
+                'url': image_url,
+                'elementProperties': {
+                    'pageObjectId': slide_id,
+                    'size': {
+                        'width': {'magnitude': 350, 'unit': 'PT'},
+                        'height': {'magnitude': 262.5, 'unit': 'PT'}
+                    },
+                    'transform': {
+                        'scaleX': 1,
+                        'scaleY': 1,
+                        'translateX': 360,
+                        'translateY': 70,
+                        'unit': 'PT'
                     }
-                ])
-
-                if content:
-                    content_text = ""
-                    for item in content:
-                        for point in item['bullet_points']:
-                            content_text += f"• {point}\n"
-
-                    content_requests.extend([
-                        {
-                            'insertText': {
-                                'objectId': content_box_id,
-                                'insertionIndex': 0,
-                                'text': content_text
-                            }
-                        },
-                        {
-                            'updateTextStyle': {
-                                'objectId': content_box_id,
-                                'style': {
-                                    'foregroundColor': {'opaqueColor': {'rgbColor': {'red': 1, 'green': 1, 'blue': 1}}},
-                                    'fontSize': {'magnitude': 14, 'unit': 'PT'}
-                                },
-                                'textRange': {'type': 'ALL'},
-                                'fields': 'foregroundColor,fontSize'
-                            }
-                        },
-                        {
-                            'updateShapeProperties': {
-                                'objectId': content_box_id,
-                                'shapeProperties': {
-                                    'shapeBackgroundFill': {
-                                        'solidFill': {
-                                            'color': {
-                                                'rgbColor': {'red': 0, 'green': 0, 'blue': 0.8}
-                                            }
-                                        }
-                                    }
-                                },
-                                'fields': 'shapeBackgroundFill.solidFill.color'
-                            }
-                        }
-                    ])
-
-                # Add image if available
-                if image_index < len(image_urls) and image_urls[image_index]:
-                    image_id = f'image_{image_index}'
-                    content_requests.append({
-                        'createImage': {
-                            'objectId': image_id,
-                            'url': image_urls[image_index],
-                            'elementProperties': {
-                                'pageObjectId': slide_id,
-                                'size': {
-                                    'width': {'magnitude': 350, 'unit': 'PT'},
-                                    'height': {'magnitude': 262.5, 'unit': 'PT'}
-                                },
-                                'transform': {
-                                    'scaleX': 1,
-                                    'scaleY': 1,
-                                    'translateX': 360,
-                                    'translateY': 70,
-                                    'unit': 'PT'
-                                }
-                            }
-                        }
-                    })
-                    
-                    logger.debug(f"Added image: {image_urls[image_index]}")
-                    image_index += 1
-
-        # Execute content update and image insertion requests
-        if content_requests:
-            try:
-                body = {'requests': content_requests}
-                response = slides_service.presentations().batchUpdate(
-                    presentationId=presentation_id, body=body).execute()
-                logger.debug("Successfully updated slides with text and images")
-            except HttpError as api_error:
-                logger.error(f"Google Slides API error during content update: {api_error}")
-                logger.error(f"Error details: {api_error.error_details}")
-                raise HTTPException(status_code=500, detail=f"Google Slides API error during content update: {str(api_error)}")
-
-        # Set the presentation to be publicly accessible
-        drive_service.permissions().create(
-            fileId=presentation_id,
-            body={
-                'type': 'anyone',
-                'role': 'reader'
+                }
             }
-        ).execute()
-        logger.debug("Set presentation to be publicly accessible")
+        })
+
+    return requests
+
+
+def build_deck_requests(content_input, image_urls):
+    """
+    Build every request of the deck, so it can be sent in a single batchUpdate.
+
+    :return: The requests, the number of slides and the number of images placed.
+    """
+    slide_data = []
+
+    # Title slide
+    slide_data.append((content_input['slides'][0]['title'], None, True))  # True indicates it's a title slide
+
+    # A slide for each heading
+    for content_item in content_input['slides'][0]['content']:
+        slide_data.append((content_item['heading'], [content_item], False))
+
+    requests = []
+    image_index = 0
+    for index, (title, content, is_title_slide) in enumerate(slide_data):
+        slide_requests, slide_id, _, _ = create_slide_requests({'title': title, 'content': content}, index)
+        requests.extend(slide_requests)
+
+        image_url = None
+        if not is_title_slide and image_index < len(image_urls):
+            image_url = image_urls[image_index]
+            image_index += 1
+
+        requests.extend(create_content_requests(slide_id, index, title, content, is_title_slide, image_url))
+
+    images_added = sum(1 for url in image_urls[:image_index] if url)
+    return requests, len(slide_data), images_added
+
+
+def build_deck(title, requests):
+    """
+    Create the presentation, build it in one batchUpdate and share it: three API round trips.
+
+    Blocking; runs off the event loop.
+
+    :param title: Title of the presentation.
+    :param requests: Requests from build_deck_requests.
+    :return: The presentation id.
+    """
+    # The API clients are built on first use; this build gets its own transport
+    http = authorized_http()
+    presentation = slides_service().presentations().create(body={'title': title}).execute(http=http)
+    presentation_id = presentation['presentationId']
+    logger.debug(f"Created presentation with ID: {presentation_id}")
+
+    # A new presentation starts with one slide of its own; it is removed in the same batch
+    default_slides = [{'deleteObject': {'objectId': slide['objectId']}} for slide in presentation.get('slides', [])]
+
+    slides_service().presentations().batchUpdate(
+        presentationId=presentation_id, body={'requests': requests + default_slides}).execute(http=http)
+    logger.debug(f"Built presentation with {len(requests)} requests in one batchUpdate")
+
+    # Set the presentation to be publicly accessible
+    drive_service().permissions().create(
+        fileId=presentation_id,
+        body={
+            'type': 'anyone',
+            'role': 'reader'
+        }
+    ).execute(http=http)
+    logger.debug("Set presentation to be publicly accessible")
+
+    return presentation_id
+
+
+async def create_presentation(content_input: Dict[str, Any], image_urls: List[str] = None):
+    if image_urls is None:
+        image_urls = []
+    try:
+        logger.debug(f"Received image_urls: {image_urls}")
+        logger.debug(f"Received content_input: {content_input}")
+
+        requests, slides_created, images_added = build_deck_requests(content_input, image_urls)
+        presentation_id = await asyncio.to_thread(build_deck, content_input['slides'][0]['title'], requests)
 
         presentation_url = f"https://docs.google.com/presentation/d/{presentation_id}/edit?usp=sharing"
 
         return {
-            "presentation_id": presentation_id, 
-            "slides_created": len(slide_data),
-            "images_added": image_index,
+            "presentation_id": presentation_id,
+            "slides_created": slides_created,
+            "images_added": images_added,
             "public_url": presentation_url
         }
 
+    except HttpError as api_error:
+        logger.error(f"Google Slides API error: {api_error}")
+        logger.error(f"Error details: {api_error.error_details}")
+        raise HTTPException(status_code=500, detail=f"Google Slides API error: {str(api_error)}")
     except KeyError as e:
         logger.error(f"KeyError: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Missing required key in input: {str(e)}")
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,34 +1,16 @@
-import os
+import asyncio
 from fastapi import HTTPException
-from pydantic import BaseModel, ValidationError
 import json
 from typing import List, Dict, Any
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from helper.google_clients import slides_service, drive_service, authorized_http
+from helper.presentation_models import SlideContent, PresentationInput, parse_presentation_input
 import uuid
 import logging
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Constants
-SCOPES = ['https://www.googleapis.com/auth/presentations', 'https://www.googleapis.com/auth/drive']
-SERVICE_ACCOUNT_FILE = os.path.expanduser("./helper/service_account.json")
-#SERVICE_ACCOUNT_FILE = os.path.expanduser("~/DocAppBackend/app/helper/service_account.json")
-
-# Configure the Google Slides API client
-credentials = service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-slides_service = build('slides', 'v1', credentials=credentials)
-drive_service = build('drive', 'v3', credentials=credentials)
-
-class SlideContent(BaseModel):
-    title: str
-    content: List[Dict[str, Any]]
-
-class PresentationInput(BaseModel):
-    slides: List[SlideContent]
-
 def create_slide_requests(slide_data: SlideContent, insertion_index: int = 0):
     slide_id = str(uuid.uuid4())
     return [{
@@ -136,39 +118,49 @@ def create_text_box(slide_id: str, box_id: str, text: str, x: int, y: int, width
     
     return requests
 
+def build_deck(title: str, requests: List[Dict[str, Any]]) -> str:
+    """
+    Create the presentation, build the whole deck in one batchUpdate and share it:
+    three API round trips however many slides the deck has.
+
+    Blocking; runs off the event loop.
+
+    :param title: Title of the presentation (and of its Drive file).
+    :param requests: Every slide, text box, style and image request of the deck.
+    :return: The presentation id.
+    """
+    # The API clients are built on first use; this build gets its own transport
+    http = authorized_http()
+    presentation = slides_service().presentations().create(body={'title': title}).execute(http=http)
+    presentation_id = presentation['presentationId']
+    logger.debug(f"Created presentation with ID: {presentation_id}")
+
+    # A new presentation starts with one slide of its own; it is removed in the same batch
+    default_slides = [{'deleteObject': {'objectId': slide['objectId']}} for slide in presentation.get('slides', [])]
+
+    body = {'requests': requests + default_slides}
+    slides_service().presentations().batchUpdate(presentationId=presentation_id, body=body).execute(http=http)
+    logger.debug(f"Built presentation with {len(requests)} requests in one batchUpdate")
+
+    # Set the presentation to be publicly accessible
+    drive_service().permissions().create(
+        fileId=presentation_id,
+        body={'type': 'anyone', 'role': 'writer'}
+    ).execute(http=http)
+    logger.debug("Set presentation to be publicly accessible")
+
+    return presentation_id
+
 async def create_presentation(content_input: Dict[str, Any], image_urls: List[str] = None):
     try:
         logger.debug(f"Received content_input: {json.dumps(content_input, indent=2)}")
         logger.debug(f"Received image_urls: {image_urls}")
 
-        # Ensure content_input has the correct structure
-        if 'slides' not in content_input:
-            if 'content' in content_input and 'slides' in content_input['content']:
-                content_input = content_input['content']
-            else:
-                logger.error(f"Invalid content structure: {content_input}")
-                raise ValueError("Invalid content structure: 'slides' not found")
-
-        # Validate and convert the input
-        try:
-            presentation_data = PresentationInput(**content_input)
-        except ValidationError as ve:
-            logger.error(f"Validation error: {ve}")
-            raise HTTPException(status_code=422, detail=f"Invalid input data: {ve}")
+        presentation_data = parse_presentation_input(content_input)
 
-        presentation = slides_service.presentations().create(body={}).execute()
-        presentation_id = presentation['presentationId']
-        logger.debug(f"Created presentation with ID: {presentation_id}")
-
-        # Get the title of the first slide
+        # Get the title of the first slide; it names the presentation
         first_slide_title = presentation_data.slides[0].title
 
-        # Rename the presentation file in Google Drive
-        drive_service.files().update(
-            fileId=presentation_id,
-            body={'name': first_slide_title}
-        ).execute()
-
         requests = []
         slide_data = []
 
@@ -183,16 +175,10 @@ async def create_presentation(content_input: Dict[str, Any], image_urls: List[st
             requests.extend(slide_requests)
             slide_data.append((slide_id, content_item['heading'], [content_item], False))
 
-        # Execute slide creation requests
-        body = {'requests': requests}
-        slides_service.presentations().batchUpdate(presentationId=presentation_id, body=body).execute()
-        logger.debug(f"Created {len(slide_data)} slides")
-
-        # Add content to slides
-        content_requests = []
+        # Add content to slides; the slide ids were chosen above, so this goes in the same batch
         for index, (slide_id, title, content, is_title_slide) in enumerate(slide_data):
             # Add background color
-            content_requests.append({
+            requests.append({
                 'updatePageProperties': {
                     'objectId': slide_id,
                     'pageProperties': {
@@ -206,36 +192,25 @@ async def create_presentation(content_input: Dict[str, Any], image_urls: List[st
 
             # Add title box
             title_box_height = 80 if is_title_slide else 50
-            content_requests.extend(create_text_box(slide_id, f'title_box_{index}', title, 20, 20, 720, title_box_height, 36, True))
+            requests.extend(create_text_box(slide_id, f'title_box_{index}', title, 20, 20, 720, title_box_height, 36, True))
 
             if not is_title_slide and content:
                 # Add bullet point content
                 bullet_point_padding = 130
                 content_text = "\n".join(point for item in content for point in item['bullet_points'])
-                content_requests.extend(create_text_box(slide_id, f'content_box_{index}', content_text, 40, bullet_point_padding, 660, 400, 18, add_bullets=True, line_spacing=150))
+                requests.extend(create_text_box(slide_id, f'content_box_{index}', content_text, 40, bullet_point_padding, 660, 400, 18, add_bullets=True, line_spacing=150))
 
             # Add footer with slide number
-            content_requests.extend(create_text_box(slide_id, f'footer_text_{index}', f"Slide {index + 1} of {len(slide_data)}", 20, 500, 100, 20, 12))
+            requests.extend(create_text_box(slide_id, f'footer_text_{index}', f"Slide {index + 1} of {len(slide_data)}", 20, 500, 100, 20, 12))
 
-        # Add image slides
+        # Add image slides after the content slides, in order
         if image_urls:
-            for image_url in image_urls:
-                if image_url:
-                    image_requests, image_slide_id = create_image_slide(image_url, len(slide_data) + 1)
-                    content_requests.extend(image_requests)
-                    logger.debug(f"Added image slide for URL: {image_url}")
-
-        # Execute content update requests
-        body = {'requests': content_requests}
-        slides_service.presentations().batchUpdate(presentationId=presentation_id, body=body).execute()
-        logger.debug("Successfully updated slides with text and images")
+            for image_index, image_url in enumerate(url for url in image_urls if url):
+                image_requests, image_slide_id = create_image_slide(image_url, len(slide_data) + image_index)
+                requests.extend(image_requests)
+                logger.debug(f"Added image slide for URL: {image_url}")
 
-        # Set the presentation to be publicly accessible
-        drive_service.permissions().create(
-            fileId=presentation_id,
-            body={'type': 'anyone', 'role': 'writer'}
-        ).execute()
-        logger.debug("Set presentation to be publicly accessible")
+        presentation_id = await asyncio.to_thread(build_deck, first_slide_title, requests)
 
         presentation_url = f"https://docs.google.com/presentation/d/{presentation_id}/edit?usp=sharing"
 
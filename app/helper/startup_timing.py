@@ -0,0 +1,39 @@
+# startup_timing.py
+import importlib
+import time
+from typing import Dict
+
+from helper.services import services
+
+# Set when main.py starts importing the app
+STARTED = time.perf_counter()
+
+import_times: Dict[str, float] = {}
+
+
+def import_timed(module_name: str):
+    """
+    Import a module and record how long it took.
+
+    Modules shared by several routers are charged to the first one that imports them, so
+    main.py times its core modules before the routers.
+    """
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    import_times[module_name] = time.perf_counter() - start
+    return module
+
+
+def print_import_report():
+    """Print the import cost of each timed module, most expensive first, and the time since STARTED."""
+    print("Startup import times:")
+    for module_name, seconds in sorted(import_times.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {module_name:<45} {seconds:6.2f}s")
+    print(f"Startup: app ready {time.perf_counter() - STARTED:.2f}s after import started")
+
+
+def print_services_report():
+    """Print the initialization cost of each service created so far."""
+    print("Service init times:")
+    for name, seconds in sorted(services.init_times.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {name:<45} {seconds:6.2f}s")
@@ -1,4 +1,18 @@
 # websocket_connections.py
+import json
 
 # A set to store active WebSocket connections
-active_websockets = set()
\ No newline at end of file
+active_websockets = set()
+
+
+async def broadcast(message: dict):
+    """
+    Send a JSON message to every connected client, dropping connections that fail.
+    """
+    data = json.dumps(message)
+    for websocket in list(active_websockets):
+        try:
+            await websocket.send_text(data)
+        except Exception as e:
+            print(f"Dropping websocket after failed send: {e}")
+            active_websockets.discard(websocket)
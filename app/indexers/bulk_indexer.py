@@ -0,0 +1,163 @@
+import hashlib
+import json
+import uuid
+from typing import Callable, List, Optional
+
+from langchain.schema import Document
+from langchain_community.vectorstores import Chroma
+
+from config import EMBEDDING_BATCH_MAX_TOKENS, EMBEDDING_BATCH_MAX_INPUTS
+from db.db import record_manager
+from indexers.chunking import count_tokens, get_splitter, strategy_for
+
+# Namespace of LangChain's index() uids (langchain_core.indexing.api.NAMESPACE_UUID)
+CHUNK_NAMESPACE = uuid.UUID(int=1984)
+
+
+def _hash_to_uuid(value: str) -> str:
+    return str(uuid.uuid5(CHUNK_NAMESPACE, hashlib.sha1(value.encode("utf-8")).hexdigest()))
+
+
+def chunk_id(doc: Document) -> str:
+    """
+    Deterministic id of a chunk: hash of its content and metadata.
+    The id is used both as the Chroma id and as the record manager key, and is the same
+    uid LangChain's index() gives the chunk (_HashedDocument), so both indexing paths
+    recognise each other's records in the shared record manager.
+    """
+    content_hash = _hash_to_uuid(doc.page_content)
+    metadata_hash = _hash_to_uuid(json.dumps(doc.metadata, sort_keys=True))
+    return _hash_to_uuid(content_hash + metadata_hash)
+
+
+def batch_by_tokens(docs: List[Document], max_tokens: int = EMBEDDING_BATCH_MAX_TOKENS,
+                    max_inputs: int = EMBEDDING_BATCH_MAX_INPUTS) -> List[List[Document]]:
+    """
+    Group chunks into embedding batches that stay under the provider's per-request limits.
+    """
+    batches = []
+    current, current_tokens = [], 0
+    for doc in docs:
+        tokens = count_tokens(doc.page_content)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(doc)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def bulk_index_documents(docs: List[Document], sources: List[str], store: Chroma,
+                         on_progress: Optional[Callable[[int, int], None]] = None,
+                         should_stop: Optional[Callable[[], bool]] = None) -> dict:
+    """
+    Index already split chunks for a set of sources in as few requests as possible.
+
+    Chunks are deduplicated by id, only chunks the record manager does not know yet are
+    embedded (in token-sized batches) and written with batched Chroma `upsert` calls, and
+    chunks of the given sources that were not part of this run are deleted afterwards
+    (the same effect as LangChain's index(..., cleanup="incremental")).
+
+    :param docs: The chunks; each must carry a "source" metadata value.
+    :param sources: Every source being (re)indexed, including ones that produced no chunks.
+    :param store: The shared LangChain Chroma wrapper (see db.db.get_vector_store).
+    :param on_progress: Called with (batches done, total batches) after each batch is written.
+    :param should_stop: Checked between batches; when it returns True indexing stops early.
+    :return: Counters for the whole run and per source.
+    """
+    # same clock as the record manager, as LangChain's index() does
+    index_start = record_manager.get_time()
+    collection = store._collection
+    embeddings = store.embeddings
+
+    unique_docs = {}
+    for doc in docs:
+        unique_docs.setdefault(chunk_id(doc), doc)
+    ids = list(unique_docs.keys())
+
+    per_source = {source: {"chunk_count": 0, "num_added": 0} for source in sources}
+    for doc in unique_docs.values():
+        per_source.setdefault(doc.metadata["source"], {"chunk_count": 0, "num_added": 0})["chunk_count"] += 1
+
+    exists = record_manager.exists(ids) if ids else []
+    existing_ids = [doc_id for doc_id, found in zip(ids, exists) if found]
+    new_docs = [unique_docs[doc_id] for doc_id, found in zip(ids, exists) if not found]
+
+    # Chunks already in the store only need their record timestamps refreshed
+    if existing_ids:
+        record_manager.update(
+            existing_ids,
+            group_ids=[unique_docs[doc_id].metadata["source"] for doc_id in existing_ids],
+            time_at_least=index_start,
+        )
+
+    batches = batch_by_tokens(new_docs)
+    for batch_number, batch in enumerate(batches, start=1):
+        if should_stop and should_stop():
+            print("Bulk indexing stopped before completion")
+            return {"stopped": True, "num_added": sum(s["num_added"] for s in per_source.values()),
+                    "num_skipped": len(existing_ids), "num_deleted": 0, "sources": per_source}
+
+        batch_ids = [chunk_id(doc) for doc in batch]
+        vectors = embeddings.embed_documents([doc.page_content for doc in batch])
+        # upsert, so a chunk whose vector outlived its record is overwritten rather than rejected
+        collection.upsert(
+            ids=batch_ids,
+            embeddings=vectors,
+            documents=[doc.page_content for doc in batch],
+            metadatas=[doc.metadata for doc in batch],
+        )
+        record_manager.update(
+            batch_ids,
+            group_ids=[doc.metadata["source"] for doc in batch],
+            time_at_least=index_start,
+        )
+        for doc in batch:
+            per_source[doc.metadata["source"]]["num_added"] += 1
+        print(f"Indexed batch {batch_number}/{len(batches)} ({len(batch)} chunks)")
+        if on_progress:
+            on_progress(batch_number, len(batches))
+
+    # Remove chunks of these sources that did not come back in this run
+    num_deleted = 0
+    stale_ids = record_manager.list_keys(group_ids=list(per_source.keys()), before=index_start)
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+        record_manager.delete_keys(stale_ids)
+        num_deleted = len(stale_ids)
+
+    return {
+        "num_added": len(new_docs),
+        "num_updated": 0,
+        "num_skipped": len(existing_ids),
+        "num_deleted": num_deleted,
+        "embedding_batches": len(batches),
+        "sources": per_source,
+    }
+
+
+def bulk_index_texts(items: List[dict], store: Chroma, on_progress: Optional[Callable[[int, int], None]] = None,
+                     should_stop: Optional[Callable[[], bool]] = None) -> dict:
+    """
+    Split and index many texts (e.g. all chapters of a request) in one bulk pass.
+
+    :param items: Dictionaries with "text", "source_id" and optional "file_name" and "chunk_strategy"
+                  (defaults to the strategy configured for "text" sources).
+    :param store: The shared LangChain Chroma wrapper (see db.db.get_vector_store).
+    :param on_progress: Called with (batches done, total batches) after each batch is written.
+    :param should_stop: Checked between batches; when it returns True indexing stops early.
+    :return: Counters for the whole run and per source.
+    """
+    splitters = {}
+    docs = []
+    for item in items:
+        strategy = item.get("chunk_strategy") or strategy_for("text")
+        if strategy not in splitters:
+            splitters[strategy] = get_splitter(strategy)
+        doc = Document(page_content=item["text"], metadata={"source": item["source_id"], "file_name": item.get("file_name", "")})
+        docs.extend(splitters[strategy].split_documents([doc]))
+
+    print(f"Bulk indexing {len(items)} texts as {len(docs)} chunks")
+    return bulk_index_documents(docs, [item["source_id"] for item in items], store, on_progress, should_stop)
@@ -0,0 +1,153 @@
+# chunking.py
+import re
+from typing import List
+
+from langchain.schema import Document
+from langchain.text_splitter import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+
+from config import (
+    CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_STRATEGIES,
+    SENTENCE_WINDOW_SIZE, SENTENCE_WINDOW_TOKENS,
+)
+from helper.services import services
+
+# Tokenizer of the embedding model (text-embedding-3-large uses cl100k_base)
+ENCODING_NAME = "cl100k_base"
+
+STRATEGIES = ("recursive", "token", "heading", "sentence_window")
+
+_sentence_end = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"(\[])')
+
+
+def _load_encoding():
+    # tiktoken downloads the BPE file on first use when it is not cached yet
+    import tiktoken
+    return tiktoken.get_encoding(ENCODING_NAME)
+
+
+services.register("tiktoken", _load_encoding)
+
+
+def count_tokens(text: str) -> int:
+    return len(services.get("tiktoken").encode(text, disallowed_special=()))
+
+
+def _token_splitter(chunk_size: int = CHUNK_TOKENS, chunk_overlap: int = CHUNK_OVERLAP_TOKENS):
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name=ENCODING_NAME,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+
+
+class HeadingAwareSplitter:
+    """
+    Splits markdown on its "#"/"##" headings first (e.g. the "# {chapter_title}" chapters built
+    by the PDF router), then token-splits each section. The heading path is kept in the metadata
+    and the text, so every chunk knows which chapter and section it came from.
+    """
+
+    def __init__(self):
+        self.header_splitter = MarkdownHeaderTextSplitter(
+            headers_to_split_on=[("#", "chapter"), ("##", "section")],
+            strip_headers=False,
+        )
+        self.token_splitter = _token_splitter()
+
+    def split_documents(self, docs: List[Document]) -> List[Document]:
+        chunks = []
+        for doc in docs:
+            for section in self.header_splitter.split_text(doc.page_content):
+                metadata = {**doc.metadata, **section.metadata}
+                chunks.extend(self.token_splitter.split_documents(
+                    [Document(page_content=section.page_content, metadata=metadata)]
+                ))
+        return chunks
+
+
+class SentenceWindowSplitter:
+    """
+    Embeds small groups of sentences for precise matching, and stores the surrounding
+    sentences in the "window" metadata so callers can show the wider context.
+    """
+
+    def __init__(self, window_size: int = SENTENCE_WINDOW_SIZE, max_tokens: int = SENTENCE_WINDOW_TOKENS):
+        self.window_size = window_size
+        self.max_tokens = max_tokens
+        self.token_splitter = _token_splitter(max_tokens, 0)
+
+    def split_documents(self, docs: List[Document]) -> List[Document]:
+        chunks = []
+        for doc in docs:
+            sentences = [s.strip() for s in _sentence_end.split(doc.page_content) if s.strip()]
+            groups = self._group(sentences)
+            for i, group in enumerate(groups):
+                window = groups[max(0, i - self.window_size):i + self.window_size + 1]
+                chunks.append(Document(
+                    page_content=group,
+                    metadata={**doc.metadata, "window": " ".join(window)},
+                ))
+        return chunks
+
+    def _group(self, sentences: List[str]) -> List[str]:
+        # pack consecutive sentences up to max_tokens; overlong sentences are token-split
+        groups, current, current_tokens = [], [], 0
+        for sentence in sentences:
+            tokens = count_tokens(sentence)
+            if tokens > self.max_tokens:
+                if current:
+                    groups.append(" ".join(current))
+                    current, current_tokens = [], 0
+                groups.extend(self.token_splitter.split_text(sentence))
+                continue
+            if current and current_tokens + tokens > self.max_tokens:
+                groups.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(sentence)
+            current_tokens += tokens
+        if current:
+            groups.append(" ".join(current))
+        return groups
+
+
+def splitter_settings(strategy: str) -> dict:
+    """
+    Return the resolved parameters of a chunking strategy; the chunks change whenever these do.
+
+    :param strategy: One of "recursive", "token", "heading" or "sentence_window".
+    """
+    if strategy == "recursive":
+        return {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+    if strategy in ("token", "heading"):
+        return {"encoding": ENCODING_NAME, "chunk_size": CHUNK_TOKENS, "chunk_overlap": CHUNK_OVERLAP_TOKENS}
+    if strategy == "sentence_window":
+        return {"encoding": ENCODING_NAME, "window_size": SENTENCE_WINDOW_SIZE, "max_tokens": SENTENCE_WINDOW_TOKENS}
+    raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+
+def get_splitter(strategy: str):
+    """
+    Return a splitter (anything with split_documents) for a chunking strategy.
+
+    :param strategy: One of "recursive", "token", "heading" or "sentence_window".
+    """
+    settings = splitter_settings(strategy)
+    if strategy == "recursive":
+        return RecursiveCharacterTextSplitter(
+            chunk_size=settings["chunk_size"],
+            chunk_overlap=settings["chunk_overlap"],
+            length_function=len,
+            keep_separator=True
+        )
+    if strategy == "token":
+        return _token_splitter(settings["chunk_size"], settings["chunk_overlap"])
+    if strategy == "heading":
+        return HeadingAwareSplitter()
+    return SentenceWindowSplitter(settings["window_size"], settings["max_tokens"])
+
+
+def strategy_for(kind: str) -> str:
+    """
+    Return the configured chunking strategy for a kind of source ("pdf_chapter", "file", "text").
+    """
+    return CHUNK_STRATEGIES.get(kind, CHUNK_STRATEGIES["default"])
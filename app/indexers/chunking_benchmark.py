@@ -0,0 +1,127 @@
+# chunking_benchmark.py
+"""
+Compare the chunking strategies on one chapter of a PDF.
+
+For every strategy it reports the chunk count, the tokens sent to the embeddings API, the
+approximate index size (vectors + stored text and metadata) and recall@k: sentences sampled
+from the chapter are used as queries against an in-memory index of that strategy's chunks,
+and a query is a hit when one of the top k chunks contains the sentence.
+
+Nothing is written to Chroma; embeddings go through the shared embedding cache.
+
+Usage (from the app folder):
+    python -m indexers.chunking_benchmark "rooks 9th edition.pdf" 3 --queries 50 --k 5
+"""
+import argparse
+import json
+import os
+import random
+import re
+
+import numpy as np
+from langchain.schema import Document
+from langchain_openai import OpenAIEmbeddings
+
+from config import EMBEDDING_MODEL, PDF_FILES_FOLDER
+from db.embedding_cache import CachedEmbeddings
+from helper.pdf_cache import get_page_texts
+from indexers.chunking import STRATEGIES, count_tokens, get_splitter
+from indexers.pdf_jobs import build_chapter_text
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+def load_chapter(pdf_name: str, chapter_number: int) -> str:
+    # imported here because importing the router also prepares its tables
+    from routers.index_rooks_router_robust import extract_chapters_robustly
+
+    pdf_file = os.path.expanduser(PDF_FILES_FOLDER + pdf_name)
+    page_texts = get_page_texts(pdf_file)
+    chapters = extract_chapters_robustly(pdf_file, [chapter_number], page_texts)
+    if not chapters:
+        raise SystemExit(f"Chapter {chapter_number} not found in {pdf_name}")
+    chapter_text_md, reason = build_chapter_text(chapters[0], page_texts)
+    if reason:
+        raise SystemExit(f"Chapter {chapter_number} can't be used: {reason}")
+    return chapter_text_md
+
+
+def sample_queries(text: str, count: int, seed: int = 0):
+    """
+    Sample sentences of 8 to 40 words as queries; each query carries a probe, a span
+    of the sentence used to decide which chunks contain it.
+    """
+    sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', text)]
+    candidates = [s for s in sentences if 8 <= len(s.split()) <= 40]
+    random.Random(seed).shuffle(candidates)
+    queries = []
+    for sentence in candidates[:count]:
+        normalized = _normalize(sentence)
+        middle = len(normalized) // 2
+        queries.append((sentence, normalized[max(0, middle - 30):middle + 30]))
+    return queries
+
+
+def benchmark_strategy(strategy: str, chapter: Document, queries, query_vectors, embeddings, k: int) -> dict:
+    chunks = get_splitter(strategy).split_documents([chapter])
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = np.array(embeddings.embed_documents(texts), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    stored_bytes = sum(
+        len(chunk.page_content.encode("utf-8")) + len(json.dumps(chunk.metadata).encode("utf-8"))
+        for chunk in chunks
+    )
+
+    normalized_chunks = [_normalize(text) for text in texts]
+    hits, evaluated = 0, 0
+    for (sentence, probe), query_vector in zip(queries, query_vectors):
+        relevant = {i for i, text in enumerate(normalized_chunks) if probe in text}
+        if not relevant:
+            # the sentence straddles a chunk boundary in this strategy
+            continue
+        evaluated += 1
+        top_k = np.argsort(-(vectors @ query_vector))[:k]
+        if relevant.intersection(top_k.tolist()):
+            hits += 1
+
+    return {
+        "strategy": strategy,
+        "chunks": len(chunks),
+        "embedded_tokens": sum(count_tokens(text) for text in texts),
+        "index_size_kb": round((vectors.nbytes + stored_bytes) / 1024, 1),
+        "queries_evaluated": evaluated,
+        f"recall@{k}": round(hits / evaluated, 3) if evaluated else None,
+    }
+
+
+def run(pdf_name: str, chapter_number: int, num_queries: int = 50, k: int = 5, strategies=STRATEGIES):
+    chapter_text = load_chapter(pdf_name, chapter_number)
+    chapter = Document(page_content=chapter_text, metadata={"source": "benchmark", "file_name": pdf_name})
+    embeddings = CachedEmbeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL), model=EMBEDDING_MODEL)
+
+    queries = sample_queries(chapter_text, num_queries)
+    query_vectors = np.array(embeddings.embed_documents([sentence for sentence, _ in queries]), dtype=np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+
+    results = [benchmark_strategy(strategy, chapter, queries, query_vectors, embeddings, k) for strategy in strategies]
+
+    print(f"{pdf_name}, chapter {chapter_number}: {len(chapter_text)} characters, {len(queries)} queries")
+    columns = list(results[0].keys())
+    print("  ".join(f"{column:>17}" for column in columns))
+    for result in results:
+        print("  ".join(f"{str(result[column]):>17}" for column in columns))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark chunking strategies on a PDF chapter.")
+    parser.add_argument("pdf_name")
+    parser.add_argument("chapter", type=int)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=STRATEGIES)
+    args = parser.parse_args()
+    run(args.pdf_name, args.chapter, args.queries, args.k, args.strategies)
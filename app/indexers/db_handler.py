@@ -1,64 +1,131 @@
-import sqlite3
+from typing import Optional
 
-# Path to the database file
-DATABASE = './test.db'
+from db.sqlite import pool
+from helper.asset_store import get_assets
 
-# Initialize the database and create the `subtopic_entries` table if it doesn't exist
-def init_db():
+# Create the `subtopic_entries` and `subtopic_assets` tables if they don't exist (run by db.migrations)
+def migrate(conn):
     """
-    Initialize the database, creating the subtopic_entries table if git doesn't exist.
+    Create the subtopic_entries and subtopic_assets tables if they don't exist.
+
+    Blob URLs of the legacy comma-separated blob_urls column are copied to subtopic_assets,
+    keeping their order. The legacy column is left intact but no longer read, so the
+    migration can be reverted; subtopics that already have assets are not copied again.
+
+    :param conn: Connection of the migration transaction.
     """
-    conn = sqlite3.connect(DATABASE)
     cursor = conn.cursor()
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS subtopic_entries (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             subtopic_name TEXT UNIQUE NOT NULL,
-            blob_urls TEXT  -- Store array of blob URLs as a comma-separated string
+            blob_urls TEXT  -- Legacy comma-separated blob URLs, copied to subtopic_assets (kept, not read)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS subtopic_assets (
+            subtopic_id INTEGER NOT NULL REFERENCES subtopic_entries(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,  -- Upload order within the subtopic
+            blob_url TEXT NOT NULL,
+            asset_hash TEXT,            -- Content hash in the asset store (NULL for legacy URLs)
+            PRIMARY KEY (subtopic_id, position),
+            UNIQUE (subtopic_id, blob_url)
         )
     ''')
-    conn.commit()
-    conn.close()
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_subtopic_assets_blob_url ON subtopic_assets (blob_url)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_subtopic_assets_asset_hash ON subtopic_assets (asset_hash)')
+
+    # Copy legacy comma-separated URLs into the join table, once per subtopic
+    legacy_rows = cursor.execute('''
+        SELECT id, blob_urls FROM subtopic_entries
+        WHERE blob_urls IS NOT NULL AND blob_urls != ''
+          AND NOT EXISTS (SELECT 1 FROM subtopic_assets WHERE subtopic_id = subtopic_entries.id)
+    ''').fetchall()
+    for subtopic_id, blob_urls in legacy_rows:
+        _link_urls(cursor, subtopic_id, [(url, None) for url in blob_urls.split(",") if url])
+    if legacy_rows:
+        print(f"Copied legacy blob URLs of {len(legacy_rows)} subtopics to subtopic_assets")
 
-def update_or_insert_subtopic(subtopic_name: str, new_blob_urls: list[str]) -> list[str]:
+
+def _link_urls(cursor, subtopic_id: int, urls_with_hashes: list) -> int:
     """
-    Update or insert subtopic with associated blob URLs into the subtopic_entries table and return all blob URLs.
+    Append (blob_url, asset_hash) pairs to a subtopic in one batch; URLs already linked are skipped.
 
-    :param subtopic_name: The subtopic name.
-    :param new_blob_urls: List of new blob URLs.
-    :return: The complete list of blob URLs for the subtopic.
+    :return: The number of newly linked URLs.
     """
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
+    next_position = cursor.execute(
+        'SELECT COALESCE(MAX(position), -1) + 1 FROM subtopic_assets WHERE subtopic_id = ?', (subtopic_id,)
+    ).fetchone()[0]
+    rows = [
+        (subtopic_id, next_position + offset, blob_url, asset_hash)
+        for offset, (blob_url, asset_hash) in enumerate(urls_with_hashes)
+    ]
+    before = cursor.connection.total_changes
+    cursor.executemany('''
+        INSERT INTO subtopic_assets (subtopic_id, position, blob_url, asset_hash)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT DO NOTHING
+    ''', rows)
+    return cursor.connection.total_changes - before
 
-    # Check if subtopic already exists
-    cursor.execute('SELECT blob_urls FROM subtopic_entries WHERE subtopic_name = ?', (subtopic_name,))
-    result = cursor.fetchone()
 
-    if result:
-        # Subtopic exists, append new URLs to the existing ones
-        existing_blob_urls = result[0].split(",") if result[0] else []
-        updated_blob_urls = list(set(existing_blob_urls + new_blob_urls))  # Avoid duplicates
-        updated_blob_urls_str = ",".join(updated_blob_urls)
+def update_or_insert_subtopic(subtopic_name: str, new_asset_hashes: list[str]) -> int:
+    """
+    Create the subtopic if needed and link new assets to it, in upload order.
 
+    Assets are referenced by content hash; their blob URLs are resolved from the asset store.
+    Assets the subtopic already has are skipped.
+
+    :param subtopic_name: The subtopic name.
+    :param new_asset_hashes: Content hashes of the new assets (see helper.asset_store).
+    :return: The number of assets newly linked to the subtopic.
+    """
+    assets = get_assets(new_asset_hashes)
+    urls_with_hashes = [
+        (assets[asset_hash]["blob_url"], asset_hash)
+        for asset_hash in dict.fromkeys(new_asset_hashes) if asset_hash in assets
+    ]
+
+    with pool.transaction() as conn:
+        cursor = conn.cursor()
         cursor.execute('''
-            UPDATE subtopic_entries
-            SET blob_urls = ?
-            WHERE subtopic_name = ?
-        ''', (updated_blob_urls_str, subtopic_name))
-
-        conn.commit()
-        conn.close()
-        return updated_blob_urls  # Return the complete set of blob URLs
-    else:
-        # Subtopic doesn't exist, create a new entry
-        blob_urls_str = ",".join(new_blob_urls)
-        cursor.execute('''
-            INSERT INTO subtopic_entries (subtopic_name, blob_urls)
-            VALUES (?, ?)
-        ''', (subtopic_name, blob_urls_str))
-
-        conn.commit()
-        conn.close()
-        return new_blob_urls  # Return the new blob URLs
-    
\ No newline at end of file
+            INSERT INTO subtopic_entries (subtopic_name) VALUES (?)
+            ON CONFLICT(subtopic_name) DO NOTHING
+        ''', (subtopic_name,))
+        subtopic_id = cursor.execute(
+            'SELECT id FROM subtopic_entries WHERE subtopic_name = ?', (subtopic_name,)
+        ).fetchone()[0]
+        return _link_urls(cursor, subtopic_id, urls_with_hashes)
+
+
+def get_subtopic_assets(subtopic_name: str, limit: int = 50, after: Optional[int] = None) -> Optional[dict]:
+    """
+    Read a page of a subtopic's assets in upload order.
+
+    :param subtopic_name: The subtopic name.
+    :param limit: Maximum number of assets to return.
+    :param after: Position cursor from the previous page (next_cursor); None for the first page.
+    :return: The page with the total count and the cursor of the next page, or None if the subtopic doesn't exist.
+    """
+    with pool.connection() as conn:
+        row = conn.execute('SELECT id FROM subtopic_entries WHERE subtopic_name = ?', (subtopic_name,)).fetchone()
+        if not row:
+            return None
+        subtopic_id = row[0]
+
+        total = conn.execute('SELECT COUNT(*) FROM subtopic_assets WHERE subtopic_id = ?', (subtopic_id,)).fetchone()[0]
+        rows = conn.execute('''
+            SELECT position, blob_url, asset_hash FROM subtopic_assets
+            WHERE subtopic_id = ? AND position > ?
+            ORDER BY position
+            LIMIT ?
+        ''', (subtopic_id, -1 if after is None else after, limit + 1)).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "subtopic_name": subtopic_name,
+        "total": total,
+        "assets": [{"position": position, "blob_url": blob_url, "asset_hash": asset_hash} for position, blob_url, asset_hash in rows],
+        "next_cursor": rows[-1][0] if has_more else None,
+    }
@@ -2,140 +2,123 @@ import os
 import asyncio
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
-import chromadb
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import numpy as np
-from langchain_community.embeddings import CohereEmbeddings
-from config import DB_NAME as collection_name
-from langchain.indexes import SQLRecordManager, index
-from langchain.schema import Document  # Import the Document schema
-from config import DB_NAME
-from db.db import get_LC_chroma_client
+from config import INGEST_BATCH_MAX_CHUNKS
+from indexers.bulk_indexer import bulk_index_documents, bulk_index_texts
+from indexers.chunking import get_splitter, strategy_for
+from helper.services import services
 from typing import Optional
  
 
-# embeddings = CohereEmbeddings(model="embed-english-light-v3.0")
-embeddings = OpenAIEmbeddings(model= "text-embedding-3-large")
-namespace = f"chromadb/{collection_name}"
-record_manager = SQLRecordManager(
-    namespace, db_url="sqlite:///record_manager_cache.sql"
-)
-record_manager.create_schema()
-
-# Initialize list to store documents
-documents = []
-splitter =  RecursiveCharacterTextSplitter(
-                chunk_size=2000,
-                chunk_overlap=1000,
-                length_function=len,
-                keep_separator=True
-            )
-
-async def process_files(folder_path="../../files", processed_files_path="../../files/processed_files.txt"):
+def _file_splitter():
+    return get_splitter(strategy_for("file"))
+
+
+# The splitter loads the tokenizer, so it is created on first use (or by the service warmup)
+services.register("file_splitter", _file_splitter)
+
+# Bookkeeping files that live in the ingest folder but are not content
+SKIPPED_FILES = ("urls.txt", "processed_files.txt")
+
+async def process_files(store: Chroma, folder_path="../../files", processed_files_path="../../files/processed_files.txt"):
+    """
+    Index every new file of a folder, a bounded batch at a time.
+
+    Files are loaded and split lazily, so only one batch of chunks is held in memory.
+    After a batch is committed to the vector store its files are appended to the processed
+    files list, so a crash mid-folder resumes after the last committed batch.
+
+    :param store: The shared LangChain Chroma wrapper (see db.db.get_vector_store).
+    :param folder_path: Folder with the txt and pdf files to index.
+    :param processed_files_path: File listing the names of already indexed files.
+    :return: Totals of the indexing runs, or None if an error occurred.
+    """
     try:
         # Read the list of processed files
-        processed_files = read_processed_files(processed_files_path)
-        
-        files = os.listdir(folder_path)
-
-        for file in files:
-            file_path = os.path.join(folder_path, file)
-            
-            # Skip processing if the file has already been processed
-            if file in processed_files:
-                print(f"Skipping {file_path}. Already processed.")
-                continue
-            
-            file_type = get_file_type(file_path)
-
-            if file_type == "txt" and ("urls.txt" and "processed_files.txt") not in file:
-                get_text_loader(file_path,file)
-            elif file_type == "pdf":
-                get_pdf_loader(file_path,file)
-            else:
-                print(f"Unsupported file type for {file_path}")
-
-        # Update the list of processed files
-        update_processed_files(processed_files_path, files)
-        
-        docs_to_index = []
-        for array in documents:
-            docs_to_index.extend(array)
-      
-        print("Document count:", len(docs_to_index))
-        print("Adding docs...")
-
-        langchain_chroma = get_LC_chroma_client()
-
-        response = index(
-            docs_to_index,
-            record_manager,
-            langchain_chroma,
-            cleanup="incremental",
-            source_id_key="source",
-        )
-
-        print(response)
-        # Create vector store
-        return response
-       
+        processed_files = set(read_processed_files(processed_files_path))
+
+        totals = {"num_added": 0, "num_updated": 0, "num_skipped": 0, "num_deleted": 0, "files": 0}
+        batches = iter_file_batches(folder_path, processed_files)
+        while True:
+            # loading and splitting is blocking, so each batch is produced off the event loop
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            file_names, sources, docs = batch
+            print(f"Adding {len(docs)} docs from {len(file_names)} files...")
+            response = await asyncio.to_thread(bulk_index_documents, docs, sources, store)
+            for key in ("num_added", "num_updated", "num_skipped", "num_deleted"):
+                totals[key] += response[key]
+            totals["files"] += len(file_names)
+
+            # The batch is committed; record its files before loading the next one
+            append_processed_files(processed_files_path, file_names)
+
+        print(totals)
+        return totals
+
     except Exception as e:
         print('Error processing files:', e)
+
+
+def iter_file_batches(folder_path, processed_files, max_chunks=INGEST_BATCH_MAX_CHUNKS):
+    """
+    Yield (file names, sources, chunks) batches of roughly max_chunks chunks.
+
+    A file is never split across batches, so each batch can clean up its own sources.
+    """
+    file_names, sources, docs = [], [], []
+    for file in sorted(os.listdir(folder_path)):
+        file_path = os.path.join(folder_path, file)
+
+        # Skip processing if the file has already been processed
+        if file in processed_files:
+            print(f"Skipping {file_path}. Already processed.")
+            continue
+
+        file_type = get_file_type(file_path)
+        if file_type == "txt" and file not in SKIPPED_FILES:
+            file_docs = get_text_loader(file_path, file)
+        elif file_type == "pdf":
+            file_docs = get_pdf_loader(file_path, file)
+        else:
+            print(f"Unsupported file type for {file_path}")
+            continue
+
+        if docs and len(docs) + len(file_docs) > max_chunks:
+            yield file_names, sources, docs
+            file_names, sources, docs = [], [], []
+
+        file_names.append(file)
+        sources.append(file_path)
+        docs.extend(file_docs)
+
+    if file_names:
+        yield file_names, sources, docs
         
 
-def process_text_and_index(text: str, source_id: str = "manual_text_input", file_name: str = "") -> Optional[dict]:
+def process_text_and_index(text: str, store: Chroma, source_id: str = "manual_text_input", file_name: str = "",
+                           chunk_strategy: Optional[str] = None) -> Optional[dict]:
     """
     Process a block of text, split it into chunks, and index the content to the vector database.
     
     :param text: The block of text to be processed and indexed.
+    :param store: The shared LangChain Chroma wrapper (see db.db.get_vector_store).
     :param source_id: An identifier for the source of the text.
     :param file_name: The name of the file being processed.
+    :param chunk_strategy: Chunking strategy to use; defaults to the one configured for "text" sources.
     :return: Response from the indexing operation or None if an error occurred.
     """
     print(f"Processing text for indexing. Source ID: {source_id}, File Name: {file_name}")
-    
-    splitterLocal = RecursiveCharacterTextSplitter(
-        chunk_size=2000,
-        chunk_overlap=1000,
-        length_function=len,
-        keep_separator=True
-    )
-    
+
+    # Index the text into the vector database through the bulk path (batched embedding and adds)
     try:
-        # Wrap the text in a Document object
-        doc = Document(page_content=text, metadata={"source": source_id, "file_name": file_name})
-        
-        # Split the text into chunks
-        docs = splitterLocal.split_documents([doc])
-        
-        print(f"Document count after splitting: {len(docs)}")
-        
-        # Initialize Chroma client and record manager if not already initialized
-        try:
-            langchain_chroma = get_LC_chroma_client()
-            print(f"Chroma client initialized successfully.")
-        except Exception as e:
-            print(f"Error initializing Chroma client: {e}")
-            return None
-        
-        # Index the documents into the vector database
-        try:
-            response = index(
-                docs,
-                record_manager,
-                langchain_chroma,
-                cleanup="incremental",
-                source_id_key="source",
-            )
-            print("Indexing response:", response) 
-            print("Text successfully indexed.")
-            return response
-        except Exception as e:
-            print(f"Error during indexing: {e}")
-            return None
+        response = bulk_index_texts([{"text": text, "source_id": source_id, "file_name": file_name,
+                                      "chunk_strategy": chunk_strategy}], store)
+        print("Indexing response:", response)
+        print("Text successfully indexed.")
+        return response
     except Exception as e:
-        print(f"Error processing text: {e}")
+        print(f"Error during indexing: {e}")
         return None
     
 
@@ -149,11 +132,13 @@ def read_processed_files(file_path):
         print(f"no file {file_path}. Starting fresh.")
         return []
 
-def update_processed_files(file_path, processed_files):
+def append_processed_files(file_path, file_names):
     try:
-        with open(file_path, "w") as file:
-            for file_name in processed_files:
+        with open(file_path, "a") as file:
+            for file_name in file_names:
                 file.write(file_name + "\n")
+            file.flush()
+            os.fsync(file.fileno())
         print(f"updated {file_path}")
     except Exception as e:
         print(f"Error updating processed files at {file_path}: {e}")
@@ -168,13 +153,11 @@ def get_text_loader(file_path,file):
     print(f"spilting file: {file}")
     text_loader = TextLoader(file_path)
     docs_text =  text_loader.load()
-    docs =  splitter.split_documents(docs_text)
-    documents.append(docs)
+    return services.get("file_splitter").split_documents(docs_text)
 
 # Function for handling pdf files
 def get_pdf_loader(file_path,file):
     print(f"spilting file: {file}")
     pdf_loader = PyPDFLoader(file_path)
     docs_pdf =  pdf_loader.load()
-    docs =  splitter.split_documents(docs_pdf)
-    documents.append(docs)
+    return services.get("file_splitter").split_documents(docs_pdf)
@@ -0,0 +1,298 @@
+import asyncio
+import hashlib
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from langchain_community.vectorstores import Chroma
+from config import PDF_JOB_WORKERS
+from db.sqlite import pool, run_in_db
+from helper.websocket_connections import broadcast
+from indexers.bulk_indexer import bulk_index_texts
+from db.db import record_manager
+from indexers.chunking import splitter_settings, strategy_for
+from indexers.update_indexed_files import get_chapter_hashes, upsert_indexed_chapters
+
+# Each job runs its bulk indexing pass on this bounded pool; it is blocking network/CPU work
+job_executor = ThreadPoolExecutor(max_workers=PDF_JOB_WORKERS, thread_name_prefix="pdf-job")
+
+# Running job tasks, so they can be cancelled
+_tasks = {}
+
+
+def migrate(conn):
+    """
+    Create the 'pdf_jobs' table if it doesn't exist (run by db.migrations at startup).
+
+    Jobs that were queued or running when the server stopped are marked as interrupted.
+
+    :param conn: Connection of the migration transaction.
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pdf_jobs (
+            id TEXT PRIMARY KEY,
+            pdf_name TEXT NOT NULL,
+            chapters TEXT,             -- JSON list of requested chapter numbers
+            status TEXT NOT NULL,      -- queued, running, completed, failed, cancelled, interrupted
+            total INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            successful_chapters TEXT,  -- JSON list of chapter titles
+            failed_chapters TEXT,      -- JSON list of {"title", "reason"}
+            error TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        UPDATE pdf_jobs SET status = 'interrupted', updated_at = ?
+        WHERE status IN ('queued', 'running')
+    ''', (_now(),))
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _save_job(job: dict):
+    with pool.transaction() as conn:
+        conn.execute('''
+            INSERT INTO pdf_jobs (id, pdf_name, chapters, status, total, completed,
+                                  successful_chapters, failed_chapters, error, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                status = excluded.status, completed = excluded.completed,
+                successful_chapters = excluded.successful_chapters,
+                failed_chapters = excluded.failed_chapters,
+                error = excluded.error, updated_at = excluded.updated_at
+        ''', (
+            job["id"], job["pdf_name"], json.dumps(job["chapters"]), job["status"], job["total"],
+            job["completed"], json.dumps(job["successful_chapters"]), json.dumps(job["failed_chapters"]),
+            job["error"], job["created_at"], _now(),
+        ))
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """
+    Retrieve a job and its progress from the database.
+
+    :param job_id: The job id returned on submission.
+    :return: The job as a dictionary, or None if it does not exist.
+    """
+    with pool.connection() as conn:
+        row = conn.execute('''
+            SELECT id, pdf_name, chapters, status, total, completed, successful_chapters,
+                   failed_chapters, error, created_at, updated_at
+            FROM pdf_jobs WHERE id = ?
+        ''', (job_id,)).fetchone()
+
+    if not row:
+        return None
+
+    return {
+        "id": row[0],
+        "pdf_name": row[1],
+        "chapters": json.loads(row[2]) if row[2] else [],
+        "status": row[3],
+        "total": row[4],
+        "completed": row[5],
+        "successful_chapters": json.loads(row[6]) if row[6] else [],
+        "failed_chapters": json.loads(row[7]) if row[7] else [],
+        "error": row[8],
+        "created_at": row[9],
+        "updated_at": row[10],
+    }
+
+
+def chapter_content_hash(chapter_text_md: str, chunk_strategy: str) -> str:
+    """
+    Hash of what indexing a chapter depends on: its text, the chunking strategy and the
+    strategy's resolved splitter settings (sizes, overlap).
+    """
+    settings = json.dumps(splitter_settings(chunk_strategy), sort_keys=True)
+    return hashlib.sha256(f"{chunk_strategy}\n{settings}\n{chapter_text_md}".encode("utf-8")).hexdigest()
+
+
+def has_vectors(source_id: str) -> bool:
+    """Whether the record manager still holds chunks of a source (e.g. a chapter title)."""
+    return bool(record_manager.list_keys(group_ids=[source_id], limit=1))
+
+
+def build_chapter_text(chapter: dict, page_texts: List[str]):
+    """
+    Validate a chapter's page range and build its markdown text.
+
+    :return: Tuple of (markdown text, None) or (None, failure reason).
+    """
+    chapter_title = chapter['title']
+    from_page = chapter['from_page']
+    to_page = chapter['to_page']
+
+    if from_page is None or to_page is None:
+        print(f"Invalid page range: Chapter '{chapter_title}' has undefined page range")
+        return None, "Undefined page range"
+
+    if from_page > to_page:
+        print(f"Invalid page range: Chapter '{chapter_title}' has from_page {from_page} > to_page {to_page}")
+        return None, "Invalid page range"
+
+    if from_page < 1 or to_page > len(page_texts):
+        print(f"Out of bounds: Chapter '{chapter_title}' has from_page {from_page} or to_page {to_page} outside the valid page range.")
+        return None, "Out of bounds page range"
+
+    # Join the chapter's pages once instead of growing a string page by page
+    chapter_text = "\n".join(page_texts[from_page - 1:to_page]) + "\n"
+
+    if not chapter_text.strip():
+        print(f"Chapter '{chapter_title}' could not be saved because it has no text.")
+        return None, "No text content"
+
+    # Add the chapter title to the markdown format
+    return f"# {chapter_title}\n\n{chapter_text}", None
+
+
+async def _publish(job: dict, event: str, **extra):
+    # snapshot the lists; the job keeps changing while the save runs on the executor
+    await run_in_db(_save_job, {**job, "successful_chapters": list(job["successful_chapters"]),
+                                "failed_chapters": list(job["failed_chapters"])})
+    await broadcast({
+        "type": "pdf_job",
+        "event": event,
+        "job_id": job["id"],
+        "status": job["status"],
+        "completed": job["completed"],
+        "total": job["total"],
+        **extra,
+    })
+
+
+async def _run_job(job: dict, chapters_to_process: List[dict], page_texts: List[str], store: Chroma,
+                   chunk_strategy: Optional[str] = None):
+    loop = asyncio.get_running_loop()
+    stop_event = threading.Event()
+    job["status"] = "running"
+    await _publish(job, "started")
+
+    # Chapters with a bad page range or no text fail up front, chapters whose text and chunking
+    # are unchanged since they were last indexed (and whose chunks are still stored) are skipped;
+    # the rest are indexed together
+    strategy = chunk_strategy or strategy_for("pdf_chapter")
+    indexed_hashes = await run_in_db(get_chapter_hashes, job["pdf_name"])
+    items, indexed_chapters = [], []
+    for chapter in chapters_to_process:
+        chapter_text_md, reason = build_chapter_text(chapter, page_texts)
+        if reason:
+            job["completed"] += 1
+            job["failed_chapters"].append({"title": chapter['title'], "reason": reason})
+            await _publish(job, "chapter_done", chapter=chapter['title'], error=reason)
+            continue
+
+        content_hash = chapter_content_hash(chapter_text_md, strategy)
+        # the chunks may have been deleted since, e.g. by /vector-store/delete-records
+        if indexed_hashes.get(chapter['number']) == content_hash and await asyncio.to_thread(has_vectors, chapter['title']):
+            print(f"Chapter '{chapter['title']}' is unchanged since it was indexed, skipping.")
+            job["completed"] += 1
+            job["successful_chapters"].append(chapter['title'])
+            await _publish(job, "chapter_done", chapter=chapter['title'], error=None, skipped=True)
+            continue
+
+        print(f"Processing '{chapter['title']}' from page {chapter['from_page']} to {chapter['to_page']}...")
+        items.append({"text": chapter_text_md, "source_id": chapter['title'], "file_name": job["pdf_name"],
+                      "chunk_strategy": strategy})
+        indexed_chapters.append({"number": chapter['number'], "title": chapter['title'], "content_hash": content_hash})
+
+    def on_progress(batches_done, total_batches):
+        # called from the worker thread; hand the event to the loop
+        asyncio.run_coroutine_threadsafe(
+            _publish(job, "embedding_progress", batches_done=batches_done, total_batches=total_batches), loop
+        )
+
+    try:
+        if items:
+            indexing = loop.run_in_executor(job_executor, bulk_index_texts, items, store, on_progress, stop_event.is_set)
+            try:
+                result = await asyncio.shield(indexing)
+            except asyncio.CancelledError:
+                # stop after the batch in flight; the chunks written so far stay recorded
+                stop_event.set()
+                await indexing
+                raise
+
+            for item, chapter in zip(items, indexed_chapters):
+                job["completed"] += 1
+                if result.get("stopped"):
+                    reason = "Indexing stopped"
+                    job["failed_chapters"].append({"title": item["source_id"], "reason": reason})
+                else:
+                    reason = None
+                    job["successful_chapters"].append(item["source_id"])
+                    chapter["chunk_count"] = result["sources"][item["source_id"]]["chunk_count"]
+                    print(f"Chapter '{item['source_id']}' successfully indexed as markdown.")
+                await _publish(job, "chapter_done", chapter=item["source_id"], error=reason)
+
+            if not result.get("stopped"):
+                await run_in_db(upsert_indexed_chapters, job["pdf_name"], indexed_chapters)
+
+        job["status"] = "completed" if job["successful_chapters"] else "failed"
+        await _publish(job, "finished")
+    except asyncio.CancelledError:
+        job["status"] = "cancelled"
+        await _publish(job, "cancelled")
+        raise
+    except Exception as e:
+        print(f"PDF job {job['id']} failed: {e}")
+        job["status"] = "failed"
+        job["error"] = str(e)
+        await _publish(job, "finished")
+    finally:
+        _tasks.pop(job["id"], None)
+
+
+async def submit_job(pdf_name: str, chapter_numbers: List[int], chapters_to_process: List[dict], page_texts: List[str],
+                     store: Chroma, chunk_strategy: Optional[str] = None) -> str:
+    """
+    Queue chapters of a PDF for background indexing.
+
+    :param pdf_name: File name of the PDF.
+    :param chapter_numbers: The chapter numbers that were requested.
+    :param chapters_to_process: Detected chapters (title, from_page, to_page, number).
+    :param page_texts: Text of every page of the PDF.
+    :param store: The shared LangChain Chroma wrapper (see db.db.get_vector_store).
+    :param chunk_strategy: Chunking strategy; defaults to the one configured for "pdf_chapter" sources.
+    :return: The id of the new job.
+    """
+    job = {
+        "id": uuid.uuid4().hex,
+        "pdf_name": pdf_name,
+        "chapters": chapter_numbers,
+        "status": "queued",
+        "total": len(chapters_to_process),
+        "completed": 0,
+        "successful_chapters": [],
+        "failed_chapters": [],
+        "error": None,
+        "created_at": _now(),
+    }
+    await _publish(job, "queued")
+    _tasks[job["id"]] = asyncio.create_task(_run_job(job, chapters_to_process, page_texts, store, chunk_strategy))
+    return job["id"]
+
+
+async def cancel_job(job_id: str) -> bool:
+    """
+    Cancel a queued or running job. The embedding batch in flight finishes, no new ones start.
+
+    :return: True if a running job was cancelled.
+    """
+    task = _tasks.get(job_id)
+    if task is None:
+        return False
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    return True
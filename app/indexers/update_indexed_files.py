@@ -1,105 +1,240 @@
-import sqlite3
-from typing import List
+import re
+from datetime import datetime, timezone
+from itertools import zip_longest
+from typing import Dict, List, Optional
 
-# Database file
-DATABASE = "./test.db"
+from db.sqlite import pool
 
-def init_db():
+def migrate(conn):
     """
-    Initialize the database and create the 'indexed_files' table if it doesn't exist.
+    Create the 'indexed_files' and 'indexed_chapters' tables if they don't exist (run by db.migrations).
+
+    Chapters still stored in the legacy comma-separated columns of 'indexed_files' are moved
+    to 'indexed_chapters'.
+
+    :param conn: Connection of the migration transaction.
     """
-    conn = sqlite3.connect(DATABASE)
     cursor = conn.cursor()
-    
+
     # Create a table to track indexed files and chapters
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS indexed_files (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             file_name TEXT NOT NULL UNIQUE,
-            indexed_chapters TEXT,  -- Comma-separated list of indexed chapter numbers
-            chapter_names TEXT      -- Comma-separated list of indexed chapter names
+            indexed_chapters TEXT,  -- Legacy comma-separated chapter numbers ('all' for the whole file)
+            chapter_names TEXT      -- Legacy comma-separated chapter names
         )
     ''')
-    
-    conn.commit()
-    conn.close()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS indexed_chapters (
+            file_id INTEGER NOT NULL REFERENCES indexed_files(id) ON DELETE CASCADE,
+            chapter_number INTEGER NOT NULL,
+            chapter_title TEXT,
+            indexed_at TEXT NOT NULL,
+            chunk_count INTEGER,
+            content_hash TEXT,      -- Hash of the indexed chapter text, to skip unchanged chapters
+            PRIMARY KEY (file_id, chapter_number)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_indexed_chapters_title ON indexed_chapters (chapter_title)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_indexed_chapters_indexed_at ON indexed_chapters (indexed_at)')
+
+    _migrate_legacy_chapters(cursor)
+
+
+def _migrate_legacy_chapters(cursor):
+    # Legacy numbers and names were sorted independently, so names are matched back
+    # to numbers through their "CHAPTER <n>" prefix
+    rows = cursor.execute('''
+        SELECT id, indexed_chapters, chapter_names FROM indexed_files
+        WHERE indexed_chapters IS NOT NULL AND indexed_chapters NOT IN ('', 'all')
+    ''').fetchall()
+    for file_id, chapters_str, names_str in rows:
+        titles = {}
+        for name in (names_str or "").split(","):
+            match = re.match(r'\s*CHAPTER\s+(\d+)', name, re.IGNORECASE)
+            if match:
+                titles[int(match.group(1))] = name
+        numbers = [int(number) for number in chapters_str.split(",") if number.strip().isdigit()]
+        cursor.executemany('''
+            INSERT INTO indexed_chapters (file_id, chapter_number, chapter_title, indexed_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(file_id, chapter_number) DO NOTHING
+        ''', [(file_id, number, titles.get(number), _now()) for number in numbers])
+        cursor.execute('UPDATE indexed_files SET indexed_chapters = NULL, chapter_names = NULL WHERE id = ?', (file_id,))
+    if rows:
+        print(f"Migrated indexed chapters of {len(rows)} files to indexed_chapters")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _get_file_id(cursor, file_name: str) -> int:
+    cursor.execute('INSERT INTO indexed_files (file_name) VALUES (?) ON CONFLICT(file_name) DO NOTHING', (file_name,))
+    return cursor.execute('SELECT id FROM indexed_files WHERE file_name = ?', (file_name,)).fetchone()[0]
+
+
+def upsert_indexed_chapters(file_name: str, chapters: List[dict]):
+    """
+    Record indexed chapters of a file in one batch, replacing earlier records of the same chapters.
+
+    :param file_name: Name of the file.
+    :param chapters: Dictionaries with "number" and optional "title", "chunk_count" and "content_hash".
+    """
+    with pool.transaction() as conn:
+        cursor = conn.cursor()
+        file_id = _get_file_id(cursor, file_name)
+        indexed_at = _now()
+        cursor.executemany('''
+            INSERT INTO indexed_chapters (file_id, chapter_number, chapter_title, indexed_at, chunk_count, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(file_id, chapter_number) DO UPDATE SET
+                chapter_title = COALESCE(excluded.chapter_title, chapter_title),
+                indexed_at = excluded.indexed_at,
+                chunk_count = excluded.chunk_count,
+                content_hash = excluded.content_hash
+        ''', [
+            (file_id, chapter["number"], chapter.get("title"), indexed_at,
+             chapter.get("chunk_count"), chapter.get("content_hash"))
+            for chapter in chapters
+        ])
+
 
 def add_or_update_file(file_name: str, chapter_numbers: List[int] = None, chapter_names: List[str] = None):
     """
     Add or update the file entry in the database with indexed chapters and chapter names.
 
-    If the file already exists, append new chapters and chapter names to the existing ones.
-    If the file doesn't exist, insert a new entry.
+    If chapter_numbers is None, the whole file is marked as indexed ('all').
 
-    If chapter_numbers is None, set 'indexed_chapters' to 'all'.
-    
     :param file_name: Name of the file.
     :param chapter_numbers: List of chapters that were indexed. If None, set to 'all'.
     :param chapter_names: List of chapter names corresponding to the chapters.
     """
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    
-    # Check if the file already exists
-    cursor.execute('SELECT indexed_chapters, chapter_names FROM indexed_files WHERE file_name = ?', (file_name,))
-    result = cursor.fetchone()
-
     if chapter_numbers is None:
-        # If chapter_numbers is None, set indexed_chapters to 'all'
-        chapters_str = "all"
-    else:
-        # Convert chapter numbers to a comma-separated string
-        chapters_str = ",".join(map(str, chapter_numbers))
-
-    if result:
-        # File exists, update the indexed chapters and names
-        existing_chapters = result[0].split(",") if result[0] != "all" else ["all"]
-        existing_names = result[1].split(",") if result[1] else []
-        
-        # Merge new chapters and names with existing ones
-        if "all" in existing_chapters:
-            updated_chapters = ["all"]  # Keep 'all' as the only chapter
-        else:
-            updated_chapters = sorted(set(existing_chapters + list(map(str, chapter_numbers or []))))
-        
-        updated_chapter_names = sorted(set(existing_names + (chapter_names or [])))
+        with pool.transaction() as conn:
+            cursor = conn.cursor()
+            _get_file_id(cursor, file_name)
+            cursor.execute("UPDATE indexed_files SET indexed_chapters = 'all' WHERE file_name = ?", (file_name,))
+        return
 
-        updated_chapters_str = ",".join(updated_chapters)
-        updated_chapter_names_str = ",".join(updated_chapter_names)
+    chapters = [
+        {"number": number, "title": name}
+        for number, name in zip_longest(chapter_numbers, (chapter_names or [])[:len(chapter_numbers)])
+    ]
+    upsert_indexed_chapters(file_name, chapters)
 
-        cursor.execute('''
-            UPDATE indexed_files 
-            SET indexed_chapters = ?, chapter_names = ? 
-            WHERE file_name = ?
-        ''', (updated_chapters_str, updated_chapter_names_str, file_name))
-    else:
-        # File doesn't exist, insert new record
-        chapter_names_str = ",".join(chapter_names or [])
 
-        cursor.execute('''
-            INSERT INTO indexed_files (file_name, indexed_chapters, chapter_names)
-            VALUES (?, ?, ?)
-        ''', (file_name, chapters_str, chapter_names_str))
+def get_chapter_hashes(file_name: str) -> Dict[int, str]:
+    """
+    Return the content hash recorded for each indexed chapter of a file.
 
-    conn.commit()
-    conn.close()
+    :return: Dictionary of chapter number to content hash (chapters without a hash are left out).
+    """
+    with pool.connection() as conn:
+        rows = conn.execute('''
+            SELECT c.chapter_number, c.content_hash
+            FROM indexed_chapters c JOIN indexed_files f ON f.id = c.file_id
+            WHERE f.file_name = ? AND c.content_hash IS NOT NULL
+        ''', (file_name,)).fetchall()
+    return {number: content_hash for number, content_hash in rows}
 
 
-def get_all_files():
+def delete_indexed_chapters(chapter_titles: List[str]) -> int:
     """
-    Retrieve all files and their indexed chapters and names from the database.
+    Forget indexed chapters whose vectors were deleted, so the next PDF job indexes them again.
 
-    :return: List of dictionaries containing file names, indexed chapters, and chapter names.
+    :param chapter_titles: Titles of the chapters (their vector store source).
+    :return: The number of chapter records removed.
     """
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT file_name, indexed_chapters, chapter_names FROM indexed_files')
-    files = cursor.fetchall()
+    if not chapter_titles:
+        return 0
+    with pool.transaction() as conn:
+        placeholders = ",".join("?" * len(chapter_titles))
+        return conn.execute(
+            f'DELETE FROM indexed_chapters WHERE chapter_title IN ({placeholders})', list(chapter_titles)
+        ).rowcount
+
+
+def query_indexed_chapters(file_name: Optional[str] = None, chapter_from: Optional[int] = None,
+                           chapter_to: Optional[int] = None, title: Optional[str] = None,
+                           limit: int = 100, offset: int = 0) -> dict:
+    """
+    Filter and page through indexed chapters, ordered by file and chapter number.
+
+    :param file_name: Only chapters of this file.
+    :param chapter_from: Lowest chapter number to include.
+    :param chapter_to: Highest chapter number to include.
+    :param title: Only chapters whose title contains this text (case-insensitive).
+    :param limit: Maximum number of chapters to return.
+    :param offset: Number of matching chapters to skip.
+    :return: Dictionary with the total number of matches and the chapters of the page.
+    """
+    conditions, params = [], []
+    if file_name is not None:
+        conditions.append('f.file_name = ?')
+        params.append(file_name)
+    if chapter_from is not None:
+        conditions.append('c.chapter_number >= ?')
+        params.append(chapter_from)
+    if chapter_to is not None:
+        conditions.append('c.chapter_number <= ?')
+        params.append(chapter_to)
+    if title:
+        conditions.append('c.chapter_title LIKE ?')
+        params.append(f"%{title}%")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    with pool.connection() as conn:
+        total = conn.execute(f'''
+            SELECT COUNT(*) FROM indexed_chapters c JOIN indexed_files f ON f.id = c.file_id {where}
+        ''', params).fetchone()[0]
+        rows = conn.execute(f'''
+            SELECT f.file_name, c.chapter_number, c.chapter_title, c.indexed_at, c.chunk_count, c.content_hash
+            FROM indexed_chapters c JOIN indexed_files f ON f.id = c.file_id
+            {where}
+            ORDER BY f.file_name, c.chapter_number
+            LIMIT ? OFFSET ?
+        ''', params + [limit, offset]).fetchall()
+
+    return {
+        "total": total,
+        "chapters": [
+            {"file_name": row[0], "chapter_number": row[1], "chapter_title": row[2],
+             "indexed_at": row[3], "chunk_count": row[4], "content_hash": row[5]}
+            for row in rows
+        ],
+    }
 
-    conn.close()
 
-    if not files:
-        return []
+def get_all_files():
+    """
+    Retrieve all files and their indexed chapters and names from the database.
 
-    return [{"file_name": file[0], "indexed_chapters": file[1].split(","), "chapter_names": file[2].split(",")} for file in files]
+    :return: List of dictionaries containing file names, indexed chapters, and chapter names.
+    """
+    with pool.connection() as conn:
+        files = conn.execute('SELECT id, file_name, indexed_chapters FROM indexed_files ORDER BY file_name').fetchall()
+        rows = conn.execute('''
+            SELECT file_id, chapter_number, chapter_title FROM indexed_chapters ORDER BY file_id, chapter_number
+        ''').fetchall()
+
+    chapters_by_file = {}
+    for file_id, number, title in rows:
+        chapters_by_file.setdefault(file_id, []).append((number, title))
+
+    result = []
+    for file_id, file_name, legacy_chapters in files:
+        chapters = chapters_by_file.get(file_id, [])
+        if legacy_chapters == "all":
+            indexed = ["all"]
+        elif chapters:
+            indexed = [str(number) for number, _ in chapters]
+        else:
+            continue
+        result.append({
+            "file_name": file_name,
+            "indexed_chapters": indexed,
+            "chapter_names": [title for _, title in chapters if title],
+        })
+    return result
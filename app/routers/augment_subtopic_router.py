@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException, Query
-from langchain_openai import ChatOpenAI
+from fastapi import APIRouter, HTTPException, Query, Request
+from helper.llms import get_llm, run_llm
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 import os
@@ -17,14 +17,6 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Set up the LLM
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo-0125",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-)
 # Define the prompt template
 prompt_template = ChatPromptTemplate.from_messages(
     [
@@ -57,14 +49,16 @@ prompt_template = ChatPromptTemplate.from_messages(
 
 
 
-# Output parser to handle the LLM's response
-chain = prompt_template | llm | StrOutputParser()
+# Output parser to handle the LLM's response; the chat model is created on first use (see helper.llms)
+def get_chain():
+    return prompt_template | get_llm("augment_subtopic") | StrOutputParser()
 
 # GET endpoint to augment a subtopic
 @router.get("/")
 async def augment_subtopic(
     topic: str = Query(..., description="The main topic to discuss"),
-    subtopic: str = Query(..., description="The subtopic to augment and explain")
+    subtopic: str = Query(..., description="The subtopic to augment and explain"),
+    request: Request = None,
 ):
     """
     API endpoint to augment a subtopic by providing detailed information.
@@ -75,12 +69,12 @@ async def augment_subtopic(
     """
     try:
         # Call the LLM with the prompt template and input values
-        json_result = chain.invoke(
+        json_result = await run_llm(get_chain().ainvoke(
             {
                 "topic": topic,
                 "subtopic": subtopic,
             }
-        )
+        ), request)
 
         if json_result:
             # Return the response from the LLM
@@ -88,5 +82,7 @@ async def augment_subtopic(
         else:
             raise HTTPException(status_code=500, detail="Failed to generate response from LLM.")
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
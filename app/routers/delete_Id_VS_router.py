@@ -1,11 +1,13 @@
-from fastapi import APIRouter, HTTPException
-from langchain.indexes import SQLRecordManager, index
-from langchain.schema import Document  # Import the Document class
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from langchain_community.vectorstores import Chroma
 
-from typing import Optional
-from config import DB_NAME as collection_name
+from typing import List, Optional
+from pydantic import BaseModel
 
-from db.db import get_LC_chroma_client
+from db.db import get_vector_store, record_manager, vector_store_service
+from db.vector_search import abatch_similarity_search
+from indexers.update_indexed_files import delete_indexed_chapters
 
 # Initialize the router
 router = APIRouter(
@@ -13,32 +15,111 @@ router = APIRouter(
     tags=["vector-store"],
     responses={404: {"description": "Not found"}},
 )
-def create_langchain_documents(collection):
-    # Initialize the list to hold Document objects
-    documents = []
+def delete_ids(ids: List[str], store: Chroma) -> dict:
+    """
+    Deletes the given ids from Chroma and drops only their keys from the record manager.
+
+    The work is proportional to the number of ids, not to the size of the collection.
+    Chapters that lost chunks are no longer recorded as indexed, so PDF jobs index them again.
+
+    :param ids: Chroma ids (which are also the record manager keys) to delete.
+    :param store: The shared LangChain Chroma wrapper (see get_vector_store).
+    :return: The deleted ids, the ids that were not found and the affected sources.
+    """
+    collection = store._collection
+    existing = collection.get(ids=ids, include=["metadatas"])
+    found_ids = existing["ids"]
+    sources = sorted({(meta or {}).get("source") for meta in existing["metadatas"]} - {None})
+
+    if found_ids:
+        collection.delete(ids=found_ids)
+        record_manager.delete_keys(found_ids)
+        delete_indexed_chapters(sources)
+
+    return {
+        "deleted_ids": found_ids,
+        "missing_ids": [doc_id for doc_id in ids if doc_id not in set(found_ids)],
+        "sources": sources,
+    }
+
+
+def delete_source(source: str, store: Chroma) -> dict:
+    """
+    Deletes every chunk indexed for a source (e.g. a chapter title or a link).
+
+    :param source: The "source" metadata value, which is also the record manager group id.
+    :param store: The shared LangChain Chroma wrapper (see get_vector_store).
+    :return: The number of chunks deleted.
+    """
+    keys = record_manager.list_keys(group_ids=[source])
+    collection = store._collection
+    if keys:
+        collection.delete(ids=keys)
+        record_manager.delete_keys(keys)
+    # catch chunks that were added without going through the record manager
+    collection.delete(where={"source": source})
+    delete_indexed_chapters([source])
+    return {"source": source, "deleted_count": len(keys)}
+
+
+class DeleteRecordsRequest(BaseModel):
+    ids: List[str]
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    k: int = 20
+    where: Optional[dict] = None
+
+@router.get("/health")
+async def vector_store_health():
+    """
+    Heartbeats the shared Chroma client, reconnecting it if the server stopped answering.
 
-    # Iterate over the ids, documents, and their corresponding metadata
-    for doc_id, doc, meta in zip(collection['ids'], collection['documents'], collection['metadatas']):
-        # Create a metadata dictionary that includes the id and other metadata
-         
+    :return: The health status of the vector store connection.
+    """
+    # the heartbeat (and a reconnect when it fails) is blocking network I/O
+    healthy = await asyncio.to_thread(vector_store_service.health_check)
+    if not healthy:
+        raise HTTPException(status_code=503, detail="Vector store unavailable.")
+    return {"status": "ok", "host": vector_store_service.host, "port": vector_store_service.port}
 
-        # Create a Document object
-        document = Document(page_content=doc,id=doc_id, metadata=meta)
+@router.get("/embedding-cache")
+async def embedding_cache_stats(store: Chroma = Depends(get_vector_store)):
+    """
+    Returns hit/miss counters and the size of the on-disk embedding cache.
 
-        # Append the Document to the list
-        documents.append(document)
+    :return: Embedding cache statistics.
+    """
+    return store.embeddings.stats()
 
-    return documents
+@router.post("/batch-search")
+async def batch_search(request: BatchSearchRequest, store: Chroma = Depends(get_vector_store)):
+    """
+    Searches the vector store for many queries with one embeddings request and one Chroma query.
 
+    :param request: The queries, the number of results per query and an optional metadata filter.
+    :return: One ranked result list (with distances) per query, in request order.
+    """
+    try:
+        ranked_lists = await abatch_similarity_search(request.queries, store, request.k, request.where)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-# Function to initialize Chroma client
-def get_chroma_client():
-    # Assuming you have a function to set up and return your Chroma client
-    chroma_client = get_LC_chroma_client()
-    return chroma_client
+    return {
+        "results": [
+            {
+                "query": query,
+                "documents": [
+                    {"id": doc.id, "page_content": doc.page_content, "metadata": doc.metadata, "distance": distance}
+                    for doc, distance in ranked
+                ],
+            }
+            for query, ranked in zip(request.queries, ranked_lists)
+        ]
+    }
 
 @router.delete("/delete-record/{record_id}")
-async def delete_record(record_id: str):
+async def delete_record(record_id: str, store: Chroma = Depends(get_vector_store)):
     """
     Deletes a record from the vector store using its ID.
 
@@ -46,34 +127,38 @@ async def delete_record(record_id: str):
     :return: A success message or an error if the record cannot be found.
     """
     try:
-        # Get the Chroma client
-        chroma_client = get_chroma_client()
-        # Perform the deletion
-        chroma_client.delete(ids=[record_id])
-
-        collection = chroma_client.get();
-        # Assuming collection is the object you've shown in the image
-        langchain_documents = create_langchain_documents(collection)
-        namespace = f"chromadb/{collection_name}"
-        record_manager = SQLRecordManager(
-            namespace, db_url="sqlite:///record_manager_cache.sql"
-        )
- 
-        # Index the documents into the vector database
-        response = index(
-            langchain_documents,
-            record_manager,
-            chroma_client,
-            cleanup="incremental",
-            source_id_key="source",
-        )
-        print(response)
-        # Create vector store
-        
-        return {"message": f"Record with ID {record_id} has been deleted successfully."}
-    except ValueError as e:
-        # Handle the case where the record is not found
-        raise HTTPException(status_code=404, detail=str(e))
+        result = await asyncio.to_thread(delete_ids, [record_id], store)
     except Exception as e:
         # Handle any other exceptions
         raise HTTPException(status_code=500, detail=str(e))
+
+    if not result["deleted_ids"]:
+        raise HTTPException(status_code=404, detail=f"Record with ID {record_id} not found.")
+
+    return {"message": f"Record with ID {record_id} has been deleted successfully."}
+
+@router.post("/delete-records")
+async def delete_records(request: DeleteRecordsRequest, store: Chroma = Depends(get_vector_store)):
+    """
+    Deletes many records from the vector store in one call.
+
+    :param request: The IDs of the records to delete.
+    :return: The deleted IDs and any IDs that were not found.
+    """
+    try:
+        return await asyncio.to_thread(delete_ids, request.ids, store)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/delete-source/{source:path}")
+async def delete_source_records(source: str, store: Chroma = Depends(get_vector_store)):
+    """
+    Deletes every record indexed for a source (chapter title, link or file).
+
+    :param source: The source name the records were indexed under.
+    :return: The number of records deleted.
+    """
+    try:
+        return await asyncio.to_thread(delete_source, source, store)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,9 +1,9 @@
 # Initialize the router with your specified configuration
-import sqlite3
 from fastapi import FastAPI, APIRouter, HTTPException
 from pydantic import BaseModel, HttpUrl
 from typing import List
 
+from db.sqlite import pool
 from routers.post_sources_router import SourcesInput
 
 
@@ -14,17 +14,12 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},  # Custom responses, if needed
 )
 
-# Database file
-DATABASE = "./test.db"
 
  # DELETE endpoint to remove all sources from the database
 @router.delete("/")
 def delete_sources():
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM sources")
-    conn.commit()
-    conn.close()
+    with pool.transaction() as conn:
+        conn.execute("DELETE FROM sources")
     return {"status": "All sources deleted successfully"}
  
  
\ No newline at end of file
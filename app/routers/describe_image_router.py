@@ -1,9 +1,9 @@
 import base64
 import json
-import httpx
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from langchain.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI  # Example of LLM from Langchain
+from helper.image_ingest import get_session
+from helper.llms import get_llm, run_llm
 
 # Initialize the router
 router = APIRouter(
@@ -12,10 +12,9 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-model = ChatOpenAI(model="gpt-4o-mini")  # Assuming a vision-based model like GPT-4 Vision
 # API to process the image and return the caption, title, and description
 @router.get("/")
-async def generate_caption_title_description(image_url: str = Query(...), topic: str = Query(...)):
+async def generate_caption_title_description(image_url: str = Query(...), topic: str = Query(...), request: Request = None):
     """
     Given an image URL and the overall topic, fetches the image, processes it, and returns the generated caption, title, and description.
     
@@ -24,13 +23,14 @@ async def generate_caption_title_description(image_url: str = Query(...), topic:
     :return: JSON object with the generated title, caption, and description.
     """
     try:
-        # Fetch the image from the URL
-        response = httpx.get(image_url)
-        if response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to fetch image from the URL.")
+        # Fetch the image from the URL through the shared image download session
+        async with get_session().get(image_url) as response:
+            if response.status != 200:
+                raise HTTPException(status_code=400, detail="Failed to fetch image from the URL.")
+            image_bytes = await response.read()
 
         # Encode the image as base64
-        image_data = base64.b64encode(response.content).decode("utf-8")
+        image_data = base64.b64encode(image_bytes).decode("utf-8")
         print("Image successfully fetched and base64 encoded.")
         topic=topic
         # Update the system message to include the topic
@@ -68,10 +68,10 @@ async def generate_caption_title_description(image_url: str = Query(...), topic:
                 )
 
         # Create the chain with the prompt and model
-        chain = prompt | model
+        chain = prompt | get_llm("describe_image")
 
         # Get the result by invoking the chain with the base64 image data
-        response = chain.invoke({"image_data": image_data,"topic":topic})
+        response = await run_llm(chain.ainvoke({"image_data": image_data,"topic":topic}), request)
         result = json.loads(response.content)
         print(response.content)
         # Extract and return the result
@@ -83,5 +83,7 @@ async def generate_caption_title_description(image_url: str = Query(...), topic:
         
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
@@ -1,20 +1,24 @@
+import asyncio
 import json
 import os
 import re
 from bs4 import BeautifulSoup
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
+from fastapi import APIRouter, Depends, File, UploadFile, Form, HTTPException, Request
 from typing import List
 import fitz  # PyMuPDF
 from langchain.chains.retrieval import create_retrieval_chain
 from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
+from helper.llms import get_llm, run_llm
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from sentence_transformers import CrossEncoder
 from langchain_community.document_transformers import (
     LongContextReorder,
 )
-from db.db import get_LC_chroma_client
+from langchain_community.vectorstores import Chroma
+from db.db import get_vector_store
+from db.vector_search import abatch_similarity_search
+from helper.reranker import reranker
+from config import RETRIEVAL_CONCURRENCY, BATCH_SEARCH_SIZE
 
 # code to break down leaning objectives and match documents
 
@@ -27,19 +31,11 @@ router = APIRouter(
 
 
 
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo-0125",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-    # api_key=apikey,  # if you prefer to pass api key in directly instaed of using env vars
-    # base_url="...",
-    # organization="...",
-    # other params...
-)
 files_folder = "files"
 
+# Bounds the vector store searches in flight for a single worker
+retrieval_semaphore = asyncio.Semaphore(RETRIEVAL_CONCURRENCY)
+
 llm_prompt = (
             "Given the following text-content, extract and structure the information into JSON format with the following structure:\\n"
             "- **Main Topic:** The overarching subject of the content.\\n"
@@ -90,7 +86,9 @@ prompt2 = ChatPromptTemplate.from_messages(
 
 @router.post("/")
 async def upload_pdfs_and_extract_text(
+    request: Request,
     files: List[UploadFile] = File(...),
+    store: Chroma = Depends(get_vector_store),
 ):
     response = {
         "message": "PDF files processed successfully.",
@@ -128,7 +126,7 @@ async def upload_pdfs_and_extract_text(
     combined_text = "\n".join(extracted_text_blocks)
 
     # Call the dummy LLM method
-    llm_response = get_response_from_LLM(combined_text, prompt2)
+    llm_response = await get_response_from_LLM(combined_text, prompt2, store, request)
     
     # Include the LLM response in the final response
     response["llm_response"] = llm_response
@@ -145,77 +143,105 @@ def extract_text_from_pdf(file_path):
 
 
 
-def get_response_from_LLM(content,prompt_template):
+async def get_response_from_LLM(content,prompt_template, store: Chroma, request: Request = None):
     """
     Calls the LLM to extract structured information based on the content.
+
+    The call is cancelled if it times out or the client of the request disconnects.
     """
    
      # Combine the prompt and the LLM into a chain
-    chain = prompt_template | llm | StrOutputParser()
+    chain = prompt_template | get_llm("extract_text") | StrOutputParser()
     
-    result = chain.invoke({"content": content})
+    result = await run_llm(chain.ainvoke({"content": content}), request)
     
     
     # Convert the LLM result from JSON string to a dictionary
     llm_result_dict = json.loads(result)
     # Augment the LLM response
-    augmented_result = augment_llm_result_with_details(llm_result_dict)
+    augmented_result = await augment_llm_result_with_details(llm_result_dict, store)
 
     return json.dumps(augmented_result, indent=2)
 
 
-def augment_llm_result_with_details(llm_result):
+async def augment_llm_result_with_details(llm_result, store: Chroma):
     """
     Augments the LLM result by adding additional details such as relevant documents and search link.
     """
-    for competency in llm_result.get('competencies', []):
-        for index, part in enumerate(competency.get('parts', [])):
-            # Get relevant documents and scores
-            relevant_docs_with_scores, relevant_count = get_results(part)
-
-          # Use doc_to_dict to convert each document and score into a consistent dictionary format
-            relevant_docs = [doc_to_dict(doc, score) for score, doc in relevant_docs_with_scores]
-
-            search_link = f"https://pubmed.ncbi.nlm.nih.gov/?term={part.replace(' ', '+')}"
-            augmented_part = {
-                "name": part,
-                "relevant_docs": relevant_docs,
-                "links": [search_link]
-            }
-            competency['parts'][index] = augmented_part
+    # Retrieve candidates for every part concurrently, then rerank the whole tree in one pass
+    parts = [
+        (competency, index, part)
+        for competency in llm_result.get('competencies', [])
+        for index, part in enumerate(competency.get('parts', []))
+    ]
+    retrieved = await retrieve_docs_batched([part for _, _, part in parts], store)
+    queries_with_docs = [(part, docs) for (_, _, part), docs in zip(parts, retrieved)]
+    ranked_parts = await reranker.arank(queries_with_docs)
+
+    for (competency, index, part), scored_docs in zip(parts, ranked_parts):
+        # Get relevant documents and scores
+        relevant_docs_with_scores = filter_relevant(part, scored_docs)
+
+        # Use doc_to_dict to convert each document and score into a consistent dictionary format
+        relevant_docs = [doc_to_dict(doc, score) for score, doc in relevant_docs_with_scores]
+
+        search_link = f"https://pubmed.ncbi.nlm.nih.gov/?term={part.replace(' ', '+')}"
+        augmented_part = {
+            "name": part,
+            "relevant_docs": relevant_docs,
+            "links": [search_link]
+        }
+        competency['parts'][index] = augmented_part
 
     return llm_result
 
 
-def get_results(part, threshold=0.5):
+async def retrieve_docs_batched(queries, store: Chroma):
     """
-    Retrieves relevant documents and scores for a given part.
+    Retrieves the candidate documents for many parts with batched vector searches.
+
+    Parts are searched BATCH_SEARCH_SIZE at a time (one embeddings request and one Chroma
+    query per batch); batches run concurrently, bounded by RETRIEVAL_CONCURRENCY, and the
+    results come back in the original order.
     """
-    LC_chroma_client = get_LC_chroma_client()
-    retriever = LC_chroma_client.as_retriever(search_kwargs={"k": 20})
+    async def search_batch(batch):
+        async with retrieval_semaphore:
+            return await abatch_similarity_search(batch, store, k=20)
+
+    batches = [queries[i:i + BATCH_SEARCH_SIZE] for i in range(0, len(queries), BATCH_SEARCH_SIZE)]
+    batch_results = await asyncio.gather(*(search_batch(batch) for batch in batches))
+    return [[doc for doc, distance in ranked] for results in batch_results for ranked in results]
 
-    relevant_docs = retriever.invoke(part)
-    cross_encoder = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
 
-    pairs = [[part, doc.page_content] for doc in relevant_docs]
-    scores = cross_encoder.predict(pairs)
+def is_web_url(source):
+    return bool(re.match(r'https?://', source))
 
-    def is_web_url(source):
-        return bool(re.match(r'https?://', source))
 
+def filter_relevant(part, scored_docs, threshold=0.5):
+    """
+    Keeps the reranked documents that pass the score threshold (web links get a lower bar).
+    """
     relevant_by_score = [
-        (float(score), doc) for score, doc in zip(scores, relevant_docs)
+        (score, doc) for score, doc in scored_docs
         if score > threshold or (is_web_url(doc.metadata.get("source", "")) and score > -5)
     ]
 
-    relevant_by_score.sort(key=lambda x: x[0], reverse=True)
-
     # Print scores for verification
     print(f"\nFor part '{part}':")
     for i, (score, doc) in enumerate(relevant_by_score, start=1):
         source_is_web_url = is_web_url(doc.metadata.get("source", ""))
         print(f"  Document {i}  score is {score:.4f} (Relevant - {'Web URL' if source_is_web_url else 'Score'})")
- 
+
+    return relevant_by_score
+
+
+async def get_results(part, store: Chroma, threshold=0.5):
+    """
+    Retrieves relevant documents and scores for a given part.
+    """
+    docs = (await retrieve_docs_batched([part], store))[0]
+    scored_docs = (await reranker.arank([(part, docs)]))[0]
+    relevant_by_score = filter_relevant(part, scored_docs, threshold)
     return relevant_by_score, len(relevant_by_score)
 
 
@@ -237,12 +263,12 @@ def doc_to_dict(doc, score):
 
 
 @router.get("/refresh-search")
-async def recalculate_part_details(part_name: str, augmented_info: str = ""):
+async def recalculate_part_details(part_name: str, augmented_info: str = "", store: Chroma = Depends(get_vector_store)):
     """
     Recalculates the score and retrieves relevant documents for a part.
     """
     info_to_use = augmented_info if augmented_info.strip() else part_name
-    relevant_docs_with_scores, relevant_count = get_results(info_to_use)
+    relevant_docs_with_scores, relevant_count = await get_results(info_to_use, store)
 
     relevant_docs = [doc_to_dict(doc, score) for score, doc in relevant_docs_with_scores]
     search_link = f"https://pubmed.ncbi.nlm.nih.gov/?term={part_name.replace(' ', '+')}"
@@ -3,23 +3,11 @@ import os
 from langchain_core.output_parsers import StrOutputParser
  
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+from helper.llms import get_llm, run_llm
 
 
 # code to summarize link
 
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo-0125",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-    # api_key=apikey,  # if you prefer to pass api key in directly instaed of using env vars
-    # base_url="...",
-    # organization="...",
-    # other params...
-)
-
 prompt = ChatPromptTemplate.from_messages(
     [
         (
@@ -35,17 +23,20 @@ prompt = ChatPromptTemplate.from_messages(
          "------Instruction for transformation :{instruction}"),
     ]
 )
-chain = prompt | llm | StrOutputParser()
+# The chat model is created on first use (see helper.llms)
+def get_chain():
+    return prompt | get_llm("transform_text") | StrOutputParser()
 
 
 
 
 
-def process_files_with_instruction(filenames, instruction):
+async def process_files_with_instruction(filenames, instruction, request=None):
     """
     Process a list of files according to the provided instruction.
     
     :param filenames: List of filenames to process.
+    :param request: The incoming request; the LLM call is cancelled if its client disconnects.
      
     :return: Processed text as a single block.
     """
@@ -60,12 +51,12 @@ def process_files_with_instruction(filenames, instruction):
             content_blocks.append(content)
     
     
-    json_result= chain.invoke(
+    json_result= await run_llm(get_chain().ainvoke(
                 {
                     "text_to_transform": content,
                     "instruction":instruction
                 }
-            )
+            ), request)
  
 
     return json_result
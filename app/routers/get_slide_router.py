@@ -1,8 +1,8 @@
 import json
 import os
 import logging
-from fastapi import APIRouter, HTTPException
-from langchain_openai import ChatOpenAI
+from fastapi import APIRouter, HTTPException, Request
+from helper.llms import get_llm, run_llm
 from pydantic import BaseModel
 from typing import List, Optional
 from langchain_core.output_parsers import StrOutputParser
@@ -12,7 +12,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_community.document_transformers import (
     LongContextReorder,
 )
-from helper import slides_generator_alternate
+from helper import presentation_backends
 from config import PDF_FILES_FOLDER
 
 # Set up logging
@@ -31,28 +31,16 @@ router = APIRouter(
 )
 
 
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo-0125",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-    # api_key=apikey,  # if you prefer to pass api key in directly instaed of using env vars
-    # base_url="...",
-    # organization="...",
-    # other params...
-)
-
-
 # Update the ContentRequest model
 class ContentRequest(BaseModel):
     subtopic: str
     text_content: List[str]
     is_summary_slide: Optional[bool] = False
+    presentation_backend: Optional[str] = None  # "google_slides" or "pptx"; defaults to PRESENTATION_BACKEND
 
 # POST endpoint to process the content onlu used for summary slide - elseused as method frm the get_slides_upload router
 @router.post("/")
-async def get_llm_response(request: ContentRequest):
+async def get_llm_response(request: ContentRequest, http_request: Request = None):
     try:
         formatted_content = "\n".join(f"- {line}" for line in request.text_content)
         is_summary_slide = request.is_summary_slide
@@ -63,11 +51,11 @@ async def get_llm_response(request: ContentRequest):
             ("human", "content :{formatted_content} \n topic :{topic}"),
         ])
         
-        chain = prompt | llm | StrOutputParser()
-        llm_str_result = chain.invoke({
+        chain = prompt | get_llm("slides") | StrOutputParser()
+        llm_str_result = await run_llm(chain.ainvoke({
             "formatted_content": formatted_content,
             "topic": request.subtopic
-        })
+        }), http_request)
         
         logger.debug(f"LLM Response: {llm_str_result[:1000]}...")  # Log first 1000 characters
         
@@ -89,7 +77,7 @@ async def get_llm_response(request: ContentRequest):
         # Generate presentation URL only for summary slide
         presentation_url = None
         if is_summary_slide: # if summary slide only return content+ppt url - there will be no images in the summary 
-            presentation_url = await slides_generator_alternate.create_presentation(content_json, request.image_urls or [])
+            presentation_url = await presentation_backends.create_presentation(content_json, getattr(request, 'image_urls', None) or [], request.presentation_backend)
             result = {
                 "content": content_json,
                 "images": request.image_urls if hasattr(request, 'image_urls') else [],
@@ -1,12 +1,14 @@
 from asyncio.log import logger
 import os
 import asyncio
-import aiohttp  # We will use aiohttp to download the images from URLs asynchronously
 from fastapi import APIRouter, HTTPException, File, Request, UploadFile, Form
 from typing import List, Optional, Union
 from .get_slide_router import ContentRequest, get_llm_response
-from .upload_to_storage_router import upload_to_azure, update_or_insert_subtopic
-from helper import slides_generator_alternate
+from .upload_to_storage_router import update_or_insert_subtopic
+from db.sqlite import run_in_db
+from helper import asset_store
+from helper.image_ingest import ingest_image_urls
+from helper import presentation_backends
 import json
 
 router = APIRouter(
@@ -29,13 +31,17 @@ async def combined_api(
     files: Optional[Union[UploadFile, List[UploadFile]]] = File(None),
     description: Optional[str] = Form(None),
     text_content: Optional[Union[str, List[str]]] = Form(None),
-    image_urls: Optional[Union[str, List[str]]] = Form(None)
+    image_urls: Optional[Union[str, List[str]]] = Form(None),
+    presentation_backend: Optional[str] = Form(None)
 ):
     try:
         logger.debug(f"Received request: {request.method} {request.url}")
         logger.debug(f"Received subtopic_name: {subtopic_name}")
         logger.debug(f"Received description: {description}")
 
+        # Fail fast on an unknown presentation backend, before any LLM call or upload
+        presentation_backends.get_backend(presentation_backend)
+
         # Handle files
         files_list = ensure_list(files)
         logger.debug(f"Received files: {[f.filename for f in files_list]}")
@@ -50,18 +56,15 @@ async def combined_api(
         image_urls_list = ensure_list(image_urls)
         logger.debug(f"Received image_urls: {image_urls_list}")
 
-        # Define the file paths folder
-        files_folder = os.path.expanduser("~/slide-uploads")
-
         # Task to generate the overall json for content of different kinds
-        content_task = generate_content(text_content_list, subtopic_name)
+        content_task = generate_content(text_content_list, subtopic_name, request)
 
         # Initialize empty result for uploaded files
         upload_result = {"azure_blob_urls": []}
 
         # Task to handle file uploads, image URLs, or both
         if files_list or image_urls_list:
-            upload_task = handle_file_and_url_uploads(files_list, image_urls_list, files_folder, description, subtopic_name)
+            upload_task = handle_file_and_url_uploads(files_list, image_urls_list, description, subtopic_name)
             content_json, upload_result = await asyncio.gather(content_task, upload_task)
         else:
             content_json = await content_task
@@ -74,7 +77,7 @@ async def combined_api(
         #     raise HTTPException(status_code=500, detail="Failed to parse slide content")
 
 
-        presentation_url = await slides_generator_alternate.create_presentation(content_input=content_json, image_urls= upload_result['azure_blob_urls'])
+        presentation_url = await presentation_backends.create_presentation(content_input=content_json, image_urls= upload_result['azure_blob_urls'], backend=presentation_backend)
         # Return the combined result with the presentation URL
         result = {
             "content": content_json,
@@ -94,14 +97,14 @@ async def combined_api(
 
 
 
-async def generate_content(text_content: List[str], subtopic_name: str):
+async def generate_content(text_content: List[str], subtopic_name: str, request: Request = None):
     """
     Asynchronous function to generate slides by calling the LLM.
     """
     logger.debug(f"Generating slides for subtopic: {subtopic_name}")
     logger.debug(f"Text content for slide generation: {text_content}")
 
-    result = await get_llm_response(ContentRequest(subtopic=subtopic_name, text_content=text_content, isSummarySlide=False))
+    result = await get_llm_response(ContentRequest(subtopic=subtopic_name, text_content=text_content, isSummarySlide=False), request)
 
     # Log a summary of the result
     if isinstance(result, dict):
@@ -115,7 +118,7 @@ async def generate_content(text_content: List[str], subtopic_name: str):
 
 
 
-async def handle_file_and_url_uploads(files: List[UploadFile], image_urls: List[str], files_folder: str, description: str, subtopic_name: str):
+async def handle_file_and_url_uploads(files: List[UploadFile], image_urls: List[str], description: str, subtopic_name: str):
     """
     Asynchronous function to upload files or download and upload images from URLs to Azure.
     """
@@ -126,54 +129,17 @@ async def handle_file_and_url_uploads(files: List[UploadFile], image_urls: List[
         "description": description,
     }
 
-    # Create a folder for local storage
-    os.makedirs(files_folder, exist_ok=True)
-
-    # If files are provided, upload them to Azure
-    for file in files:
-        file_path = os.path.join(files_folder, file.filename)
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
-
-        # Upload to Azure
-        blob_url = upload_to_azure(file_path, file.filename)
-        response["azure_blob_urls"].append(blob_url)
-
-        # Clean up local file
-        os.remove(file_path)
-
-    # If image URLs are provided, download and upload them to Azure
-    for url in image_urls:
-        image_filename = os.path.basename(url)
-        image_path = os.path.join(files_folder, image_filename)
-        
-        # Download the image from the URL
-        await download_image_from_url(url, image_path)
-
-        # Upload the downloaded image to Azure
-        blob_url = upload_to_azure(image_path, image_filename)
-        response["azure_blob_urls"].append(blob_url)
-
-        # Clean up local file
-        os.remove(image_path)
+    # Store request files and image URLs as content-addressed assets, all concurrently,
+    # so the uploads take as long as the slowest file
+    file_assets, image_assets = await asyncio.gather(
+        asset_store.store_uploads(files),
+        ingest_image_urls(image_urls),
+    )
+    assets = file_assets + image_assets
+    response["azure_blob_urls"] = [asset["blob_url"] for asset in assets]
 
     # Update the database with the file/URL upload information
-    update_or_insert_subtopic(subtopic_name, response["azure_blob_urls"])
+    await run_in_db(update_or_insert_subtopic, subtopic_name, [asset["hash"] for asset in assets])
     logger.debug(f"Updated subtopic {subtopic_name} with {len(response['azure_blob_urls'])} URLs")
 
     return response
-
-
-
-async def download_image_from_url(url: str, image_path: str):
-    """
-    Asynchronous function to download an image from a URL and save it locally.
-    """
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                with open(image_path, "wb") as f:
-                    f.write(await response.read())
-            else:
-                raise HTTPException(status_code=response.status, detail=f"Failed to download image from {url}")
@@ -1,8 +1,8 @@
-import sqlite3
 from fastapi import FastAPI, APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List
 
+from db.sqlite import pool
 # Assuming these models are imported from another module
 from routers.post_sources_router import SourceSchemaOutput, SourcesInput, SourcesOutput
 
@@ -13,33 +13,11 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},  # Custom responses, if needed
 )
 
-# Database file
-DATABASE = "./test.db"
-
-# Initialize the database and create the table if it doesn't exist
-def init_db():
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sources (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL UNIQUE,
-            summary TEXT,
-            text TEXT,  -- New column to store the block of text
-            type TEXT  -- Column to store the file type (e.g., text, image, link)
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
 # GET endpoint to retrieve sources
 @router.get("/", response_model=SourcesOutput)
 def get_sources():
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, title, summary, text,type FROM sources ORDER BY id DESC")
-    rows = cursor.fetchall()
-    conn.close()
+    with pool.connection() as conn:
+        rows = conn.execute("SELECT id, title, summary, text,type FROM sources ORDER BY id DESC").fetchall()
 
     # Convert rows to a list of SourceSchema dictionaries
     sources = [{"id": row[0], "title": row[1], "summary": row[2], "text": row[3], "type": row[4]} for row in rows]
@@ -48,11 +26,8 @@ def get_sources():
 # GET endpoint to retrieve all records where type='image'
 @router.get("/images", response_model=SourcesOutput)
 def get_image_sources():
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, title, summary, text, type FROM sources WHERE type = 'image' ORDER BY id DESC")
-    rows = cursor.fetchall()
-    conn.close()
+    with pool.connection() as conn:
+        rows = conn.execute("SELECT id, title, summary, text, type FROM sources WHERE type = 'image' ORDER BY id DESC").fetchall()
 
     # Convert rows to a list of SourceSchema dictionaries
     sources = [{"id": row[0], "title": row[1], "summary": row[2], "text": row[3], "type": row[4]} for row in rows]
@@ -61,22 +36,10 @@ def get_image_sources():
 # DELETE endpoint to delete a source by its ID
 @router.delete("/{source_id}")
 def delete_source(source_id: int):
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    
-    # Check if the record exists
-    cursor.execute("SELECT * FROM sources WHERE id = ?", (source_id,))
-    row = cursor.fetchone()
-    if not row:
-        conn.close()
+    with pool.transaction() as conn:
+        # Delete the record, if it exists
+        deleted = conn.execute("DELETE FROM sources WHERE id = ?", (source_id,)).rowcount
+    if not deleted:
         raise HTTPException(status_code=404, detail=f"Source with ID {source_id} not found")
-    
-    # Delete the record
-    cursor.execute("DELETE FROM sources WHERE id = ?", (source_id,))
-    conn.commit()
-    conn.close()
 
     return {"message": f"Source with ID {source_id} has been deleted successfully"}
-
-# Initialize the database when the app starts
-init_db()
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from langchain_community.vectorstores import Chroma
 from pydantic import BaseModel
 import fitz  # PyMuPDF
 import json
@@ -9,7 +10,10 @@ from pydantic import BaseModel
 from typing import List, Optional, Union
 
 from indexers.file_processor_with_indexing import process_text_and_index
-from indexers.update_indexed_files import add_or_update_file, get_all_files, init_db
+from db.db import get_vector_store
+from db.sqlite import run_in_db
+from indexers.update_indexed_files import add_or_update_file, get_all_files, query_indexed_chapters
+from helper.pdf_cache import get_raw_toc
 
  
 
@@ -64,8 +68,7 @@ def get_toc_json_from_pdf(pdf_file):
     :param pdf_file: Path to the PDF file.
     :return: JSON string of the TOC.
     """
-    doc = fitz.open(pdf_file)
-    toc = doc.get_toc()
+    toc, page_count = get_raw_toc(pdf_file)
 
     if not toc:
         return None
@@ -88,7 +91,7 @@ def get_toc_json_from_pdf(pdf_file):
                 last_node_at_level[level] = new_node
 
     # Set the 'to' pages for each TOC entry
-    set_to_pages(root, doc.page_count)
+    set_to_pages(root, page_count)
 
     toc_json = [node.to_dict() for node in root]
    
@@ -131,8 +134,7 @@ def extract_chapter_names_from_toc(pdf_file: str, chapter_numbers: List[int] = N
     :param chapter_numbers: List of chapter numbers. If None or empty, extract all chapters.
     :return: List of chapter names corresponding to the chapter numbers or all chapters.
     """
-    doc = fitz.open(pdf_file)  # Open the PDF file
-    toc = doc.get_toc()  # Get the TOC as a list of tuples (level, title, page_num)
+    toc, _ = get_raw_toc(pdf_file)  # Get the TOC as a list of tuples (level, title, page_num)
     
     chapter_names = []
     chapter_regex = re.compile(r'^CHAPTER\s+(\d+).*')
@@ -194,7 +196,7 @@ def expand_chapter_ranges(chapters: List[Union[int, tuple]]) -> List[int]:
 
 # Function to process and index PDF chapters, now including markdown conversion
 @router.post("/")
-async def process_pdf_chapters(request: PDFProcessingRequest):
+async def process_pdf_chapters(request: PDFProcessingRequest, store: Chroma = Depends(get_vector_store)):
     """
     API endpoint to process and index chapters from a PDF.
 
@@ -217,7 +219,7 @@ async def process_pdf_chapters(request: PDFProcessingRequest):
 
     # Extract chapter names based on the provided chapter numbers
     chapter_names = extract_chapter_names_from_toc(pdf_file, expanded_chapters)
-    add_or_update_file(BOOK_NAME, expanded_chapters, chapter_names)
+    await run_in_db(add_or_update_file, BOOK_NAME, expanded_chapters, chapter_names)
 
     if not os.path.exists(pdf_file):
         raise HTTPException(status_code=404, detail="PDF file not found.")
@@ -294,7 +296,7 @@ async def process_pdf_chapters(request: PDFProcessingRequest):
 
         # Index the markdown content into the vector database
         try:
-            response = process_text_and_index(chapter_text_md, source_id=chapter_title, file_name=BOOK_NAME)
+            response = process_text_and_index(chapter_text_md, store, source_id=chapter_title, file_name=BOOK_NAME)
             if response:
                 print(f"Chapter '{chapter_title}' successfully indexed as markdown.")
             else:
@@ -310,21 +312,38 @@ async def process_pdf_chapters(request: PDFProcessingRequest):
 
 # GET endpoint to fetch all indexed files and their indexed chapters
 @router.get("/indexed-chapters")
-async def get_indexed_files():
+async def get_indexed_files(
+    file_name: Optional[str] = None,
+    chapter_from: Optional[int] = None,
+    chapter_to: Optional[int] = None,
+    title: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
     """
     API endpoint to get all indexed files and their indexed chapters.
 
-    :return: List of indexed files with their chapters.
+    With any filter or pagination parameter, returns a page of indexed chapters instead
+    ({"total", "chapters"}), each with its indexed_at, chunk_count and content_hash.
+
+    :param file_name: Only chapters of this file.
+    :param chapter_from: Lowest chapter number to include.
+    :param chapter_to: Highest chapter number to include.
+    :param title: Only chapters whose title contains this text.
+    :param limit: Page size (default 100 when filtering).
+    :param offset: Number of matching chapters to skip.
+    :return: List of indexed files with their chapters, or a page of chapters.
     """
-    files = get_all_files()
+    if any(value is not None for value in (file_name, chapter_from, chapter_to, title, limit)) or offset:
+        return await run_in_db(query_indexed_chapters, file_name, chapter_from, chapter_to, title, limit or 100, offset)
+
+    files = await run_in_db(get_all_files)
 
     if not files:
         return []
 
     return files
 
-# Initialize the database when the app starts
-init_db()
 
 @router.get("/toc")
 async def get_pdf_toc(pdf_file_path: str = os.path.expanduser("~/backend-MR/files/rooks 9th edition.pdf")):
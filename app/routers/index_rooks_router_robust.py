@@ -1,16 +1,22 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from langchain_community.vectorstores import Chroma
 from pydantic import BaseModel
 import fitz  # PyMuPDF
 import json
 import re
 from typing import List, Optional
 import os
-from indexers.file_processor_with_indexing import process_text_and_index  # Importing the indexing function
+from indexers import pdf_jobs
+from indexers.chunking import STRATEGIES
 from pydantic import BaseModel
 from typing import List, Optional, Union
 
-from indexers.update_indexed_files import add_or_update_file, get_all_files, init_db
+from db.db import get_vector_store
+from db.sqlite import run_in_db
+from indexers.update_indexed_files import get_all_files, query_indexed_chapters
 from config import PDF_FILES_FOLDER
+from helper.pdf_cache import get_chapters, get_page_texts, get_raw_toc, store_chapters
  
 
 # Initialize the router
@@ -65,28 +71,17 @@ def get_toc_json_from_pdf(pdf_file):
     :return: JSON string of the TOC or None if an error occurs.
     """
     try:
-        doc = fitz.open(pdf_file)
-    except fitz.FileDataError as e:
-        print(f"MuPDF error while opening PDF: {e}")
-        return None
-    except Exception as e:
-        print(f"Unexpected error opening PDF: {e}")
-        return None
-
-    try:
-        toc = doc.get_toc()
+        # TOC and page count come from the per-PDF cache, opening the file only on a miss
+        toc, page_count = get_raw_toc(pdf_file)
     except fitz.FileDataError as e:
         print(f"MuPDF error while getting TOC: {e}")
-        doc.close()
         return None
     except Exception as e:
         print(f"Unexpected error getting TOC: {e}")
-        doc.close()
         return None
 
     if not toc:
         print("No TOC found in the PDF")
-        doc.close()
         return None
 
     root = []
@@ -108,15 +103,13 @@ def get_toc_json_from_pdf(pdf_file):
                     last_node_at_level[level] = new_node
 
         # Set the 'to' pages for each TOC entry
-        set_to_pages(root, doc.page_count)
+        set_to_pages(root, page_count)
 
         toc_json = [node.to_dict() for node in root]
     except Exception as e:
         print(f"Error processing TOC: {e}")
-        doc.close()
         return None
 
-    doc.close()
     return json.dumps(toc_json)  # Convert the list to a JSON string
    
 
@@ -163,23 +156,14 @@ def extract_chapter_names_from_toc(pdf_file: str, chapter_numbers: Optional[List
     chapter_regex = re.compile(r'^CHAPTER\s+(\d+).*')
 
     try:
-        doc = fitz.open(pdf_file)  # Open the PDF file
-        print(f"Successfully opened PDF. Total pages: {doc.page_count}")
-    except Exception as e:
-        print(f"Error opening PDF file: {e}")
-        return []
-
-    try:
-        toc = doc.get_toc()  # Get the TOC as a list of tuples (level, title, page_num)
-        print(f"Successfully extracted TOC. Total entries: {len(toc)}")
+        toc, page_count = get_raw_toc(pdf_file)  # Get the TOC as a list of (level, title, page_num)
+        print(f"Successfully extracted TOC. Total entries: {len(toc)}, total pages: {page_count}")
     except Exception as e:
         print(f"Error extracting TOC: {e}")
-        doc.close()
         return []
 
     if not toc:
         print("Warning: No TOC found in the PDF")
-        doc.close()
         return []
 
     print("Processing TOC entries...")
@@ -199,7 +183,6 @@ def extract_chapter_names_from_toc(pdf_file: str, chapter_numbers: Optional[List
         except Exception as e:
             print(f"Error processing TOC entry {i + 1}: {e}")
 
-    doc.close()
     print(f"Finished processing. Extracted {len(chapter_names)} chapter names.")
     print(f"Extracted chapter names: {chapter_names}")
 
@@ -209,6 +192,7 @@ def extract_chapter_names_from_toc(pdf_file: str, chapter_numbers: Optional[List
 class PDFProcessingRequest(BaseModel):
     pdf_name: str = "rooks 9th edition.pdf"  # Default file name
     chapters: Optional[Union[List[int], List[tuple]]] = None  # Allow a list of chapters or ranges
+    chunk_strategy: Optional[str] = None  # "recursive", "token", "heading" or "sentence_window"
 
 # Helper function to extract subsections and format them as ## headers
 def extract_subsections(subsections):
@@ -273,72 +257,90 @@ def extract_chapters_from_toc(toc_entries, chapter_numbers=None):
     return chapters
 
 
-def extract_chapters_robustly(pdf_file, chapter_numbers=None):
+def extract_chapters_robustly(pdf_file, chapter_numbers=None, page_texts=None):
     """
     Extract chapters from a PDF file by scanning through the content.
     This method is more robust but potentially slower for large PDFs.
 
     :param pdf_file: Path to the PDF file.
     :param chapter_numbers: List of chapter numbers to extract. If None, extract all chapters.
+    :param page_texts: Already extracted page texts; read from the PDF cache if not given.
     :return: List of dictionaries containing chapter information.
     """
     print(f"Attempting robust chapter extraction from {pdf_file}")
-    chapters = []
-    chapter_pattern = re.compile(r'^CHAPTER\s+(\d+).*', re.IGNORECASE)
-    
+
+    # Boundaries of every chapter are cached per PDF; filter them for the request
     try:
-        doc = fitz.open(pdf_file)
-        print(f"Successfully opened PDF. Total pages: {doc.page_count}")
+        all_chapters = get_chapters(pdf_file)
     except Exception as e:
-        print(f"Error opening PDF file: {e}")
-        return []
+        print(f"Error reading chapter cache: {e}")
+        all_chapters = None
+
+    if all_chapters is None:
+        if page_texts is None:
+            try:
+                page_texts = get_page_texts(pdf_file)
+            except Exception as e:
+                print(f"Error opening PDF file: {e}")
+                return []
+        all_chapters = detect_chapters(page_texts)
+        store_chapters(pdf_file, all_chapters, len(page_texts))
+
+    chapters = [
+        chapter for chapter in all_chapters
+        if chapter_numbers is None or chapter['number'] in chapter_numbers
+    ]
+    print(f"Extracted {len(chapters)} chapters robustly")
+    return chapters
+
+
+def detect_chapters(page_texts):
+    """
+    Scan page texts for "CHAPTER <n>" lines and return the page range of every chapter.
+
+    :param page_texts: List of page texts in page order.
+    :return: List of dictionaries containing chapter information.
+    """
+    chapters = []
+    chapter_pattern = re.compile(r'^CHAPTER\s+(\d+).*', re.IGNORECASE)
 
     current_chapter = None
-    for page_num in range(doc.page_count):
-        try:
-            page = doc.load_page(page_num)
-            text = page.get_text("text")
-            lines = text.split('\n')
-            
-            for line in lines:
-                match = chapter_pattern.match(line.strip())
-                if match:
-                    chapter_num = int(match.group(1))
-                    print(f"Found Chapter {chapter_num} on page {page_num + 1}")
-                    
-                    if current_chapter:
-                        current_chapter['to_page'] = page_num
-                        chapters.append(current_chapter)
-                    
-                    if chapter_numbers is None or chapter_num in chapter_numbers:
-                        current_chapter = {
-                            'title': line.strip(),
-                            'from_page': page_num + 1,
-                            'to_page': None,
-                            'number': chapter_num
-                        }
-                    else:
-                        current_chapter = None
-        except Exception as e:
-            print(f"Error processing page {page_num}: {e}")
+    for page_num, text in enumerate(page_texts):
+        for line in text.split('\n'):
+            match = chapter_pattern.match(line.strip())
+            if match:
+                chapter_num = int(match.group(1))
+                print(f"Found Chapter {chapter_num} on page {page_num + 1}")
+
+                if current_chapter:
+                    current_chapter['to_page'] = page_num
+                    chapters.append(current_chapter)
+
+                current_chapter = {
+                    'title': line.strip(),
+                    'from_page': page_num + 1,
+                    'to_page': None,
+                    'number': chapter_num
+                }
 
     if current_chapter:
-        current_chapter['to_page'] = doc.page_count
+        current_chapter['to_page'] = len(page_texts)
         chapters.append(current_chapter)
 
-    doc.close()
-    print(f"Extracted {len(chapters)} chapters robustly")
     return chapters
 
 
 # Function to process and index PDF chapters, now including markdown conversion
 @router.post("/")
-async def process_pdf_chapters(request: PDFProcessingRequest):
+async def process_pdf_chapters(request: PDFProcessingRequest, store: Chroma = Depends(get_vector_store)):
     """
-    API endpoint to process and index chapters from a PDF.
+    API endpoint to queue chapters from a PDF for indexing.
+
+    The chapters are indexed by a background job; poll GET /process-pdf/jobs/{job_id}
+    or listen on /ws for per-chapter progress.
 
     :param request: Request body containing PDF file path and list of chapter numbers to index.
-    :return: Success message or error details.
+    :return: The job id or error details.
     """
     print("Request", request)
     pdf_file = os.path.expanduser(PDF_FILES_FOLDER + request.pdf_name)
@@ -351,117 +353,105 @@ async def process_pdf_chapters(request: PDFProcessingRequest):
     if chapter_numbers is None:
         return {"status": "No chapters provided. Defaulting to indexing the whole PDF."}
 
+    if request.chunk_strategy is not None and request.chunk_strategy not in STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Unknown chunk_strategy. Use one of {list(STRATEGIES)}.")
+
     # Expand any chapter ranges (e.g., 1-10) into individual chapter numbers
     expanded_chapters = expand_chapter_ranges(chapter_numbers)
     chapter_numbers = expanded_chapters
 
     print(f"Processing the following chapters: {expanded_chapters}")
 
-    # Try to extract chapters using the robust method
-    chapters_to_process = extract_chapters_robustly(pdf_file, expanded_chapters)
-    
-    if not chapters_to_process:
-        raise HTTPException(status_code=404, detail="No chapters found matching the provided numbers.")
-
-    # Extract chapter names
-    chapter_names = [chapter['title'] for chapter in chapters_to_process]
-    add_or_update_file(request.pdf_name, expanded_chapters, chapter_names)
-
+    # Extract every page once (in parallel, or from the PDF cache) and reuse it for chapter detection and indexing
     try:
-        doc = fitz.open(pdf_file)
+        page_texts = await asyncio.to_thread(get_page_texts, pdf_file)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to open PDF: {str(e)}")
 
-    chapter_count = 0
-    successful_chapters = []
-    failed_chapters = []
-
-    # Process each chapter
-    for chapter in chapters_to_process:
-        chapter_title = chapter['title']
-        from_page = chapter['from_page']
-        to_page = chapter['to_page']
-
-        print(f"Processing item {chapter_count + 1}: '{chapter_title}' from page {from_page} to {to_page}...")
-
-        if from_page is None or to_page is None:
-            print(f"Invalid page range: Chapter '{chapter_title}' has undefined page range")
-            failed_chapters.append({"title": chapter_title, "reason": "Undefined page range"})
-            continue
-
-        if from_page > to_page:
-            print(f"Invalid page range: Chapter '{chapter_title}' has from_page {from_page} > to_page {to_page}")
-            failed_chapters.append({"title": chapter_title, "reason": "Invalid page range"})
-            continue
-
-        if from_page < 1 or to_page > doc.page_count:
-            print(f"Out of bounds: Chapter '{chapter_title}' has from_page {from_page} or to_page {to_page} outside the valid page range.")
-            failed_chapters.append({"title": chapter_title, "reason": "Out of bounds page range"})
-            continue
+    # Try to extract chapters using the robust method
+    chapters_to_process = await asyncio.to_thread(extract_chapters_robustly, pdf_file, expanded_chapters, page_texts)
+    
+    if not chapters_to_process:
+        raise HTTPException(status_code=404, detail="No chapters found matching the provided numbers.")
 
-        # Extract the text for the chapter
-        chapter_text = ""
-        for page_num in range(from_page - 1, to_page):
-            try:
-                page = doc.load_page(page_num)
-                chapter_text += page.get_text("text") + "\n"
-            except Exception as e:
-                print(f"Error extracting text from page {page_num}: {str(e)}")
-                continue
+    # Index the chapters in the background; progress is broadcast over /ws
+    job_id = await pdf_jobs.submit_job(
+        request.pdf_name, expanded_chapters, chapters_to_process, page_texts, store, request.chunk_strategy
+    )
 
-        if not chapter_text.strip():
-            print(f"Chapter '{chapter_title}' could not be saved because it has no text.")
-            failed_chapters.append({"title": chapter_title, "reason": "No text content"})
-            continue
+    return {
+        "message": "Chapters queued for indexing",
+        "job_id": job_id,
+        "status_url": f"/process-pdf/jobs/{job_id}",
+        "processed_chapters": chapter_numbers,
+        "queued_chapters": [chapter['title'] for chapter in chapters_to_process],
+    }
 
-        # Add the chapter title to the markdown format
-        chapter_text_md = f"# {chapter_title}\n\n{chapter_text}"
 
-        # Index the markdown content into the vector database
-        try:
-            response = process_text_and_index(chapter_text_md, source_id=chapter_title, file_name=request.pdf_name)
-            if response is not None:
-                print(f"Chapter '{chapter_title}' successfully indexed as markdown.")
-                successful_chapters.append(chapter_title)
-            else:
-                print(f"Failed to index Chapter '{chapter_title}'.")
-                failed_chapters.append({"title": chapter_title, "reason": "Indexing failed"})
-        except Exception as e:
-            print(f"Error indexing Chapter '{chapter_title}': {e}")
-            failed_chapters.append({"title": chapter_title, "reason": str(e)})
+@router.get("/jobs/{job_id}")
+async def get_pdf_job(job_id: str):
+    """
+    API endpoint to get the status and per-chapter results of an indexing job.
 
-        chapter_count += 1
+    :param job_id: The job id returned by POST /process-pdf/.
+    :return: The job state.
+    """
+    job = pdf_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
 
-    doc.close()
 
-    if chapter_count == 0:
-        raise HTTPException(status_code=404, detail="No chapters were successfully processed.")
+@router.delete("/jobs/{job_id}")
+async def cancel_pdf_job(job_id: str):
+    """
+    API endpoint to cancel a queued or running indexing job.
 
-    return {
-        "message": "Chapters processing completed",
-        "processed_chapters": chapter_numbers,
-        "successful_chapters": successful_chapters,
-        "failed_chapters": failed_chapters
-    }
+    :param job_id: The job id returned by POST /process-pdf/.
+    :return: The job state after cancellation.
+    """
+    job = pdf_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if not await pdf_jobs.cancel_job(job_id):
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}.")
+    return pdf_jobs.get_job(job_id)
 
 
 # GET endpoint to fetch all indexed files and their indexed chapters
 @router.get("/indexed-chapters")
-async def get_indexed_files():
+async def get_indexed_files(
+    file_name: Optional[str] = None,
+    chapter_from: Optional[int] = None,
+    chapter_to: Optional[int] = None,
+    title: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
     """
     API endpoint to get all indexed files and their indexed chapters.
 
-    :return: List of indexed files with their chapters.
+    With any filter or pagination parameter, returns a page of indexed chapters instead
+    ({"total", "chapters"}), each with its indexed_at, chunk_count and content_hash.
+
+    :param file_name: Only chapters of this file.
+    :param chapter_from: Lowest chapter number to include.
+    :param chapter_to: Highest chapter number to include.
+    :param title: Only chapters whose title contains this text.
+    :param limit: Page size (default 100 when filtering).
+    :param offset: Number of matching chapters to skip.
+    :return: List of indexed files with their chapters, or a page of chapters.
     """
-    files = get_all_files()
+    if any(value is not None for value in (file_name, chapter_from, chapter_to, title, limit)) or offset:
+        return await run_in_db(query_indexed_chapters, file_name, chapter_from, chapter_to, title, limit or 100, offset)
+
+    files = await run_in_db(get_all_files)
 
     if not files:
         return []
 
     return files
 
-# Initialize the database when the app starts
-init_db()
 
 @router.get("/toc")
 async def get_pdf_toc(pdf_name="rooks 9th edition.pdf"):
@@ -474,7 +464,7 @@ async def get_pdf_toc(pdf_name="rooks 9th edition.pdf"):
     pdf_file_path = os.path.expanduser(PDF_FILES_FOLDER + pdf_name)
     try:
         # Extract the TOC in JSON format
-        toc = get_toc_json_from_pdf(pdf_file_path)
+        toc = await asyncio.to_thread(get_toc_json_from_pdf, pdf_file_path)
         
         if toc is None:
             raise HTTPException(status_code=404, detail="TOC not found in the PDF.")
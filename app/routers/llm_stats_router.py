@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from helper.llms import llm_registry
+
+# Initialize the router
+router = APIRouter(
+    prefix="/llm-stats",
+    tags=["monitoring"],
+    responses={404: {"description": "Not found"}},
+)
+
+@router.get("/")
+async def get_llm_stats():
+    """
+    Per-profile LLM usage since the server started.
+
+    :return: For each profile of config.LLM_PROFILES: model, calls, errors, average and
+             maximum latency in seconds, and input/output tokens.
+    """
+    return llm_registry.get_stats()
@@ -1,9 +1,12 @@
-import sqlite3
-from fastapi import FastAPI, APIRouter, HTTPException, WebSocket
+import asyncio
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, WebSocket
+from langchain_community.vectorstores import Chroma
 from pydantic import BaseModel, HttpUrl
 from typing import List
 
-from indexers.file_processor_with_indexing import process_text_and_index
+from db.db import get_vector_store
+from db.sqlite import pool, run_in_db
+from indexers.bulk_indexer import bulk_index_texts
 
 # Initialize the router with your specified configuration
 router = APIRouter(
@@ -12,39 +15,13 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Database file
-DATABASE = "./test.db"
-
-# Initialize the database and create the table if it doesn't exist
-def init_db():
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    
-    # Modify the table structure to add 'type' column if it doesn't exist
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sources (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL UNIQUE,
-            summary TEXT,
-            type TEXT  -- New column to store the file type (e.g., image, text, link)
-        )
-    ''')
-     
-    conn.commit()
-    conn.close()
-
-# Function to add or update sources in the database
-def add_source_to_db(title: str, summary: str, text: str, source_type: str):
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    try:
-        cursor.execute('''
+# Function to add or update many sources in the database, in one transaction
+def add_sources_to_db(sources: list):
+    with pool.transaction() as conn:
+        conn.executemany('''
             INSERT OR REPLACE INTO sources (title, summary, text, type)
             VALUES (?, ?, ?, ?)
-        ''', (title, summary, text, source_type))
-        conn.commit()
-    finally:
-        conn.close()
+        ''', [(str(source.title), source.summary, source.text, source.type) for source in sources])
 
 # Pydantic model to validate the request body
 class SourceSchema(BaseModel):
@@ -68,21 +45,53 @@ class SourcesOutput(BaseModel):
 
 # API endpoint to add sources
 @router.post("/")
-def add_sources(input_data: SourcesInput):
-    sources = input_data.sources
+async def add_sources(input_data: SourcesInput, store: Chroma = Depends(get_vector_store)):
+    """
+    API endpoint to add sources in bulk.
+
+    All rows are written in one transaction, then every non-image source is split, embedded
+    and indexed in one batched pass.
+
+    :param input_data: The sources to add; a later source with the same title replaces an earlier one.
+    :return: Overall status and the status of each source (indexed, skipped or failed).
+    """
+    # Same title means same row (INSERT OR REPLACE), so only the last one is indexed
+    sources = list({str(source.title): source for source in input_data.sources}.values())
+
+    try:
+        await run_in_db(add_sources_to_db, sources)
+    except Exception as e:
+        print(f"Error saving sources: {e}")
+        raise HTTPException(status_code=500, detail=f"Error saving sources: {str(e)}")
+
+    statuses = {}
+    items = []
     for source in sources:
-        add_source_to_db(
-            title=str(source.title),
-            summary=source.summary,
-            text=source.text,
-            source_type=source.type  # Pass the type here
-        )
-        
-        # Only call process_text_and_index if type is not 'image'
-        if source.type.lower() != "image":
-            process_text_and_index(source.text, source.title)
-    
-    return {"status": "Sources added successfully"}
+        title = str(source.title)
+        # Only index sources that are not images
+        if source.type.lower() == "image":
+            statuses[title] = {"title": title, "type": source.type, "status": "skipped", "reason": "Image source"}
+        elif not source.text:
+            statuses[title] = {"title": title, "type": source.type, "status": "skipped", "reason": "No text"}
+        else:
+            statuses[title] = {"title": title, "type": source.type}
+            items.append({"text": source.text, "source_id": title})
+
+    if items:
+        try:
+            result = await asyncio.to_thread(bulk_index_texts, items, store)
+            for item in items:
+                counts = result["sources"][item["source_id"]]
+                statuses[item["source_id"]].update(
+                    status="indexed", chunk_count=counts["chunk_count"], num_added=counts["num_added"]
+                )
+        except Exception as e:
+            print(f"Error indexing sources: {e}")
+            for item in items:
+                statuses[item["source_id"]].update(status="failed", reason=str(e))
 
-# Initialize the database when the app starts
-init_db()
+    failed = any(status["status"] == "failed" for status in statuses.values())
+    return {
+        "status": "Sources added, indexing failed" if failed else "Sources added successfully",
+        "sources": [statuses[str(source.title)] for source in sources],
+    }
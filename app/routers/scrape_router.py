@@ -1,8 +1,9 @@
+import asyncio
 import json
 from bs4 import BeautifulSoup
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
-from langchain_openai import ChatOpenAI
+from helper.llms import get_llm, run_llm
 from pydantic import BaseModel, Field
 from typing import AsyncGenerator
 import requests
@@ -29,18 +30,10 @@ prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo-0125",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-    # api_key = "",  # if you prefer to pass api key in directly instaed of using env vars
-    # base_url="...",
-    # organization="...",
-    # other params...
-)
-chain = prompt | llm | StrOutputParser()
+# The chat model is created on first use (see helper.llms)
+def get_chain():
+    return prompt | get_llm("summarize") | StrOutputParser()
+
 # Define the request body model
 class CrawlRequest(BaseModel):
     url: str = Field(..., description="URL to crawl and extract text from")
@@ -92,12 +85,13 @@ router = APIRouter(
 
 
 @router.get("/summarize-lite")
-async def summarize_url_lite(url: str) -> JSONResponse:
+async def summarize_url_lite(url: str, request: Request) -> JSONResponse:
     """
     FastAPI GET endpoint to scrape and summarize content from a specific div
     or element on a webpage.
     """
-    html_content = requests.get(url)
+    # the page is fetched in a thread, so the event loop keeps serving other requests
+    html_content = await asyncio.to_thread(requests.get, url)
     soup = BeautifulSoup(html_content.content, "html.parser")
 
     if "pubmed.ncbi.nlm.nih.gov" in url:
@@ -112,11 +106,11 @@ async def summarize_url_lite(url: str) -> JSONResponse:
         content = soup.get_text(strip=True)
     
     # Use the extracted content to generate a summary using the chain
-    json_result = chain.invoke(
+    json_result = await run_llm(get_chain().ainvoke(
         {
             "text_to_summarize": content,
         }
-    )
+    ), request)
     
     if json_result:
         # Return the summary within a JSON object
@@ -194,7 +188,7 @@ def fetch_specific_content(crawler, url: str) -> dict:
         # Parsing the HTML content
         soup = BeautifulSoup(result.extracted_content, "html.parser")
         content = soup.get_text(strip=True)  # Extract text content from the div
-        json_result= chain.invoke(
+        json_result= get_chain().invoke(
                 {
                     "text_to_summarize": content,
                 }
@@ -2,20 +2,23 @@ import json
 import os
 import re
 from bs4 import BeautifulSoup
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
 from fastapi.responses import StreamingResponse
 from typing import List
 import fitz  # PyMuPDF
 from langchain.chains.retrieval import create_retrieval_chain
 from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
+from helper.llms import get_llm
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from sentence_transformers import CrossEncoder
 from langchain_community.document_transformers import (
     LongContextReorder,
 )
-from db.db import get_LC_chroma_client
+from langchain_community.vectorstores import Chroma
+from db.db import get_vector_store
+from db.vector_search import abatch_similarity_search
+from helper.reranker import reranker
+from config import RETRIEVAL_CONCURRENCY, LLM_REQUEST_TIMEOUT
 import asyncio
 
 router = APIRouter(
@@ -24,17 +27,11 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-llm = ChatOpenAI(
-    model="gpt-3.5-turbo-0125",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-    streaming=True,
-)
-
 files_folder = "files"
 
+# Bounds the vector store searches in flight for a single worker
+retrieval_semaphore = asyncio.Semaphore(RETRIEVAL_CONCURRENCY)
+
 prompt = (
     "Given the following text-content, extract and structure the information into JSON format with the following structure:\n"
     # ... (rest of the prompt remains the same)
@@ -61,7 +58,7 @@ async def process_file(file):
     
     return file.filename, text_content
 
-async def stream_response(files):
+async def stream_response(files, store: Chroma):
     response = {
         "message": "Processing PDF files...",
         "uploaded_files": [],
@@ -82,14 +79,34 @@ async def stream_response(files):
     
     yield json.dumps({"status": "Analyzing content with LLM..."}) + "\n"
 
-    async for competency in get_response_from_LLM_stream(combined_text, prompt2):
-        yield json.dumps({"competency": competency}) + "\n"
+    # StreamingResponse cancels this generator when the client disconnects. The timeout bounds
+    # only the LLM awaits, not the time the client takes to read: each step of the stream gets
+    # what is left of the budget and is yielded outside of it. A timeout is reported in-band
+    # since the status is already sent
+    loop = asyncio.get_running_loop()
+    remaining = LLM_REQUEST_TIMEOUT
+    competencies = get_response_from_LLM_stream(combined_text, prompt2, store)
+    try:
+        while True:
+            started = loop.time()
+            try:
+                competency = await asyncio.wait_for(competencies.__anext__(), max(remaining, 0))
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                yield json.dumps({"error": f"LLM call timed out after {LLM_REQUEST_TIMEOUT}s"}) + "\n"
+                break
+            remaining -= loop.time() - started
+            yield json.dumps({"competency": competency}) + "\n"
+    finally:
+        await competencies.aclose()
 
 @router.post("/")
 async def upload_pdfs_and_extract_text(
     files: List[UploadFile] = File(...),
+    store: Chroma = Depends(get_vector_store),
 ):
-    return StreamingResponse(stream_response(files), media_type="application/json")
+    return StreamingResponse(stream_response(files, store), media_type="application/json")
 
 def extract_text_from_pdf(file_path):
     document = fitz.open(file_path)
@@ -99,8 +116,8 @@ def extract_text_from_pdf(file_path):
     document.close()
     return text
 
-async def get_response_from_LLM_stream(content, prompt_template):
-    chain = prompt_template | llm | StrOutputParser()
+async def get_response_from_LLM_stream(content, prompt_template, store: Chroma):
+    chain = prompt_template | get_llm("extract_text_stream") | StrOutputParser()
     
     buffer = ""
     current_competency = {}
@@ -108,7 +125,7 @@ async def get_response_from_LLM_stream(content, prompt_template):
         buffer += chunk
         if '"competency":' in buffer:
             if current_competency:
-                yield await augment_competency(current_competency)
+                yield await augment_competency(current_competency, store)
                 current_competency = {}
             buffer = '{"competency":' + buffer.split('"competency":')[-1]
         
@@ -120,12 +137,15 @@ async def get_response_from_LLM_stream(content, prompt_template):
                 continue
 
     if current_competency:
-        yield await augment_competency(current_competency)
-
-async def augment_competency(competency):
-    for index, part in enumerate(competency.get('parts', [])):
-        relevant_docs, relevant_count = await get_results(part)
-        relevant_docs = [doc_to_dict(doc) for doc in relevant_docs]
+        yield await augment_competency(current_competency, store)
+
+async def augment_competency(competency, store: Chroma):
+    parts = competency.get('parts', [])
+    # Retrieve candidates for every part in one batched search, then rerank the whole competency in one pass
+    retrieved = await retrieve_docs_batched(parts, store)
+    ranked_parts = await reranker.arank(list(zip(parts, retrieved)))
+    for index, (part, scored_docs) in enumerate(zip(parts, ranked_parts)):
+        relevant_docs = [doc_to_dict(doc) for score, doc in filter_relevant(scored_docs)]
         search_link = f"https://pubmed.ncbi.nlm.nih.gov/?term={part.replace(' ', '+')}"
         augmented_part = {
             "name": part,
@@ -143,33 +163,29 @@ def doc_to_dict(doc):
         "metadata": doc.metadata,
     }
 
-async def get_results(part, threshold=0.5):
-    LC_chroma_client = get_LC_chroma_client()
-    retriever = LC_chroma_client.as_retriever(search_kwargs={"k": 20})
-    
-    relevant_docs = await retriever.ainvoke(part)
-    
-    cross_encoder = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
-    
-    pairs = [[part, doc.page_content] for doc in relevant_docs]
-    
-    scores = cross_encoder.predict(pairs)
-    
-    def is_web_url(source):
-        return bool(re.match(r'https?://', source))
+async def retrieve_docs_batched(parts, store: Chroma):
+    async with retrieval_semaphore:
+        results = await abatch_similarity_search(parts, store, k=20)
+    return [[doc for doc, distance in ranked] for ranked in results]
+
+def is_web_url(source):
+    return bool(re.match(r'https?://', source))
 
-    relevant_by_score = [
-        (score, doc) for score, doc in zip(scores, relevant_docs)
+def filter_relevant(scored_docs, threshold=0.5):
+    return [
+        (score, doc) for score, doc in scored_docs
         if score > threshold or (is_web_url(doc.metadata.get("source", "")) and score > 0)
     ]
-    
-    relevant_by_score.sort(key=lambda x: x[0], reverse=True)
-    
+
+async def get_results(part, store: Chroma, threshold=0.5):
+    relevant_docs = (await retrieve_docs_batched([part], store))[0]
+    scored_docs = (await reranker.arank([(part, relevant_docs)]))[0]
+    relevant_by_score = filter_relevant(scored_docs, threshold)
     return [doc for score, doc in relevant_by_score], len(relevant_by_score)
 
 @router.get("/refresh-search")
-async def recalculate_part_details(part_name: str):
-    relevant_docs, relevant_count = await get_results(part_name)
+async def recalculate_part_details(part_name: str, store: Chroma = Depends(get_vector_store)):
+    relevant_docs, relevant_count = await get_results(part_name, store)
     relevant_docs = [doc_to_dict(doc) for doc in relevant_docs]
     search_link = f"https://pubmed.ncbi.nlm.nih.gov/?term={part_name.replace(' ', '+')}"
     augmented_part = {
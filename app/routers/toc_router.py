@@ -3,6 +3,7 @@ import re
 import fitz  # PyMuPDF
 import json
 from fastapi import FastAPI, APIRouter, HTTPException
+from helper.pdf_cache import get_raw_toc
 
 
 # Initialize the router
@@ -23,10 +24,7 @@ def extract_full_toc_from_pdf(pdf_file: str):
     if not os.path.exists(pdf_file):
         raise HTTPException(status_code=404, detail="PDF file not found.")
 
-    doc = fitz.open(pdf_file)
-    
-    toc = doc.get_toc()  # Get the TOC from the PDF
-    doc.close()
+    toc, _ = get_raw_toc(pdf_file)  # Get the TOC from the per-PDF cache (opens the PDF only on a miss)
 
     toc_structure = []
     toc_hierarchy = {}
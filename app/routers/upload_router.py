@@ -1,5 +1,5 @@
 import os
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Request
 from typing import List
 import fitz
 
@@ -18,6 +18,7 @@ files_folder = "files"
 
 @router.post("/")
 async def upload_pdfs(
+    request: Request,
     pdf_files: List[UploadFile] = File(...),
     description: str = Form(...)
 ):
@@ -61,8 +62,10 @@ async def upload_pdfs(
 
     # After uploading and processing the files, use the helper method to process them with the LLM
     try:
-        transformed_text = process_files_with_instruction(uploaded_filenames, description)
+        transformed_text = await process_files_with_instruction(uploaded_filenames, description, request)
         response["transformed_text"] = transformed_text
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing files with LLM: {str(e)}")
 
@@ -1,16 +1,8 @@
-import os
-import re
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
-from typing import List
-from azure.storage.blob import BlobServiceClient
-from dotenv import load_dotenv
-import shutil
-from config import PDF_FILES_FOLDER ,ACCOUNT_URL 
-from indexers.db_handler import init_db, update_or_insert_subtopic  # Import the modularized SQL functions
-
-# Load environment variables for Azure
-load_dotenv()
-SHARED_ACCESS_KEY = os.getenv('SHARED_ACCESS_KEY')
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Query
+from typing import List, Optional
+from helper import asset_store
+from db.sqlite import run_in_db
+from indexers.db_handler import update_or_insert_subtopic, get_subtopic_assets  # Import the modularized SQL functions
 
 # Initialize the router
 router = APIRouter(
@@ -19,16 +11,6 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Azure Blob Storage Configuration
-blob_service_client = BlobServiceClient(account_url=ACCOUNT_URL, credential=SHARED_ACCESS_KEY)
-container_name = "test"
-
-# Folder to store files locally (temporarily)
-files_folder = PDF_FILES_FOLDER +"slide-uploads"
-
-# Initialize the database
-init_db()
-
 @router.post("/")
 async def upload_files(
     subtopic_name: str = Form(...),  # Subtopic name associated with files
@@ -36,7 +18,7 @@ async def upload_files(
     description: str = Form(...)
 ):
     """
-    API to upload files locally and to Azure Blob Storage, then store blob URLs in the database.
+    API to store files as content-addressed assets in Azure Blob Storage, then link them to the subtopic in the database.
 
     :param subtopic_name: The subtopic name associated with the files.
     :param files: List of files to be uploaded.
@@ -45,56 +27,40 @@ async def upload_files(
     """
     response = {
         "message": "Files uploaded and added to Azure successfully.",
-        "uploaded_files": [],
+        "uploaded_files": [file.filename for file in files],
         "azure_blob_urls": [],
         "description": description,
     }
 
-    uploaded_filenames = []
-
-    for file in files:
-        # Save file locally
-        file_path = os.path.join(files_folder, file.filename)
-        os.makedirs(files_folder, exist_ok=True)
-
-        with open(file_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-        uploaded_filenames.append(file_path)
-        response["uploaded_files"].append(file.filename)
-
-        # Upload to Azure Blob Storage
-        try:
-            blob_url = upload_to_azure(file_path, file.filename)
-            response["azure_blob_urls"].append(blob_url)
-            # Remove local file after upload
-            os.remove(file_path)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error uploading file to Azure Blob: {str(e)}")
+    # Store every file as a content-addressed asset, concurrently; known content is not uploaded again
+    try:
+        assets = await asset_store.store_uploads(files)
+    except Exception as e:
+        print("Blob error:", e)
+        raise HTTPException(status_code=500, detail=f"Error uploading file to Azure Blob: {str(e)}")
+    response["azure_blob_urls"] = [asset["blob_url"] for asset in assets]
 
     # After uploading to Azure, update the database
-    update_or_insert_subtopic(subtopic_name, response["azure_blob_urls"])
+    await run_in_db(update_or_insert_subtopic, subtopic_name, [asset["hash"] for asset in assets])
 
     return response
 
-# Define a function similar to the JavaScript version to extract the file name
-def get_file_name(url):
-    match = re.search(r'[^/]*\.(\w+)($|\?)', url)
-    return match.group(0).split('?')[0] if match else None
 
-def upload_to_azure(filepath: str, filename: str):
+@router.get("/{subtopic_name}/assets")
+async def list_subtopic_assets(
+    subtopic_name: str,
+    limit: int = Query(50, ge=1, le=500),
+    after: Optional[int] = Query(None, description="next_cursor of the previous page")
+):
     """
-    Upload a file to Azure Blob Storage.
+    API to page through the assets of a subtopic in upload order.
 
-    :param filepath: The local path of the file.
-    :param filename: The name of the file in Azure Blob Storage.
-    :return: The URL of the uploaded blob.
+    :param subtopic_name: The subtopic name.
+    :param limit: Maximum number of assets per page.
+    :param after: Cursor returned as next_cursor by the previous page.
+    :return: The assets of the page, the total count and the next cursor (None on the last page).
     """
-    container_client = blob_service_client.get_container_client(container_name)
-    filename =get_file_name(filename)
-    try:
-        with open(filepath, "rb") as data:
-            blob_client = container_client.upload_blob(name=filename, data=data, overwrite=True)
-            return f"https://{blob_service_client.account_name}.blob.core.windows.net/{container_name}/{filename}"
-    except Exception as e:
-        print("Blob error:", e)
-        raise HTTPException(status_code=500, detail=f"Error uploading to Azure Blob: {str(e)}")
+    page = await run_in_db(get_subtopic_assets, subtopic_name, limit, after)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Subtopic not found.")
+    return page